@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test and benchmark harness for the material register REST API
+
+Runs against a local Odoo + Postgres with material_register installed, using
+only the standard library:
+
+    # seed 100k materials spread over 500 partners
+    python3 benchmarks/material_api_bench.py seed --db bench --login admin --password admin \\
+        --materials 100000 --partners 500
+
+    # run every scenario and save the figures as the reference
+    python3 benchmarks/material_api_bench.py run --db bench --login admin --password admin \\
+        --api-key <key> --save-baseline benchmarks/baseline.json
+
+    # later runs fail (exit code 1) when they regress past the tolerance
+    python3 benchmarks/material_api_bench.py run --db bench --login admin --password admin \\
+        --api-key <key> --baseline benchmarks/baseline.json --tolerance 0.25
+
+The API key must be created with the `material_register_api` scope (or none).
+Queries per request are read from the Server-Timing header of the API.
+
+The per key quotas of the API would throttle the harness and show up as
+errors, disable them in the configuration file of the benchmarked server:
+
+    material_api_rate_limit = 0
+    material_api_max_concurrent = 0
+
+A 429 answer stops the run instead of being counted as a regression.
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+
+SEED_BATCH_SIZE = 1000
+# Largest page served by the API (`material_api_max_page_size` of the server)
+MAX_PAGE_SIZE = 1000
+MATERIAL_TYPES = ['fabric', 'jeans', 'cotton']
+SQL_TIMING = re.compile(r'sql;dur=[\d.]+;desc="(\d+) queries"')
+
+
+class ApiClient(object):
+    """Minimal JSON-RPC client of the /api/v1 routes"""
+
+    def __init__(self, url, authorization, timeout=60):
+        self.url = url.rstrip('/')
+        self.authorization = authorization
+        self.timeout = timeout
+
+    def call(self, method, path, params=None):
+        """Return (result, elapsed seconds, SQL queries or None)"""
+        body = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params or {}}).encode('utf-8')
+        request = urllib.request.Request(
+            self.url + path, data=body, method=method,
+            headers={'Content-Type': 'application/json', 'Authorization': self.authorization})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read() or b'{}')
+                server_timing = response.headers.get('Server-Timing') or ''
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise SystemExit("The API throttled the benchmark (429), disable its quotas on the server, "
+                                 "see `material_api_rate_limit` in the usage above")
+            raise
+        elapsed = time.perf_counter() - start
+        if 'error' in payload:
+            raise RuntimeError(payload['error'].get('data', {}).get('message') or payload['error'])
+        result = payload.get('result') or {}
+        if not result.get('success', True):
+            raise RuntimeError(result['error']['message'])
+        match = SQL_TIMING.search(server_timing)
+        return result, elapsed, int(match.group(1)) if match else None
+
+
+def bearer(api_key):
+    return 'Bearer %s' % api_key
+
+
+def basic(login, password):
+    return 'Basic %s' % base64.b64encode(('%s:%s' % (login, password)).encode('utf-8')).decode('ascii')
+
+
+def seed(args):
+    """Create partners through XML-RPC then materials through the batch endpoint"""
+    common = xmlrpc.client.ServerProxy('%s/xmlrpc/2/common' % args.url)
+    uid = common.authenticate(args.db, args.login, args.password, {})
+    models = xmlrpc.client.ServerProxy('%s/xmlrpc/2/object' % args.url)
+    partner_ids = models.execute_kw(args.db, uid, args.password, 'res.partner', 'create', [[
+        {'name': 'Bench supplier %s' % index} for index in range(args.partners)
+    ]])
+    client = ApiClient(args.url, basic(args.login, args.password))
+    created = 0
+    start = time.perf_counter()
+    while created < args.materials:
+        size = min(SEED_BATCH_SIZE, args.materials - created)
+        client.call('POST', '/api/v1/materials/batch', {'items': [{
+            'material_code': 'BENCH%08d' % (created + index),
+            'name': 'Bench material %s' % (created + index),
+            'material_type': MATERIAL_TYPES[(created + index) % len(MATERIAL_TYPES)],
+            'material_buy_price': 100 + (created + index) % 5000,
+            'partner_id': partner_ids[(created + index) % len(partner_ids)],
+        } for index in range(size)]})
+        created += size
+        print('seeded %s/%s materials' % (created, args.materials), file=sys.stderr)
+    print('seeded %s partners and %s materials in %.1fs' % (len(partner_ids), created, time.perf_counter() - start))
+
+
+class Scenarios(object):
+    """Each scenario is one API call, returning (elapsed, queries)"""
+
+    def __init__(self, args):
+        self.args = args
+        self.client = ApiClient(args.url, bearer(args.api_key))
+        self.basic_client = ApiClient(args.url, basic(args.login, args.password))
+        result, _elapsed, _queries = self.client.call('GET', '/api/v1/materials', {
+            'material_code': 'BENCH', 'limit': 1, 'with_count': True, 'fields': ['material_code', 'partner'], 'expand': []})
+        if not result['data']:
+            raise SystemExit("No seeded material found, run the `seed` command first")
+        self.total = result['meta']['total_count']
+        self.partner_id = result['data'][0]['partner']
+        self.sample_ids = [row['id'] for row in self.client.call('GET', '/api/v1/materials', {
+            'material_code': 'BENCH', 'limit': 500, 'fields': ['id']})[0]['data']]
+        self.deep_cursor = self._cursor_at(self.total // 2)
+        self.created_ids = []
+
+    def _cursor_at(self, depth):
+        result = self.client.call('GET', '/api/v1/materials', {
+            'cursor': None, 'limit': 1, 'fields': ['id'], 'material_code': 'BENCH'})[0]
+        cursor = result['meta']['next_cursor']
+        # jump close to `depth` with the largest pages, then keep the cursor
+        remaining = depth
+        while remaining > 0 and cursor:
+            size = min(remaining, self.args.max_page_size)
+            result = self.client.call('GET', '/api/v1/materials', {
+                'cursor': cursor, 'limit': size, 'fields': ['id'], 'material_code': 'BENCH'})[0]
+            cursor = result['meta']['next_cursor']
+            # the server may serve smaller pages than asked
+            remaining -= len(result['data'])
+        return cursor
+
+    def list_filters(self):
+        return self.client.call('GET', '/api/v1/materials', {
+            'material_code': 'BENCH00%s' % random.randint(0, 99), 'material_type': random.choice(MATERIAL_TYPES), 'limit': 80})[1:]
+
+    def deep_offset(self):
+        return self.client.call('GET', '/api/v1/materials', {
+            'material_code': 'BENCH', 'limit': 80, 'offset': self.total // 2})[1:]
+
+    def deep_cursor_page(self):
+        return self.client.call('GET', '/api/v1/materials', {
+            'material_code': 'BENCH', 'limit': 80, 'cursor': self.deep_cursor})[1:]
+
+    def get_single(self):
+        return self.client.call('GET', '/api/v1/materials/%s' % random.choice(self.sample_ids))[1:]
+
+    def create(self):
+        result, elapsed, queries = self.client.call('POST', '/api/v1/materials', {
+            'material_code': 'BENCHTMP%s' % random.randint(0, 10 ** 9),
+            'name': 'Benchmark created',
+            'material_type': 'cotton',
+            'material_buy_price': 1000,
+            'partner_id': self.partner_id,
+        })
+        self.created_ids.append(result['data']['id'])
+        return elapsed, queries
+
+    def update(self):
+        return self.client.call('PUT', '/api/v1/materials/%s' % random.choice(self.sample_ids), {
+            'material_buy_price': random.randint(100, 5000)})[1:]
+
+    def delete(self):
+        if not self.created_ids:
+            return self.create()
+        return self.client.call('DELETE', '/api/v1/materials/%s' % self.created_ids.pop())[1:]
+
+    def auth_bearer(self):
+        return self.client.call('GET', '/api/v1/materials/%s' % self.sample_ids[0], {'fields': ['id']})[1:]
+
+    def auth_basic(self):
+        return self.basic_client.call('GET', '/api/v1/materials/%s' % self.sample_ids[0], {'fields': ['id']})[1:]
+
+    # delete runs after create so that it removes what create added
+    ORDER = ['list_filters', 'deep_offset', 'deep_cursor_page', 'get_single',
+             'create', 'update', 'delete', 'auth_bearer', 'auth_basic']
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_scenario(func, requests, concurrency):
+    samples = []
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(func) for _i in range(requests)]
+        for future in futures:
+            try:
+                samples.append(future.result())
+            except (RuntimeError, urllib.error.URLError) as e:
+                errors += 1
+                print('  error: %s' % e, file=sys.stderr)
+    wall = time.perf_counter() - start
+    latencies = [elapsed * 1000 for elapsed, _queries in samples] or [0.0]
+    queries = [queries for _elapsed, queries in samples if queries is not None]
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'rps': round(len(samples) / wall, 2) if wall else 0.0,
+        'queries_per_request': round(statistics.mean(queries), 2) if queries else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the list of regressions of `results` against `baseline`"""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if current['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+            regressions.append('%s: p95 %.1fms > baseline %.1fms' % (name, current['p95_ms'], reference['p95_ms']))
+        if current['rps'] < reference['rps'] * (1 - tolerance):
+            regressions.append('%s: %.1f req/s < baseline %.1f req/s' % (name, current['rps'], reference['rps']))
+        if (current['queries_per_request'] or 0) > (reference['queries_per_request'] or 0) and reference['queries_per_request'] is not None:
+            regressions.append('%s: %.1f queries/request > baseline %.1f' % (
+                name, current['queries_per_request'], reference['queries_per_request']))
+        if current['errors'] > reference['errors']:
+            regressions.append('%s: %s errors' % (name, current['errors']))
+    return regressions
+
+
+def run(args):
+    scenarios = Scenarios(args)
+    selected = args.scenario or Scenarios.ORDER
+    results = {}
+    print('%-18s %8s %10s %10s %10s %10s %9s %7s' % ('scenario', 'requests', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'queries', 'errors'))
+    for name in selected:
+        func = getattr(scenarios, name)
+        # warm up caches and connections, not measured
+        for _i in range(min(args.warmup, args.requests)):
+            try:
+                func()
+            except (RuntimeError, urllib.error.URLError):
+                pass
+        result = results[name] = run_scenario(func, args.requests, args.concurrency)
+        print('%-18s %8s %10.2f %10.2f %10.2f %10.2f %9s %7s' % (
+            name, result['requests'], result['p50_ms'], result['p95_ms'], result['p99_ms'], result['rps'],
+            result['queries_per_request'], result['errors']))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print('baseline saved to %s' % args.save_baseline)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print('\nPerformance regressions:\n  ' + '\n  '.join(regressions))
+            return 1
+        print('\nno regression against %s' % args.baseline)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8069')
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='create benchmark partners and materials')
+    seed_parser.add_argument('--materials', type=int, default=10000)
+    seed_parser.add_argument('--partners', type=int, default=100)
+
+    run_parser = commands.add_parser('run', help='run the scenarios and report latencies')
+    run_parser.add_argument('--api-key', required=True)
+    run_parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    run_parser.add_argument('--concurrency', type=int, default=4)
+    run_parser.add_argument('--warmup', type=int, default=10)
+    run_parser.add_argument('--max-page-size', type=int, default=MAX_PAGE_SIZE,
+                            help='largest page the server serves, to walk to the deep cursor')
+    run_parser.add_argument('--scenario', action='append', choices=Scenarios.ORDER, help='only run these scenarios')
+    run_parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    run_parser.add_argument('--baseline', help='fail when regressing against this JSON file')
+    run_parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+
+    args = parser.parse_args()
+    random.seed(42)
+    if args.command == 'seed':
+        seed(args)
+        return 0
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
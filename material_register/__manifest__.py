@@ -23,8 +23,12 @@
 
     # always loaded
     'data': [
+        'security/material_security.xml',
         'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/material_views.xml',
+        'views/material_bulk_audit_views.xml',
+        'views/material_partner_summary_views.xml',
         'views/menu_items.xml',
         'views/templates.xml',
     ],
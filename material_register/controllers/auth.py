@@ -5,11 +5,15 @@ import base64
 import werkzeug.wrappers
 import logging
 from functools import wraps
+from .auth_cache import auth_cache
+from .instrumentation import RequestTimer, api_metrics, timing_phase
+from .pagination import parse_bool
+from .rate_limit import quota_key, rate_limiter
 
 _logger = logging.getLogger(__name__)
 
 
-def invalid_response(message, status=400, code=None):
+def invalid_response(message, status=400, code=None, details=None):
     """
     Return invalid response for JSON routes
     """
@@ -21,6 +25,9 @@ def invalid_response(message, status=400, code=None):
         }
     }
     
+    if details is not None:
+        response_data['error']['details'] = details
+    
     # For JSON routes, we return the Python dict directly
     return response_data
 
@@ -44,54 +51,226 @@ def valid_response(data, status=200, message=None, meta=None):
     return response_data
 
 
+def http_response(data, status=200, headers=None):
+    """
+    Return a JSON response for HTTP routes
+    """
+    return Response(
+        json.dumps(data),
+        status=status,
+        headers=headers,
+        content_type='application/json'
+    )
+
+
+def _response_overrides():
+    overrides = getattr(request, 'material_api_response', None)
+    if overrides is None:
+        overrides = request.material_api_response = {'headers': [], 'status': None}
+    return overrides
+
+
+def add_response_header(name, value):
+    """
+    Queue a header for the HTTP response of the current request
+    JSON routes cannot set headers themselves, `ir.http` applies them after dispatch
+    """
+    _response_overrides()['headers'].append((name, value))
+
+
+def set_response_status(status):
+    """Override the HTTP status of the response of the current request"""
+    _response_overrides()['status'] = status
+
+
+def apply_response_overrides(response):
+    """Apply the headers and status queued while handling the current request"""
+    overrides = getattr(request, 'material_api_response', None) if request else None
+    if not overrides or not hasattr(response, 'headers'):
+        return response
+    for name, value in overrides['headers']:
+        response.headers[name] = value
+    if overrides['status'] == 304:
+        # a 304 carries no body, the client reuses its cached representation
+        response.set_data(b'')
+        response.headers.pop('Content-Type', None)
+    if overrides['status']:
+        response.status_code = overrides['status']
+    return response
+
+
+def _auth_error(message, status=401):
+    """Authentication failure in the shape expected by the route type"""
+    response_data = invalid_response(message, status)
+    if request._request_type == 'http':
+        return http_response(response_data, status)
+    return response_data
+
+
+def _limit_error(reason, retry_after):
+    """429 response of a throttled request, in the shape expected by the route type"""
+    status, code = 429, 'RATE_LIMITED'
+    if reason == 'concurrency':
+        message = 'Too many concurrent requests for this API key'
+    elif reason == 'unavailable':
+        status, code = 503, 'QUOTA_UNAVAILABLE'
+        message = 'API quotas unavailable, retry later'
+    else:
+        message = 'Rate limit exceeded for this API key'
+    response_data = invalid_response(message, status, code=code, details={'retry_after': retry_after, 'limit': reason})
+    if request._request_type == 'http':
+        return http_response(response_data, status, headers=[('Retry-After', str(retry_after))])
+    add_response_header('Retry-After', str(retry_after))
+    set_response_status(status)
+    return response_data
+
+
+def _login_uid(uid):
+    """Make `uid` the user of the current request"""
+    user = request.env['res.users'].sudo().browse(uid)
+    request.env.user = user
+    request.uid = user.id
+
+
+def _authenticate_request():
+    """
+    Authenticate the current request from its Authorization header
+    Returns None on success, otherwise the error response to send back
+    """
+    auth_header = request.httprequest.headers.get('Authorization')
+    if not auth_header:
+        return _auth_error('Missing authorization header', 401)
+    
+    # Known credentials, skip the key lookup or password hashing
+    cache_key = sequence = None
+    if auth_header.startswith(('Bearer ', 'Basic ')):
+        cache_key = auth_cache.digest(request.db or request.session.db, auth_header)
+        sequence = getattr(request.env.registry, 'cache_sequence', None)
+        cached_uid = auth_cache.get(cache_key, sequence)
+        if cached_uid:
+            _login_uid(cached_uid)
+            return None
+    
+    # Handle Bearer token (API Key) authentication
+    if auth_header.startswith('Bearer '):
+        token = auth_header.split(' ')[1]
+        
+        # Odoo's built-in API key system
+        try:
+            # Odoo 14 requires a non-empty scope parameter
+            user_id = request.env['res.users.apikeys'].sudo()._check_credentials(scope='material_register_api', key=token)
+            if user_id:
+                _login_uid(user_id)
+                auth_cache.set(cache_key, user_id, sequence)
+                return None
+        except Exception as e:
+            _logger.warning(f"API key authentication error: {str(e)}")
+            
+        return _auth_error('Invalid API key', 401)
+    
+    # Handle Basic authentication (username/password)
+    elif auth_header.startswith('Basic '):
+        auth_decoded = base64.b64decode(auth_header.split(' ')[1]).decode('utf-8')
+        username, password = auth_decoded.split(':')
+        
+        try:
+            uid = request.session.authenticate(request.session.db, username, password)
+            if not uid:
+                return _auth_error('Authentication failed: Invalid username or password', 401)
+            
+            auth_cache.set(cache_key, uid, sequence)
+            return None
+        except Exception as e:
+            _logger.exception("Authentication error")
+            return _auth_error(f'Authentication error: {str(e)}', 401)
+    
+    else:
+        return _auth_error('Unsupported authorization method', 401)
+
+
 def authenticate_api(func):
     """
     Decorator to authenticate API requests
     Supports both token-based (Bearer) and Basic authentication
+    Successful authentications are kept in `auth_cache` so repeat callers skip the hashing
+    Authenticated requests then go through the per key quotas of `rate_limiter`,
+    a streamed response holds its concurrency slot until the stream is closed
     """
     @wraps(func)
     def wrapped(self, *args, **kwargs):
-        auth_header = request.httprequest.headers.get('Authorization')
-        if not auth_header:
-            return invalid_response('Missing authorization header', 401)
-        
-        # Handle Bearer token (API Key) authentication
-        if auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            
-            # First try with our custom API key field
-            
-                
-            # Then try with Odoo's built-in API key system
-            try:
-                # Odoo 14 requires a non-empty scope parameter
-                user_id = request.env['res.users.apikeys'].sudo()._check_credentials(scope='material_register_api', key=token)
-                if user_id:
-                    user = request.env['res.users'].sudo().browse(user_id)
-                    request.env.user = user
-                    request.uid = user.id
-                    return func(self, *args, **kwargs)
-            except Exception as e:
-                _logger.warning(f"API key authentication error: {str(e)}")
-                
-            return invalid_response('Invalid API key', 401)
+        with timing_phase('auth'):
+            error = _authenticate_request()
+        if error is not None:
+            return error
+        if not rate_limiter.enabled:
+            return func(self, *args, **kwargs)
         
-        # Handle Basic authentication (username/password)
-        elif auth_header.startswith('Basic '):
-            auth_decoded = base64.b64decode(auth_header.split(' ')[1]).decode('utf-8')
-            username, password = auth_decoded.split(':')
-            
-            try:
-                uid = request.session.authenticate(request.session.db, username, password)
-                if not uid:
-                    return invalid_response('Authentication failed: Invalid username or password', 401)
-                
-                return func(self, *args, **kwargs)
-            except Exception as e:
-                _logger.exception("Authentication error")
-                return invalid_response(f'Authentication error: {str(e)}', 401)
+        dbname = request.db or request.session.db
+        key = quota_key(request.httprequest.headers.get('Authorization'), request.uid or request.session.uid)
+        with timing_phase('quota'):
+            allowed, retry_after, reason = rate_limiter.acquire(key, dbname)
+        if not allowed:
+            return _limit_error(reason, retry_after)
+        request.material_api_quota_key = key
+        try:
+            result = func(self, *args, **kwargs)
+        except Exception:
+            rate_limiter.release(key, dbname)
+            raise
+        if isinstance(result, werkzeug.wrappers.Response) and result.is_streamed:
+            # the body is produced after the handler returns, e.g. the export
+            result.call_on_close(lambda: rate_limiter.release(key, dbname))
+        else:
+            rate_limiter.release(key, dbname)
+        return result
+    
+    return wrapped
+
+
+def charge_api_quota(cost):
+    """
+    Take `cost` more tokens from the quota of the current request, for
+    requests doing the work of several calls (the /api/v1/batch envelope)
+    Returns None when allowed, otherwise the error response to send back
+    """
+    key = getattr(request, 'material_api_quota_key', None)
+    if cost <= 0 or key is None or not rate_limiter.enabled:
+        return None
+    with timing_phase('quota'):
+        allowed, retry_after, reason = rate_limiter.charge(key, request.db or request.session.db, cost)
+    if not allowed:
+        return _limit_error(reason, retry_after)
+    return None
+
+
+def instrument_api(func):
+    """
+    Decorator measuring API requests, to put above `authenticate_api`
+    Records wall time, SQL queries and SQL time per phase, sends them back in
+    a Server-Timing header (and in `meta.timing` when `timing` is requested)
+    and feeds the per-route histograms of `api_metrics`
+    """
+    @wraps(func)
+    def wrapped(self, *args, **kwargs):
+        timer = request.material_api_timer = RequestTimer()
+        try:
+            result = func(self, *args, **kwargs)
+        except Exception:
+            # raised past the handlers, e.g. by the export or authenticate_api, still measured
+            timer.stop()
+            api_metrics.observe(func.__name__, 'error', timer)
+            add_response_header('Server-Timing', timer.server_timing())
+            raise
+        timer.stop()
         
+        if isinstance(result, dict):
+            outcome = 'success' if result.get('success') else 'error'
+            if parse_bool(kwargs.get('timing')):
+                result.setdefault('meta', {})['timing'] = timer.as_dict()
         else:
-            return invalid_response('Unsupported authorization method', 401)
+            outcome = 'success' if getattr(result, 'status_code', 200) < 400 else 'error'
+        api_metrics.observe(func.__name__, outcome, timer)
+        add_response_header('Server-Timing', timer.server_timing())
+        return result
     
-    return wrapped
\ No newline at end of file
+    return wrapped
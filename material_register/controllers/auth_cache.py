@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from odoo.tools import config
+
+
+class AuthCache(object):
+    """
+    Bounded in-process LRU cache of successful API authentications
+
+    Entries map a keyed digest of the Authorization header to the uid it
+    authenticated, the raw credentials are never kept. An entry is dropped
+    when it expires, when the uid is invalidated (key revoked, password
+    changed, user archived) or when the registry cache sequence moved, which
+    is how invalidations made by other workers reach this one.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def digest(self, dbname, auth_header):
+        """Keyed digest of the credentials, useless outside of this process"""
+        message = f'{dbname}\x00{auth_header}'.encode('utf-8')
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def get(self, key, sequence):
+        """Return the cached uid of `key`, or None when missing, expired or stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                uid, expires_at, entry_sequence = entry
+                if expires_at > time.monotonic() and entry_sequence == sequence:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return uid
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, uid, sequence):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (uid, time.monotonic() + self.ttl, sequence)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_uids(self, uids):
+        """Drop every entry authenticating one of `uids`"""
+        uids = set(uids)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] in uids]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+auth_cache = AuthCache(
+    max_size=int(config.get('material_api_auth_cache_size', 1024)),
+    ttl=int(config.get('material_api_auth_cache_ttl', 300)),
+)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from collections import defaultdict
+
+import psycopg2
+
+from .validation import MATERIAL_WRITABLE_FIELDS, MaterialValidationError, validate_material_payloads
+
+_logger = logging.getLogger(__name__)
+
+BATCH_MAX_SIZE = 1000
+BATCH_MODES = ('atomic', 'best_effort')
+# `summary` skips the per-field mail tracking, one audit message is posted per batch instead
+TRACKING_MODES = ('full', 'summary')
+TRACKING_HEADER = 'X-Tracking'
+UNTRACKED_WRITE_GROUP = 'material_register.group_material_untracked_write'
+# Unique index of material_code, see the _sql_constraints of material.register
+CODE_CONSTRAINT = 'material_register_material_code_uniq'
+
+
+def parse_batch_request(kwargs, key='items'):
+    """
+    Read the array and the mode of a batch request
+    Returns a tuple (items, atomic), raises MaterialValidationError on a malformed request
+    """
+    items = kwargs.get(key)
+    if not isinstance(items, list) or not items:
+        raise MaterialValidationError(f"'{key}' must be a non-empty array", "INVALID_BATCH")
+    if len(items) > BATCH_MAX_SIZE:
+        raise MaterialValidationError(
+            f"Batch too large: {len(items)} items, at most {BATCH_MAX_SIZE} allowed", "BATCH_TOO_LARGE")
+    mode = kwargs.get('mode') or 'atomic'
+    if mode not in BATCH_MODES:
+        raise MaterialValidationError(
+            f"Invalid batch mode. Allowed values: {', '.join(BATCH_MODES)}", "INVALID_BATCH_MODE")
+    return items, mode == 'atomic'
+
+
+def parse_tracking_mode(kwargs, headers):
+    """
+    Tell whether a batch asks for summary tracking, through its `tracking`
+    parameter or the X-Tracking header, the parameter taking precedence
+    """
+    mode = kwargs.get('tracking') or headers.get(TRACKING_HEADER) or 'full'
+    if mode not in TRACKING_MODES:
+        raise MaterialValidationError(
+            f"Invalid tracking mode. Allowed values: {', '.join(TRACKING_MODES)}", "INVALID_TRACKING_MODE")
+    return mode == 'summary'
+
+
+def untracked_env(env):
+    """
+    Environment writing materials without mail tracking, creation message
+    nor follower subscription, for the members of the untracked write group
+    """
+    if not env.user.has_group(UNTRACKED_WRITE_GROUP):
+        raise MaterialValidationError(
+            "Summary tracking requires the 'Material: Untracked Bulk Writes' access right", "TRACKING_FORBIDDEN")
+    return env(context=dict(env.context, tracking_disable=True))
+
+
+def audit_untracked_batch(env, operation, items, results):
+    """Record the materials written by an untracked batch, with one chatter message"""
+    succeeded = [result for result in results if result['success']]
+    if not succeeded:
+        return env['material.register.bulk.audit']
+    field_names = {
+        field for result in succeeded for field in items[result['index']] if field in MATERIAL_WRITABLE_FIELDS}
+    return env['material.register.bulk.audit']._log_untracked_batch(
+        operation, [result['id'] for result in succeeded], field_names)
+
+
+def _success(index, record_id):
+    return {'index': index, 'success': True, 'id': record_id}
+
+
+def _failure(index, message, code):
+    return {'index': index, 'success': False, 'error': {'message': message, 'code': code}}
+
+
+def is_duplicate_code_error(error):
+    """Tell whether `error` is a write refused by the unique material code"""
+    return isinstance(error, psycopg2.IntegrityError) and getattr(error.diag, 'constraint_name', None) == CODE_CONSTRAINT
+
+
+def error_message(error):
+    """The message of `error` to send to clients, database errors carry SQL and are not sent"""
+    if is_duplicate_code_error(error):
+        return "Material code already exists"
+    if isinstance(error, psycopg2.Error):
+        return "Database error"
+    return str(error)
+
+
+def _abort_pending(results, pending):
+    """Mark the valid items of an atomic batch that is not applied"""
+    for entry in pending:
+        results[entry[0]] = _failure(entry[0], "Batch aborted because of invalid items", "BATCH_ABORTED")
+    return results
+
+
+def _apply(env, pending, operation, results, atomic):
+    """
+    Run `operation` on all pending entries at once, inside a savepoint
+
+    In best effort mode a failing batch is replayed entry by entry so that
+    only the faulty entries are reported, atomic batches propagate the error.
+    """
+    try:
+        with env.cr.savepoint():
+            operation(pending)
+        return results
+    except Exception as e:
+        if atomic:
+            raise
+        _logger.info("Batch operation failed, isolating faulty items: %s", e)
+    for entry in pending:
+        try:
+            with env.cr.savepoint():
+                operation([entry])
+        except Exception as e:
+            code = "DUPLICATE_CODE" if is_duplicate_code_error(e) else "ITEM_ERROR"
+            results[entry[0]] = _failure(entry[0], error_message(e), code)
+    return results
+
+
+def _check_codes(env, pending, results, upsert=False):
+    """
+    Reject the items whose `material_code` repeats an earlier item of the
+    batch or belongs to another material, existing codes are found with one
+    query. Upserts update the material of an existing code instead.
+    Update entries carry the id of their material as second element.
+    """
+    seen = set()
+    valid = []
+    for entry in pending:
+        code = entry[-1].get('material_code')
+        if code in seen:
+            results[entry[0]] = _failure(entry[0], f"Material code {code} appears more than once", "DUPLICATE_CODE")
+            continue
+        if code is not None:
+            seen.add(code)
+        valid.append(entry)
+    if upsert:
+        return valid
+    # codes are unique across companies and record rules, look at all of them
+    existing = resolve_codes(env(su=True), seen)
+    pending = []
+    for entry in valid:
+        code = entry[-1].get('material_code')
+        owner_id = existing.get(code)
+        if owner_id and (len(entry) < 3 or owner_id != entry[1]):
+            results[entry[0]] = _failure(entry[0], f"Material code {code} already exists", "DUPLICATE_CODE")
+        else:
+            pending.append(entry)
+    return pending
+
+
+def resolve_codes(env, codes):
+    """Map material codes to the id of their material, with one query, unknown codes are left out"""
+    if not codes:
+        return {}
+    rows = env['material.register'].search_read([('material_code', 'in', list(codes))], ['material_code'])
+    return {row['material_code']: row['id'] for row in rows}
+
+
+def batch_create(env, items, atomic=True, upsert=False):
+    """
+    Validate then create `items` with a single multi-record `create()`
+
+    Items whose `material_code` already exists are rejected, with `upsert`
+    they update that material instead. Returns the per-item results, in the order of `items`.
+    """
+    results = [None] * len(items)
+    pending = []
+    for index, (values, error) in enumerate(validate_material_payloads(env, items)):
+        if error is not None:
+            results[index] = _failure(index, str(error), error.code)
+        else:
+            pending.append((index, values))
+    pending = _check_codes(env, pending, results, upsert=upsert)
+    if atomic and len(pending) < len(items):
+        return _abort_pending(results, pending)
+
+    def create(entries):
+        existing = resolve_codes(env, [values['material_code'] for _index, values in entries]) if upsert else {}
+        new_entries = [entry for entry in entries if entry[1]['material_code'] not in existing]
+        records = env['material.register'].create([values for _index, values in new_entries])
+        for (index, _values), record in zip(new_entries, records):
+            results[index] = _success(index, record.id)
+            if upsert:
+                results[index]['created'] = True
+        for index, values in entries:
+            if values['material_code'] in existing:
+                record_id = existing[values['material_code']]
+                env['material.register'].browse(record_id).write(values)
+                results[index] = dict(_success(index, record_id), created=False)
+
+    return _apply(env, pending, create, results, atomic)
+
+
+def batch_update(env, items, atomic=True):
+    """
+    Validate then update `items`, each one carrying the `id` of the material to write
+
+    Items sharing the same values are written with one `write()` on all of
+    their records. Returns the per-item results, in the order of `items`.
+    """
+    results = [None] * len(items)
+    candidates = []
+    seen_ids = set()
+    for index, item in enumerate(items):
+        record_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(record_id, int) or isinstance(record_id, bool) or record_id <= 0:
+            results[index] = _failure(index, "Each item requires a material 'id'", "MISSING_ID")
+            continue
+        if record_id in seen_ids:
+            results[index] = _failure(index, f"Material with ID {record_id} appears more than once", "DUPLICATE_ID")
+            continue
+        seen_ids.add(record_id)
+        candidates.append((index, record_id, item))
+
+    pending = []
+    checked = validate_material_payloads(env, [item for _index, _record_id, item in candidates], partial=True)
+    for (index, record_id, _item), (values, error) in zip(candidates, checked):
+        if error is not None:
+            results[index] = _failure(index, str(error), error.code)
+        elif not values:
+            results[index] = _failure(index, "No fields to update provided", "NO_UPDATE_DATA")
+        else:
+            pending.append((index, record_id, values))
+
+    existing_ids = set(env['material.register'].browse([entry[1] for entry in pending]).exists().ids)
+    for entry in [entry for entry in pending if entry[1] not in existing_ids]:
+        results[entry[0]] = _failure(entry[0], f"Material with ID {entry[1]} not found", "MATERIAL_NOT_FOUND")
+    pending = _check_codes(env, [entry for entry in pending if entry[1] in existing_ids], results)
+    if atomic and len(pending) < len(items):
+        return _abort_pending(results, pending)
+
+    def write(entries):
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[json.dumps(entry[2], sort_keys=True, default=str)].append(entry)
+        for group in groups.values():
+            env['material.register'].browse([entry[1] for entry in group]).write(group[0][2])
+        for index, record_id, _values in entries:
+            results[index] = _success(index, record_id)
+
+    return _apply(env, pending, write, results, atomic)
+
+
+def batch_delete(env, ids, atomic=True):
+    """
+    Delete the materials `ids` with a single `unlink()`
+    Returns the per-item results, in the order of `ids`
+    """
+    results = [None] * len(ids)
+    pending = []
+    for index, record_id in enumerate(ids):
+        if not isinstance(record_id, int) or isinstance(record_id, bool) or record_id <= 0:
+            results[index] = _failure(index, f"Invalid material ID {record_id}", "MISSING_ID")
+        else:
+            pending.append((index, record_id))
+
+    existing_ids = set(env['material.register'].browse([entry[1] for entry in pending]).exists().ids)
+    for index, record_id in pending:
+        if record_id not in existing_ids:
+            results[index] = _failure(index, f"Material with ID {record_id} not found", "MATERIAL_NOT_FOUND")
+    pending = [entry for entry in pending if entry[1] in existing_ids]
+    if atomic and len(pending) < len(ids):
+        return _abort_pending(results, pending)
+
+    def unlink(entries):
+        env['material.register'].browse([record_id for _index, record_id in entries]).unlink()
+        for index, record_id in entries:
+            results[index] = _success(index, record_id)
+
+    return _apply(env, pending, unlink, results, atomic)
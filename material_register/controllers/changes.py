@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+from datetime import timedelta
+
+from odoo import fields
+
+from .serializers import serialize_records
+
+FEED_DEFAULT_LIMIT = 500
+FEED_MAX_LIMIT = 5000
+
+
+class InvalidChangeToken(ValueError):
+    """Raised when a change token is malformed or too old to resume from"""
+
+    def __init__(self, message, code):
+        super(InvalidChangeToken, self).__init__(message)
+        self.code = code
+
+
+def encode_token(position):
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """Return the feed position {'m': key, 't': key, 'at': read date} stored in `token`"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not fields.Datetime.to_datetime(position['at']):
+            raise ValueError('at')
+        for stream in ('m', 't'):
+            key = position[stream]
+            if key is not None and (not isinstance(key, list) or len(key) != 2
+                                    or not all(isinstance(part, int) for part in key)):
+                raise ValueError(stream)
+    except (ValueError, TypeError, KeyError):
+        raise InvalidChangeToken("Malformed change token", "INVALID_CHANGE_TOKEN")
+    return position
+
+
+def _check_retention(env, position):
+    """Tombstones older than the retention are purged, resuming from there would miss deletions"""
+    retention = env['material.register.tombstone']._retention_days()
+    horizon = fields.Datetime.now() - timedelta(days=retention)
+    if fields.Datetime.to_datetime(position['at']) < horizon:
+        raise InvalidChangeToken(
+            f"Change token is older than {retention} days, a full resync is required", "CHANGE_TOKEN_EXPIRED")
+
+
+def feed_watermark(cr):
+    """
+    The oldest transaction still running when the snapshot of `cr` was taken
+    Every transaction below it has ended, no row can be committed with a
+    lower change_txid anymore.
+    """
+    cr.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+    return cr.fetchone()[0]
+
+
+def _read_stream(model, date_column, key, watermark, limit):
+    """Rows of `model` changed after `key` and before `watermark`, as (txid, id, date) by change order"""
+    model.check_access_rights('read')
+    query = model._where_calc([])
+    model._apply_ir_rules(query, 'read')
+    from_clause, where_clause, where_params = query.get_sql()
+    table = f'"{model._table}"'
+    conditions = [f'{table}.change_txid < %s']
+    params = [watermark]
+    if key:
+        conditions.append(f'({table}.change_txid, {table}.id) > (%s, %s)')
+        params += key
+    if where_clause:
+        conditions.append(where_clause)
+        params += where_params
+    model.env.cr.execute(f"""
+        SELECT {table}.change_txid, {table}.id, {table}.{date_column}
+          FROM {from_clause}
+         WHERE {' AND '.join(conditions)}
+         ORDER BY {table}.change_txid, {table}.id
+         LIMIT %s
+    """, params + [limit])
+    return model.env.cr.fetchall()
+
+
+def read_changes(env, since=None, limit=FEED_DEFAULT_LIMIT, spec=None):
+    """
+    Read the material changes that happened after the position of `since`
+
+    Upserts come from material.register, deletions from the tombstones, both
+    ordered by (change_txid, id): the id of the transaction that last wrote
+    the row, set by the write path. Only rows written by transactions below
+    the feed watermark are returned, so a long transaction committing late
+    cannot land behind a token already handed out, it holds the feed back
+    until it ends instead. Both streams are read with keyset conditions and
+    merged, so a call costs O(changes returned).
+    Returns (events, next_token, has_more).
+    """
+    position = decode_token(since) if since else {'m': None, 't': None}
+    if since:
+        _check_retention(env, position)
+    Material = env['material.register']
+    Tombstone = env['material.register.tombstone']
+    Material.flush()
+    watermark = feed_watermark(env.cr)
+
+    merged = sorted(
+        [(txid, 0, record_id, changed_at, 'upsert')
+         for txid, record_id, changed_at in _read_stream(Material, 'write_date', position['m'], watermark, limit + 1)]
+        + [(txid, 1, record_id, changed_at, 'delete')
+           for txid, record_id, changed_at in _read_stream(Tombstone, 'deleted_date', position['t'], watermark, limit + 1)]
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    upsert_ids = [entry[2] for entry in merged if entry[4] == 'upsert']
+    payloads = {data['id']: data for data in serialize_records(Material.browse(upsert_ids), spec)} if spec else {}
+    deleted = {row['id']: row for row in Tombstone.browse(
+        [entry[2] for entry in merged if entry[4] == 'delete']).read(['material_id', 'material_code'], load=None)}
+
+    events = []
+    for txid, _rank, record_id, changed_at, operation in merged:
+        if operation == 'upsert':
+            position['m'] = [txid, record_id]
+            events.append({
+                'op': 'upsert',
+                'id': record_id,
+                'changed_at': changed_at.isoformat(),
+                'material': payloads.get(record_id),
+            })
+        else:
+            position['t'] = [txid, record_id]
+            events.append({
+                'op': 'delete',
+                'id': deleted[record_id]['material_id'],
+                'changed_at': changed_at.isoformat(),
+                'material_code': deleted[record_id]['material_code'],
+            })
+    if not has_more:
+        # every change below the watermark was returned, move both streams up to it
+        position = {'m': [watermark, 0], 't': [watermark, 0]}
+    position['at'] = fields.Datetime.to_string(fields.Datetime.now())
+    return events, encode_token(position), has_more
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import logging
+import zlib
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies fit in a packet or two, compressing them only costs CPU
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# Brotli quality 5 compresses better than gzip 6 at a similar speed, 11 is far too slow for live responses
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/csv')
+
+
+def available_encodings():
+    """Encodings this server can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(httprequest):
+    """The content coding to answer `httprequest` with, None for identity"""
+    return httprequest.accept_encodings.best_match(available_encodings())
+
+
+def _gzip_compressor():
+    # wbits 31 writes the gzip header and trailer around the deflate stream
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = _gzip_compressor()
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """
+    Compress a streamed body chunk by chunk, the streamed rows are never
+    held in memory at once. Chunks the compressor buffers yield nothing.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = _gzip_compressor()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response, httprequest):
+    """
+    Compress a buffered API response when the client accepts it and the body
+    is large enough, streamed responses compress their own chunks
+    """
+    if response.is_streamed or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(httprequest)
+    data = response.get_data()
+    if not encoding or len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    response.set_data(compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        # the encoded bytes differ, the validator still holds for the representation
+        response.headers['ETag'] = f'W/{etag}'
+    return response
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+from werkzeug.http import http_date, parse_date
+
+from .auth import add_response_header, set_response_status
+from .serializers import Relation
+
+# Fields updated in SQL without touching write_date, with the column dating their last change
+DERIVED_FIELD_DATES = {'material_buy_price_company': 'company_price_date'}
+
+
+def _related_freshness_sql(model, relations):
+    """
+    Scalar subqueries returning the latest write_date of the expanded
+    relations of the rows in the `matched` CTE
+    """
+    columns = []
+    for relation in relations:
+        if not isinstance(relation, Relation) or not relation.subfields:
+            continue
+        comodel = model.env[model._fields[relation.field].comodel_name]
+        if comodel._name == 'res.users':
+            # user names live on their partner
+            columns.append(
+                f'(SELECT max(p.write_date) FROM "res_users" u JOIN "res_partner" p ON p.id = u.partner_id'
+                f' WHERE u.id IN (SELECT "{relation.field}" FROM matched))')
+        else:
+            columns.append(
+                f'(SELECT max(write_date) FROM "{comodel._table}"'
+                f' WHERE id IN (SELECT "{relation.field}" FROM matched))')
+    return columns
+
+
+def compute_freshness(model, domain, spec):
+    """
+    Return (count, last_modified) of the rows matching `domain`, with the
+    record rules of the current user applied, in a single query
+
+    last_modified also covers the comodels expanded by `spec`, so renaming
+    a partner or a currency invalidates the representation, and the derived
+    fields of DERIVED_FIELD_DATES it contains. No record is loaded in the
+    ORM cache.
+    """
+    model.check_access_rights('read')
+    query = model._where_calc(domain)
+    model._apply_ir_rules(query, 'read')
+    from_clause, where_clause, where_params = query.get_sql()
+    relation_fields = [entry.field for entry in spec if isinstance(entry, Relation) and entry.subfields]
+    dates = [f'"{model._table}".write_date'] + [
+        f'"{model._table}"."{column}"' for field, column in DERIVED_FIELD_DATES.items()
+        if field in spec and field in model._fields]
+    selected = ', '.join(
+        [f'"{model._table}".id', f'greatest({", ".join(dates)}) AS write_date']
+        + [f'"{model._table}"."{field}"' for field in dict.fromkeys(relation_fields)])
+    freshness = ['max(write_date)'] + _related_freshness_sql(model, spec)
+    model.env.cr.execute(
+        f'WITH matched AS (SELECT {selected} FROM {from_clause} WHERE {where_clause or "TRUE"})'
+        f' SELECT count(*), {", ".join(freshness)} FROM matched',
+        where_params)
+    row = model.env.cr.fetchone()
+    dates = [value for value in row[1:] if value]
+    return row[0], max(dates) if dates else None
+
+
+def compute_etag(*parts):
+    """Weak entity tag from the JSON representation of `parts`"""
+    raw = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return 'W/"%s"' % hashlib.sha1(raw).hexdigest()
+
+
+def spec_signature(spec):
+    """Hashable description of a serializer spec, part of the entity tag"""
+    return [
+        [entry.key, entry.field, list(entry.subfields)] if isinstance(entry, Relation) else entry
+        for entry in spec
+    ]
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # weak comparison, ignore the W/ prefix on both sides
+    candidates = [tag.strip() for tag in header.split(',')]
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any((tag[2:] if tag.startswith('W/') else tag) == bare for tag in candidates)
+
+
+def check_not_modified(httprequest, etag, last_modified):
+    """
+    Set the validators of the current response and tell whether the client
+    copy is still fresh, in which case the response status becomes 304
+    If-None-Match takes precedence over If-Modified-Since (RFC 7232), without
+    `last_modified` (lists) only If-None-Match can answer 304
+    """
+    add_response_header('ETag', etag)
+    add_response_header('Cache-Control', 'private, no-cache')
+    if last_modified:
+        add_response_header('Last-Modified', http_date(last_modified))
+
+    if_none_match = httprequest.headers.get('If-None-Match')
+    if if_none_match:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        since = parse_date(httprequest.headers.get('If-Modified-Since'))
+        fresh = bool(since and last_modified and last_modified.replace(microsecond=0) <= since.replace(tzinfo=None))
+    if fresh:
+        set_response_status(304)
+    return fresh
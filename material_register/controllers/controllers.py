@@ -2,15 +2,47 @@
 from odoo import http
 from odoo.http import request, Response
 import json
+import math
 import base64
 import werkzeug.wrappers
 import logging
 from functools import wraps
 from datetime import datetime
-from .auth import authenticate_api, invalid_response, valid_response
+from .auth import authenticate_api, charge_api_quota, http_response, instrument_api, invalid_response, valid_response
+from .auth_cache import auth_cache
+from .instrumentation import api_metrics, timing_phase
+from .pagination import (
+    DEFAULT_CURSOR_LIMIT, DEFAULT_ORDER, InvalidCursor, clamp_limit, parse_bool, search_page,
+)
+from .serializers import (
+    MATERIAL_CREATE_SPEC, MATERIAL_DETAIL_SPEC, MATERIAL_LIST_SPEC, MATERIAL_UPDATE_SPEC, PARTNER_SUMMARY_SPEC,
+    InvalidFieldset, compact_records, parse_list_param, parse_wire_format, restrict_spec, serialize_record,
+    serialize_records,
+)
+from .validation import MaterialValidationError, validate_material_values
+from .batch import (
+    BATCH_MAX_SIZE, audit_untracked_batch, batch_create, batch_delete, batch_update, error_message,
+    is_duplicate_code_error, parse_batch_request, parse_tracking_mode, resolve_codes, untracked_env,
+)
+from .envelope import parse_envelope, run_operations
+from .export import EXPORT_FORMATS, iter_export
+from .imports import IMPORT_MAX_SIZE, IMPORT_MULTIPART_OVERHEAD, InvalidImportFile, detect_import_format
+from .changes import FEED_DEFAULT_LIMIT, FEED_MAX_LIMIT, InvalidChangeToken, read_changes
+from .stats import InvalidStatsRequest, material_stats
+from .search import SEARCH_DEFAULT_LIMIT, search_materials
+from .compression import compress_stream, negotiate_encoding
+from .conditional import check_not_modified, compute_etag, compute_freshness, spec_signature
+from .list_cache import LIST_CACHE_MAX_ROWS, current_generation, list_cache
+from .rate_limit import rate_limiter
+from .images import (
+    IMAGE_IMMUTABLE_MAX_AGE, InvalidImageRequest, check_image_size, image_attachments, prefetch_images,
+    readable_material_ids,
+)
 
 _logger = logging.getLogger(__name__)
 
+PARTNER_SUMMARY_ORDERS = ('material_count desc', 'price_total desc', 'latest_buy_price desc', 'partner_id', 'id')
+
 
 def serialize_date(dt):
     """Convert datetime to string format"""
@@ -24,6 +56,72 @@ def serialize_object(obj):
     return str(obj)
 
 
+def build_material_domain(params):
+    """Build the search domain of the filters shared by the list endpoints"""
+    domain = []
+    
+    # Add filters based on request parameters
+    if params.get('material_code'):
+        domain.append(('material_code', 'ilike', params.get('material_code')))
+        
+    if params.get('name'):
+        domain.append(('name', 'ilike', params.get('name')))
+        
+    if params.get('material_type'):
+        domain.append(('material_type', '=', params.get('material_type')))
+    
+    # Price bounds apply to the price converted to the currency of the price company
+    # (material.register `_price_company`, the same for every user), an indexed column
+    for param, operator in (('price_min', '>='), ('price_max', '<=')):
+        if params.get(param) not in (None, ''):
+            try:
+                bound = float(params[param])
+            except (TypeError, ValueError):
+                raise MaterialValidationError(f"{param} must be a number", "INVALID_PRICE_FILTER")
+            if not math.isfinite(bound):
+                raise MaterialValidationError(f"{param} must be a finite number", "INVALID_PRICE_FILTER")
+            domain.append(('material_buy_price_company', operator, bound))
+    
+    return domain
+
+
+def duplicate_code_response(code):
+    """Response of a single write refused because `code` belongs to another material"""
+    return invalid_response(
+        message=f"Material code {code} already exists",
+        code="DUPLICATE_CODE",
+        status=409
+    )
+
+
+def code_owner(code):
+    """Id of the material using `code`, whatever the record rules, or None"""
+    return resolve_codes(request.env(su=True), [code]).get(code)
+
+
+def batch_response(results, atomic, action):
+    """Build the response of a batch endpoint from its per-item results"""
+    failed = [result for result in results if not result['success']]
+    meta = {
+        'mode': 'atomic' if atomic else 'best_effort',
+        'total': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed)
+    }
+    if atomic and failed:
+        return invalid_response(
+            message=f"Batch rejected, no material {action}: {len(failed)} invalid item(s)",
+            code="BATCH_VALIDATION_ERROR",
+            status=400,
+            details=results
+        )
+    return valid_response(
+        data=results,
+        message=f"{meta['succeeded']} material(s) {action}, {meta['failed']} failed",
+        meta=meta
+    )
+
+
 class MaterialRegisterAPI(http.Controller):
     """
     RESTful API for Material Register
@@ -31,66 +129,142 @@ class MaterialRegisterAPI(http.Controller):
     """
     
     @http.route('/api/v1/materials', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
     @authenticate_api
     def get_materials(self, **kwargs):
         """
         Get all materials with optional filtering
+        `format=compact` returns columnar arrays with the referenced currencies and partners listed once
         """
         _logger.info("Fetching materials with parameters: %s", kwargs)
         try:
+            # Passing a `cursor` key (null for the first page) switches to keyset pagination
+            cursor_mode = 'cursor' in kwargs
+
             # Parse pagination parameters
-            limit = int(kwargs.get('limit', 0))
+            limit = int(kwargs.get('limit', DEFAULT_CURSOR_LIMIT if cursor_mode else 0))
             offset = int(kwargs.get('offset', 0))
-            order = kwargs.get('order', 'id desc')
-            
+            order = kwargs.get('order', DEFAULT_ORDER)
+            with_count = parse_bool(kwargs.get('with_count'), default=not cursor_mode)
+
+            # Sparse fieldset, unrequested columns and relations are never read
+            try:
+                spec = restrict_spec(
+                    MATERIAL_LIST_SPEC,
+                    fields=parse_list_param(kwargs.get('fields')),
+                    expand=parse_list_param(kwargs.get('expand')))
+            except InvalidFieldset as e:
+                return invalid_response(
+                    message=str(e),
+                    code="INVALID_FIELDS",
+                    status=400
+                )
+
+            # Opt-in columnar payload, referenced currencies and partners are sent once
+            try:
+                compact = parse_wire_format(kwargs.get('format'))
+            except InvalidFieldset as e:
+                return invalid_response(message=str(e), code="INVALID_FORMAT", status=400)
+            signature = spec_signature(spec) + (':compact' if compact else '')
+
             # Build filter domain
-            domain = []
-            
-            # Add filters based on request parameters
-            if kwargs.get('material_code'):
-                domain.append(('material_code', 'ilike', kwargs.get('material_code')))
-                
-            if kwargs.get('name'):
-                domain.append(('name', 'ilike', kwargs.get('name')))
-                
-            if kwargs.get('material_type'):
-                domain.append(('material_type', '=', kwargs.get('material_type')))
-            
-            # Get total count for pagination info
-            total_count = request.env['material.register'].search_count(domain)
+            try:
+                domain = build_material_domain(kwargs)
+            except MaterialValidationError as e:
+                return invalid_response(message=str(e), code=e.code, status=400)
             
+            if cursor_mode and limit <= 0:
+                return invalid_response(
+                    message="Cursor pagination requires a positive limit",
+                    code="INVALID_LIMIT",
+                    status=400
+                )
+            # No limit or a larger one is served as one page of the maximum size, see meta.has_more
+            limit = clamp_limit(limit)
+
+            # Pages are served from the list cache until a material, a listed partner or currency changes
+            cache_key = None
+            if list_cache.enabled and 0 < limit <= LIST_CACHE_MAX_ROWS:
+                with timing_phase('cache'):
+                    generation = current_generation(request.env)
+                    cache_key = list_cache.key(
+                        request.env.cr.dbname, request.uid, request.env.context.get('allowed_company_ids'),
+                        domain, ' '.join(order.split()), limit, offset, cursor_mode, kwargs.get('cursor'),
+                        with_count, signature)
+                    page = list_cache.get(cache_key, generation)
+                if page is not None:
+                    material_list, meta, etag = page
+                    if check_not_modified(request.httprequest, etag, None):
+                        return valid_response(data=None, message="Materials not modified")
+                    return valid_response(
+                        data=material_list,
+                        message="Materials retrieved successfully",
+                        meta=dict(meta)
+                    )
+
+            # Get total count for pagination info, only when asked for
+            with timing_phase('count'):
+                total_count = request.env['material.register'].search_count(domain) if with_count else None
+
             # Fetch materials with pagination
-            materials = request.env['material.register'].search(domain, limit=limit, offset=offset, order=order)
+            next_cursor = None
+            with timing_phase('search'):
+                if cursor_mode:
+                    try:
+                        materials, next_cursor = search_page(
+                            request.env['material.register'], domain,
+                            order=order, limit=limit, cursor=kwargs.get('cursor'))
+                    except InvalidCursor as e:
+                        return invalid_response(
+                            message=str(e),
+                            code="INVALID_CURSOR",
+                            status=400
+                        )
+                    has_more = bool(next_cursor)
+                elif total_count is None and limit:
+                    # Read one extra row to know whether another page exists without counting
+                    materials = request.env['material.register'].search(domain, limit=limit + 1, offset=offset, order=order)
+                    has_more = len(materials) > limit
+                    materials = materials[:limit]
+                else:
+                    materials = request.env['material.register'].search(domain, limit=limit, offset=offset, order=order)
+                    has_more = total_count is not None and (offset + len(materials)) < total_count
+
+            # Conditional request, answered before reading or serializing any row
+            with timing_phase('freshness'):
+                _count, last_modified = compute_freshness(
+                    request.env['material.register'], [('id', 'in', materials.ids)], spec)
+            etag = compute_etag(
+                request.uid, materials.ids, total_count, has_more, next_cursor,
+                signature, last_modified)
+            # No Last-Modified on lists: the dates of the rows still listed do not
+            # move when a row is deleted or leaves the page, only the ETag covers that
+            if check_not_modified(request.httprequest, etag, None):
+                return valid_response(data=None, message="Materials not modified")
             
             # Prepare response data
-            material_list = []
-            for material in materials:
-                material_list.append({
-                    'id': material.id,
-                    'material_code': material.material_code,
-                    'name': material.name,
-                    'material_type': material.material_type,
-                    'material_buy_price': float(material.material_buy_price),
-                    'currency': {
-                        'id': material.currency_id.id,
-                        'name': material.currency_id.name,
-                        'symbol': material.currency_id.symbol
-                    },
-                    'partner': {
-                        'id': material.partner_id.id,
-                        'name': material.partner_id.name
-                    },
-                    'create_date': serialize_date(material.create_date),
-                    'write_date': serialize_date(material.write_date),
-                })
+            with timing_phase('serialize'):
+                material_list = serialize_records(materials, spec)
+                if compact:
+                    material_list = compact_records(material_list, spec)
             
             # Prepare metadata for pagination
-            meta = {
-                'total_count': total_count,
-                'offset': offset,
-                'limit': limit,
-                'has_more': (offset + len(material_list)) < total_count
-            }
+            if cursor_mode:
+                meta = {
+                    'limit': limit,
+                    'next_cursor': next_cursor,
+                    'has_more': has_more
+                }
+            else:
+                meta = {
+                    'offset': offset,
+                    'limit': limit,
+                    'has_more': has_more
+                }
+            if total_count is not None:
+                meta['total_count'] = total_count
+            if cache_key:
+                list_cache.set(cache_key, (material_list, dict(meta), etag), generation)
             
             return valid_response(
                 data=material_list,
@@ -105,50 +279,381 @@ class MaterialRegisterAPI(http.Controller):
                 status=500
             )
     
+    @http.route('/api/v1/materials/export', type='http', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def export_materials(self, **kwargs):
+        """
+        Stream every material matching the filters as NDJSON (default) or CSV
+        The stream is gzip or brotli encoded when the client accepts it
+        """
+        _logger.info("Exporting materials with parameters: %s", kwargs)
+        export_format = kwargs.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return http_response(invalid_response(
+                message=f"Invalid export format. Allowed values: {', '.join(EXPORT_FORMATS)}",
+                code="INVALID_EXPORT_FORMAT",
+                status=400
+            ), status=400)
+        try:
+            spec = restrict_spec(
+                MATERIAL_LIST_SPEC,
+                fields=parse_list_param(kwargs.get('fields')),
+                expand=parse_list_param(kwargs.get('expand')))
+        except InvalidFieldset as e:
+            return http_response(invalid_response(
+                message=str(e),
+                code="INVALID_FIELDS",
+                status=400
+            ), status=400)
+        
+        try:
+            domain = build_material_domain(kwargs)
+        except MaterialValidationError as e:
+            return http_response(invalid_response(message=str(e), code=e.code, status=400), status=400)
+        
+        rows = iter_export(
+            request.env.cr.dbname, request.uid, dict(request.env.context),
+            domain, spec, export_format=export_format)
+        filename = f"materials.{'csv' if export_format == 'csv' else 'ndjson'}"
+        headers = [
+            ('Content-Type', EXPORT_FORMATS[export_format]),
+            ('Content-Disposition', f'attachment; filename="{filename}"'),
+            ('Cache-Control', 'no-store'),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        encoding = negotiate_encoding(request.httprequest)
+        if encoding:
+            rows = compress_stream(rows, encoding)
+            headers.append(('Content-Encoding', encoding))
+        return Response(rows, headers=headers, direct_passthrough=True)
+    
+    @http.route('/api/v1/materials/changes', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def get_material_changes(self, **kwargs):
+        """
+        Get the materials created, updated or deleted since a change token
+        Omit `since` for a full initial sync, then pass back `meta.next_token`
+        """
+        try:
+            limit = min(int(kwargs.get('limit') or FEED_DEFAULT_LIMIT), FEED_MAX_LIMIT)
+            if limit <= 0:
+                return invalid_response(
+                    message="Limit must be positive",
+                    code="INVALID_LIMIT",
+                    status=400
+                )
+            try:
+                spec = restrict_spec(
+                    MATERIAL_LIST_SPEC,
+                    fields=parse_list_param(kwargs.get('fields')),
+                    expand=parse_list_param(kwargs.get('expand')))
+                events, next_token, has_more = read_changes(
+                    request.env, since=kwargs.get('since'), limit=limit, spec=spec)
+            except InvalidFieldset as e:
+                return invalid_response(message=str(e), code="INVALID_FIELDS", status=400)
+            except InvalidChangeToken as e:
+                return invalid_response(message=str(e), code=e.code, status=410 if e.code == "CHANGE_TOKEN_EXPIRED" else 400)
+            
+            return valid_response(
+                data=events,
+                message="Material changes retrieved successfully",
+                meta={
+                    'next_token': next_token,
+                    'has_more': has_more,
+                    'limit': limit
+                }
+            )
+        except Exception as e:
+            _logger.exception("Error fetching material changes")
+            return invalid_response(
+                message="Failed to retrieve material changes",
+                code="MATERIAL_CHANGES_ERROR",
+                status=500
+            )
+    
+    @http.route('/api/v1/materials/stats', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def get_material_stats(self, **kwargs):
+        """
+        Get material count and buy price aggregates grouped by type, partner or currency
+        """
+        try:
+            group_by = kwargs.get('group_by') or 'material_type'
+            convert = parse_bool(kwargs.get('convert'))
+            try:
+                with timing_phase('aggregate'):
+                    stats = material_stats(request.env, build_material_domain(kwargs), group_by=group_by, convert=convert)
+            except InvalidStatsRequest as e:
+                return invalid_response(message=str(e), code="INVALID_STATS_REQUEST", status=400)
+            except MaterialValidationError as e:
+                return invalid_response(message=str(e), code=e.code, status=400)
+            
+            return valid_response(
+                data=stats,
+                message="Material statistics retrieved successfully",
+                meta={
+                    'group_by': group_by,
+                    'converted': convert
+                }
+            )
+        except Exception as e:
+            _logger.exception("Error computing material statistics")
+            return invalid_response(
+                message="Failed to compute material statistics",
+                code="MATERIAL_STATS_ERROR",
+                status=500
+            )
+    
+    @http.route('/api/v1/materials/search', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def get_material_search(self, **kwargs):
+        """
+        Full-text search over code, name, type and partner name, best matches first
+        Expects `q`, accepts the filters of the list endpoint, `limit`, `cursor`, `fields`, `expand` and `format`
+        """
+        try:
+            compact = parse_wire_format(kwargs.get('format'))
+        except InvalidFieldset as e:
+            return invalid_response(message=str(e), code="INVALID_FORMAT", status=400)
+        try:
+            try:
+                limit = int(kwargs.get('limit') or SEARCH_DEFAULT_LIMIT)
+                spec = restrict_spec(
+                    MATERIAL_LIST_SPEC,
+                    fields=parse_list_param(kwargs.get('fields')),
+                    expand=parse_list_param(kwargs.get('expand')))
+                domain = build_material_domain(kwargs)
+                with timing_phase('search'):
+                    materials, ranks, next_cursor = search_materials(
+                        request.env, kwargs.get('q'), domain=domain, limit=limit, cursor=kwargs.get('cursor'))
+            except ValueError as e:
+                code = getattr(e, 'code', None) or ("INVALID_FIELDS" if isinstance(e, InvalidFieldset) else "INVALID_SEARCH")
+                return invalid_response(message=str(e), code=code, status=400)
+
+            with timing_phase('serialize'):
+                material_list = serialize_records(materials, spec)
+                for item in material_list:
+                    item['score'] = ranks[item['id']]
+                data = compact_records(material_list, spec + ('score',)) if compact else material_list
+
+            return valid_response(
+                data=data,
+                message="Materials found" if material_list else "No material matches the query",
+                meta={
+                    'limit': limit,
+                    'next_cursor': next_cursor,
+                    'has_more': bool(next_cursor)
+                }
+            )
+        except Exception as e:
+            _logger.exception("Error searching materials")
+            return invalid_response(
+                message="Failed to search materials",
+                code="MATERIAL_SEARCH_ERROR",
+                status=500
+            )
+
+    @http.route('/api/v1/materials/partner-summary', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def get_partner_summary(self, **kwargs):
+        """
+        Material count, total and latest buy price per partner and currency
+        Read from the maintained summary table, optional `partner_id` and `currency_id` filters
+        Material writes reach the table when the summary cron runs, triggered after their commit
+        """
+        try:
+            limit = clamp_limit(int(kwargs.get('limit', DEFAULT_CURSOR_LIMIT)))
+            offset = int(kwargs.get('offset', 0))
+            domain = []
+            for field in ('partner_id', 'currency_id'):
+                if kwargs.get(field):
+                    domain.append((field, '=', int(kwargs[field])))
+        except (TypeError, ValueError):
+            return invalid_response(
+                message="limit, offset, partner_id and currency_id must be integers",
+                code="INVALID_PARAMETER",
+                status=400
+            )
+        try:
+            compact = parse_wire_format(kwargs.get('format'))
+        except InvalidFieldset as e:
+            return invalid_response(message=str(e), code="INVALID_FORMAT", status=400)
+        order = kwargs.get('order', PARTNER_SUMMARY_ORDERS[0])
+        if order not in PARTNER_SUMMARY_ORDERS:
+            return invalid_response(
+                message=f"Invalid order. Allowed values: {', '.join(PARTNER_SUMMARY_ORDERS)}",
+                code="INVALID_ORDER",
+                status=400
+            )
+        try:
+            Summary = request.env['material.register.partner.summary']
+            with timing_phase('search'):
+                summaries = Summary.search(domain, limit=limit, offset=offset, order=order if order == 'id' else f'{order}, id')
+                total_count = Summary.search_count(domain) if parse_bool(kwargs.get('with_count')) else None
+            with timing_phase('serialize'):
+                data = serialize_records(summaries, PARTNER_SUMMARY_SPEC)
+                if compact:
+                    data = compact_records(data, PARTNER_SUMMARY_SPEC)
+            meta = {'offset': offset, 'limit': limit}
+            if total_count is not None:
+                meta['total_count'] = total_count
+            return valid_response(data=data, message="Partner summary retrieved successfully", meta=meta)
+        except Exception as e:
+            _logger.exception("Error fetching the partner summary")
+            return invalid_response(
+                message=f"Failed to retrieve the partner summary: {str(e)}",
+                code="PARTNER_SUMMARY_ERROR",
+                status=500
+            )
+    
+    @http.route('/api/v1/materials/images', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def prefetch_material_images(self, **kwargs):
+        """
+        Checksum keyed URLs of the images of many materials, `ids` and `size` (default 128)
+        With `inline` the thumbnails are returned base64 encoded as well
+        """
+        try:
+            ids = [int(material_id) for material_id in parse_list_param(kwargs.get('ids')) or []]
+            size = check_image_size(int(kwargs.get('size', 128)))
+            data = prefetch_images(request.env, ids, size, inline=parse_bool(kwargs.get('inline')))
+        except (TypeError, ValueError) as e:
+            return invalid_response(
+                message=str(e),
+                code=getattr(e, 'code', "INVALID_PARAMETER"),
+                status=400
+            )
+        return valid_response(data=data, meta={'size': size})
+    
+    @http.route('/api/v1/materials/<int:material_id>/image/<int:size>', type='http', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def get_material_image(self, material_id, size, **kwargs):
+        """
+        One precomputed variant of the image of a material
+        Requested with `unique=<checksum>` the response is cacheable for a year
+        """
+        try:
+            check_image_size(size)
+        except InvalidImageRequest as e:
+            return http_response(invalid_response(message=str(e), code=e.code, status=400), status=400)
+        attachment = None
+        if readable_material_ids(request.env, [material_id]):
+            attachment = image_attachments(request.env, [material_id], size).get(material_id)
+        if not attachment:
+            return http_response(invalid_response(
+                message=f"No image for material with ID {material_id}",
+                code="IMAGE_NOT_FOUND",
+                status=404
+            ), status=404)
+        
+        checksum = attachment['checksum']
+        if kwargs.get('unique') == checksum:
+            cache_control = f'private, max-age={IMAGE_IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            cache_control = 'private, no-cache'
+        headers = [('ETag', f'"{checksum}"'), ('Cache-Control', cache_control)]
+        if request.httprequest.if_none_match.contains(checksum):
+            return Response(status=304, headers=headers)
+        content = request.env['ir.attachment'].sudo().browse(attachment['id']).raw
+        return Response(content, headers=headers + [
+            ('Content-Type', attachment['mimetype'] or 'application/octet-stream'),
+            ('Content-Length', len(content)),
+        ])
+    
     @http.route('/api/v1/materials/<int:material_id>', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
     @authenticate_api
     def get_material(self, material_id, **kwargs):
         """
         Get a single material by ID
         """
+        return self._material_detail(material_id, kwargs)
+    
+    @http.route('/api/v1/materials/by-code/<string:code>', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def get_material_by_code(self, code, **kwargs):
+        """
+        Get a single material by its unique code, an exact match served by the unique index
+        """
+        with timing_phase('resolve'):
+            material_id = resolve_codes(request.env, [code]).get(code)
+        if not material_id:
+            return invalid_response(
+                message=f"Material with code {code} not found",
+                code="MATERIAL_NOT_FOUND",
+                status=404
+            )
+        return self._material_detail(material_id, kwargs)
+    
+    @http.route('/api/v1/materials/resolve', type='json', auth='none', methods=['GET', 'POST'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def resolve_material_codes(self, **kwargs):
+        """
+        Map many material codes to their ids with one query
+        Expects `codes` (array of codes), unknown codes map to null
+        """
+        codes = kwargs.get('codes')
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            return invalid_response(
+                message="'codes' must be an array of strings",
+                code="INVALID_CODES",
+                status=400
+            )
+        if len(codes) > BATCH_MAX_SIZE:
+            return invalid_response(
+                message=f"Too many codes: {len(codes)}, at most {BATCH_MAX_SIZE} allowed",
+                code="BATCH_TOO_LARGE",
+                status=400
+            )
+        with timing_phase('resolve'):
+            ids = resolve_codes(request.env, codes)
+        return valid_response(
+            data={code: ids.get(code) for code in codes},
+            meta={'total': len(codes), 'found': len(ids)}
+        )
+    
+    def _material_detail(self, material_id, kwargs):
+        """Response of the detail routes, with sparse fieldsets and conditional requests"""
         try:
+            try:
+                spec = restrict_spec(
+                    MATERIAL_DETAIL_SPEC,
+                    fields=parse_list_param(kwargs.get('fields')),
+                    expand=parse_list_param(kwargs.get('expand')))
+            except InvalidFieldset as e:
+                return invalid_response(
+                    message=str(e),
+                    code="INVALID_FIELDS",
+                    status=400
+                )
+
+            # Existence and freshness in one query, no record is read for a 304
             material = request.env['material.register'].browse(material_id)
-            if not material.exists():
+            with timing_phase('freshness'):
+                count, last_modified = compute_freshness(material, [('id', '=', material_id)], spec)
+            if not count:
                 return invalid_response(
                     message=f"Material with ID {material_id} not found",
                     code="MATERIAL_NOT_FOUND",
                     status=404
                 )
             
+            etag = compute_etag(request.uid, material_id, spec_signature(spec), last_modified)
+            if check_not_modified(request.httprequest, etag, last_modified):
+                return valid_response(data=None, message="Material not modified")
+            
             # Prepare response with detailed material information
-            material_data = {
-                'id': material.id,
-                'material_code': material.material_code,
-                'name': material.name,
-                'material_type': material.material_type,
-                'material_buy_price': float(material.material_buy_price),
-                'currency': {
-                    'id': material.currency_id.id,
-                    'name': material.currency_id.name,
-                    'symbol': material.currency_id.symbol
-                },
-                'partner': {
-                    'id': material.partner_id.id,
-                    'name': material.partner_id.name,
-                    'email': material.partner_id.email,
-                    'phone': material.partner_id.phone
-                },
-                'create_date': serialize_date(material.create_date),
-                'write_date': serialize_date(material.write_date),
-                'create_uid': {
-                    'id': material.create_uid.id,
-                    'name': material.create_uid.name
-                } if material.create_uid else None,
-                'write_uid': {
-                    'id': material.write_uid.id,
-                    'name': material.write_uid.name
-                } if material.write_uid else None
-            }
+            with timing_phase('serialize'):
+                material_data = serialize_record(material, spec)
             
             return valid_response(
                 data=material_data,
@@ -163,56 +668,44 @@ class MaterialRegisterAPI(http.Controller):
             )
     
     @http.route('/api/v1/materials', type='json', auth='none', methods=['POST'], csrf=False)
+    @instrument_api
     @authenticate_api
     def create_material(self, **kwargs):
         """
         Create a new material
+        With `upsert` the material of the same `material_code` is updated when it exists
         """
         try:
-            # Define required fields
-            required_fields = ['material_code', 'name', 'material_type', 'material_buy_price', 'partner_id']
-            
             # Get data from request - in JSON mode, all data is in kwargs
-            post_data = {}
-            for field in kwargs:
-                post_data[field] = kwargs[field]
-            
-            # Validate required fields
-            missing_fields = [field for field in required_fields if field not in post_data]
-            if missing_fields:
+            try:
+                with timing_phase('validate'):
+                    values = validate_material_values(request.env, kwargs)
+            except MaterialValidationError as e:
                 return invalid_response(
-                    message=f"Missing required fields: {', '.join(missing_fields)}",
-                    code="MISSING_REQUIRED_FIELDS",
+                    message=str(e),
+                    code=e.code,
                     status=400
                 )
             
-            # Validate material type
-            allowed_types = ['fabric', 'jeans', 'cotton']
-            if post_data.get('material_type') not in allowed_types:
-                return invalid_response(
-                    message=f"Invalid material type. Allowed values: {', '.join(allowed_types)}",
-                    code="INVALID_MATERIAL_TYPE",
-                    status=400
+            existing_id = code_owner(values['material_code'])
+            if existing_id and parse_bool(kwargs.get('upsert')):
+                material = request.env['material.register'].browse(existing_id)
+                with request.env.cr.savepoint():
+                    material.write(values)
+                return valid_response(
+                    data=serialize_record(material, MATERIAL_CREATE_SPEC),
+                    message=f"Material '{material.name}' updated successfully",
+                    meta={'created': False}
                 )
+            if existing_id:
+                return duplicate_code_response(values['material_code'])
             
-            # Create new material
-            new_material = request.env['material.register'].create({
-                'material_code': post_data.get('material_code'),
-                'name': post_data.get('name'),
-                'material_type': post_data.get('material_type'),
-                'material_buy_price': post_data.get('material_buy_price'),
-                'partner_id': post_data.get('partner_id')
-            })
+            # Create new material, a concurrent request may still take the code first
+            with request.env.cr.savepoint():
+                new_material = request.env['material.register'].create(values)
             
             # Prepare response data
-            response_data = {
-                'id': new_material.id,
-                'material_code': new_material.material_code,
-                'name': new_material.name,
-                'material_type': new_material.material_type,
-                'material_buy_price': float(new_material.material_buy_price),
-                'create_date': serialize_date(new_material.create_date)
-            }
+            response_data = serialize_record(new_material, MATERIAL_CREATE_SPEC)
             
             return valid_response(
                 data=response_data,
@@ -220,20 +713,35 @@ class MaterialRegisterAPI(http.Controller):
                 status=201
             )
         except Exception as e:
+            if is_duplicate_code_error(e):
+                return duplicate_code_response(kwargs.get('material_code'))
             _logger.exception("Error creating material")
             return invalid_response(
-                message=f"Failed to create material: {str(e)}",
+                message=f"Failed to create material: {error_message(e)}",
                 code="MATERIAL_CREATE_ERROR",
                 status=500
             )
     
     @http.route('/api/v1/materials/<int:material_id>', type='json', auth='none', methods=['PUT'], csrf=False)
+    @instrument_api
     @authenticate_api
     def update_material(self, material_id, **kwargs):
         """
         Update an existing material
         """
         try:
+            # Get data from request - in JSON mode, all data is in kwargs
+            # Malformed payloads and unknown partners or currencies are rejected before any ORM work
+            try:
+                with timing_phase('validate'):
+                    update_values = validate_material_values(request.env, kwargs, partial=True)
+            except MaterialValidationError as e:
+                return invalid_response(
+                    message=str(e),
+                    code=e.code,
+                    status=400
+                )
+            
             # Check if material exists
             material = request.env['material.register'].browse(material_id)
             if not material.exists():
@@ -243,52 +751,6 @@ class MaterialRegisterAPI(http.Controller):
                     status=404
                 )
             
-            # Get data from request - in JSON mode, all data is in kwargs
-            post_data = {}
-            for field in kwargs:
-                post_data[field] = kwargs[field]
-                
-            update_values = {}
-            
-            # Check which fields to update
-            if 'material_code' in post_data:
-                update_values['material_code'] = post_data.get('material_code')
-                
-            if 'name' in post_data:
-                update_values['name'] = post_data.get('name')
-                
-            if 'material_type' in post_data:
-                # Validate material type
-                allowed_types = ['fabric', 'jeans', 'cotton']
-                if post_data.get('material_type') not in allowed_types:
-                    return invalid_response(
-                        message=f"Invalid material type. Allowed values: {', '.join(allowed_types)}",
-                        code="INVALID_MATERIAL_TYPE",
-                        status=400
-                    )
-                update_values['material_type'] = post_data.get('material_type')
-                
-            if 'material_buy_price' in post_data:
-                # Validate price is positive
-                if float(post_data.get('material_buy_price', 0)) <= 0:
-                    return invalid_response(
-                        message="Material buy price must be positive",
-                        code="INVALID_PRICE",
-                        status=400
-                    )
-                update_values['material_buy_price'] = post_data.get('material_buy_price')
-                
-            if 'partner_id' in post_data:
-                # Validate partner exists
-                partner = request.env['res.partner'].browse(post_data.get('partner_id'))
-                if not partner.exists():
-                    return invalid_response(
-                        message=f"Partner with ID {post_data.get('partner_id')} not found",
-                        code="PARTNER_NOT_FOUND",
-                        status=400
-                    )
-                update_values['partner_id'] = post_data.get('partner_id')
-            
             # If no fields to update, return error
             if not update_values:
                 return invalid_response(
@@ -297,40 +759,33 @@ class MaterialRegisterAPI(http.Controller):
                     status=400
                 )
             
-            # Update material
-            material.write(update_values)
+            code = update_values.get('material_code')
+            if code and code_owner(code) not in (None, material_id):
+                return duplicate_code_response(code)
+            
+            # Update material, flushed inside the savepoint so a refused write is rolled back here
+            with request.env.cr.savepoint():
+                material.write(update_values)
             
             # Prepare response data
-            response_data = {
-                'id': material.id,
-                'material_code': material.material_code,
-                'name': material.name,
-                'material_type': material.material_type,
-                'material_buy_price': float(material.material_buy_price),
-                'partner': {
-                    'id': material.partner_id.id,
-                    'name': material.partner_id.name
-                },
-                'write_date': serialize_date(material.write_date),
-                'write_uid': {
-                    'id': material.write_uid.id,
-                    'name': material.write_uid.name
-                } if material.write_uid else None
-            }
+            response_data = serialize_record(material, MATERIAL_UPDATE_SPEC)
             
             return valid_response(
                 data=response_data,
                 message=f"Material '{material.name}' updated successfully"
             )
         except Exception as e:
+            if is_duplicate_code_error(e):
+                return duplicate_code_response(kwargs.get('material_code'))
             _logger.exception(f"Error updating material with ID {material_id}")
             return invalid_response(
-                message=f"Failed to update material: {str(e)}",
+                message=f"Failed to update material: {error_message(e)}",
                 code="MATERIAL_UPDATE_ERROR",
                 status=500
             )
     
     @http.route('/api/v1/materials/<int:material_id>', type='json', auth='none', methods=['DELETE'], csrf=False)
+    @instrument_api
     @authenticate_api
     def delete_material(self, material_id, **kwargs):
         """
@@ -370,3 +825,268 @@ class MaterialRegisterAPI(http.Controller):
                 code="MATERIAL_DELETE_ERROR",
                 status=500
             )
+    
+    @http.route('/api/v1/materials/batch', type='json', auth='none', methods=['POST'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def create_materials_batch(self, **kwargs):
+        """
+        Create many materials at once
+        Expects `items` (array of material payloads) and an optional `mode` (atomic or best_effort)
+        `tracking=summary` (or the X-Tracking header) skips the per-field tracking, see untracked_env
+        `upsert` updates the materials whose `material_code` already exists
+        """
+        try:
+            items, atomic = parse_batch_request(kwargs)
+            summary = parse_tracking_mode(kwargs, request.httprequest.headers)
+            env = untracked_env(request.env) if summary else request.env
+        except MaterialValidationError as e:
+            return invalid_response(message=str(e), code=e.code, status=403 if e.code == 'TRACKING_FORBIDDEN' else 400)
+        try:
+            results = batch_create(env, items, atomic=atomic, upsert=parse_bool(kwargs.get('upsert')))
+            if summary:
+                audit_untracked_batch(env, 'create', items, results)
+            return batch_response(results, atomic, 'created')
+        except Exception as e:
+            _logger.exception("Error creating materials batch")
+            return invalid_response(
+                message=f"Failed to create materials: {error_message(e)}",
+                code="MATERIAL_BATCH_CREATE_ERROR",
+                status=500
+            )
+    
+    @http.route('/api/v1/materials/batch', type='json', auth='none', methods=['PUT'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def update_materials_batch(self, **kwargs):
+        """
+        Update many materials at once
+        Expects `items` (array of payloads carrying the material `id`), an optional `mode` and `tracking`
+        """
+        try:
+            items, atomic = parse_batch_request(kwargs)
+            summary = parse_tracking_mode(kwargs, request.httprequest.headers)
+            env = untracked_env(request.env) if summary else request.env
+        except MaterialValidationError as e:
+            return invalid_response(message=str(e), code=e.code, status=403 if e.code == 'TRACKING_FORBIDDEN' else 400)
+        try:
+            results = batch_update(env, items, atomic=atomic)
+            if summary:
+                audit_untracked_batch(env, 'write', items, results)
+            return batch_response(results, atomic, 'updated')
+        except Exception as e:
+            _logger.exception("Error updating materials batch")
+            return invalid_response(
+                message=f"Failed to update materials: {error_message(e)}",
+                code="MATERIAL_BATCH_UPDATE_ERROR",
+                status=500
+            )
+    
+    @http.route('/api/v1/materials/batch', type='json', auth='none', methods=['DELETE'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def delete_materials_batch(self, **kwargs):
+        """
+        Delete many materials at once
+        Expects `ids` (array of material ids) and an optional `mode`
+        """
+        try:
+            ids, atomic = parse_batch_request(kwargs, key='ids')
+        except MaterialValidationError as e:
+            return invalid_response(message=str(e), code=e.code, status=400)
+        try:
+            results = batch_delete(request.env, ids, atomic=atomic)
+            return batch_response(results, atomic, 'deleted')
+        except Exception as e:
+            _logger.exception("Error deleting materials batch")
+            return invalid_response(
+                message=f"Failed to delete materials: {error_message(e)}",
+                code="MATERIAL_BATCH_DELETE_ERROR",
+                status=500
+            )
+    
+    @http.route('/api/v1/materials/imports', type='http', auth='none', methods=['POST'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def create_material_import(self, **kwargs):
+        """
+        Queue the import of a CSV or NDJSON file of material payloads
+        The file is sent as the multipart field `file` or as the raw request body,
+        the job is processed in the background and polled through its status route
+        """
+        httprequest = request.httprequest
+        too_large = InvalidImportFile(
+            f"The import file is too large, at most {IMPORT_MAX_SIZE} bytes", "IMPORT_FILE_TOO_LARGE")
+        try:
+            # refused before anything is read, a chunked body is cut at the limit below
+            if (httprequest.content_length or 0) > IMPORT_MAX_SIZE + IMPORT_MULTIPART_OVERHEAD:
+                raise too_large
+            upload = httprequest.files.get('file')
+            if upload:
+                data, filename, content_type = upload.read(IMPORT_MAX_SIZE + 1), upload.filename, upload.content_type
+            else:
+                data, filename, content_type = (
+                    httprequest.stream.read(IMPORT_MAX_SIZE + 1), kwargs.get('filename'), httprequest.content_type)
+            if len(data) > IMPORT_MAX_SIZE:
+                raise too_large
+            file_format = detect_import_format(filename, content_type, kwargs.get('format'))
+            if not data:
+                raise InvalidImportFile("The import file is empty", "EMPTY_IMPORT_FILE")
+            summary = parse_tracking_mode(kwargs, httprequest.headers)
+            if summary:
+                untracked_env(request.env)
+        except (InvalidImportFile, MaterialValidationError) as e:
+            status = {'TRACKING_FORBIDDEN': 403, 'IMPORT_FILE_TOO_LARGE': 413}.get(e.code, 400)
+            return http_response(invalid_response(message=str(e), code=e.code, status=status), status=status)
+        
+        try:
+            job = request.env['material.register.import']._create_job(
+                data, filename or f'materials.{file_format}', file_format,
+                tracking='summary' if summary else 'full')
+            return http_response(
+                valid_response(data=job._status_data(), message="Import queued", status=202),
+                status=202,
+                headers=[('Location', f'/api/v1/materials/imports/{job.id}')])
+        except Exception as e:
+            _logger.exception("Error queuing material import")
+            return http_response(invalid_response(
+                message=f"Failed to queue the import: {str(e)}",
+                code="MATERIAL_IMPORT_ERROR",
+                status=500
+            ), status=500)
+    
+    @http.route('/api/v1/materials/imports/<int:job_id>', type='json', auth='none', methods=['GET'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def get_material_import(self, job_id, **kwargs):
+        """
+        Progress of an import job with its per-row errors, paged with `errors_offset` and `errors_limit`
+        """
+        job = request.env['material.register.import'].search([('id', '=', job_id)])
+        if not job:
+            return invalid_response(
+                message=f"Import job with ID {job_id} not found",
+                code="IMPORT_NOT_FOUND",
+                status=404
+            )
+        try:
+            errors_offset = max(0, int(kwargs.get('errors_offset', 0)))
+            errors_limit = min(max(0, int(kwargs.get('errors_limit', 100))), 1000)
+        except (TypeError, ValueError):
+            return invalid_response(
+                message="errors_offset and errors_limit must be integers",
+                code="INVALID_PARAMETER",
+                status=400
+            )
+        return valid_response(data=job._status_data(errors_offset, errors_limit))
+    
+    @http.route('/api/v1/materials/imports/<int:job_id>/resume', type='json', auth='none', methods=['POST'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def resume_material_import(self, job_id, **kwargs):
+        """
+        Queue a failed import job again, it continues after its last committed chunk
+        """
+        job = request.env['material.register.import'].search([('id', '=', job_id)])
+        if not job:
+            return invalid_response(
+                message=f"Import job with ID {job_id} not found",
+                code="IMPORT_NOT_FOUND",
+                status=404
+            )
+        if job.state != 'failed':
+            return invalid_response(
+                message=f"Only failed imports can be resumed, this one is {job.state}",
+                code="IMPORT_NOT_RESUMABLE",
+                status=409
+            )
+        job.action_resume()
+        return valid_response(data=job._status_data(), message="Import resumed")
+    
+    @http.route('/api/v1/batch', type='json', auth='none', methods=['POST'], csrf=False)
+    @instrument_api
+    @authenticate_api
+    def run_batch(self, **kwargs):
+        """
+        Run several API calls in one request, authenticated once and in one transaction
+        Expects `operations` (array of {method, path, params, headers}) and an
+        optional `mode` (atomic or best_effort), results come back in order
+        Every operation counts against the rate limit, the envelope itself included
+        """
+        try:
+            operations, atomic = parse_envelope(type(self), kwargs)
+        except MaterialValidationError as e:
+            return invalid_response(message=str(e), code=e.code, status=400, details=getattr(e, 'details', None))
+        # charged before anything runs, a throttled envelope has no partial effect
+        error = charge_api_quota(len(operations) - 1)
+        if error is not None:
+            return error
+        try:
+            with timing_phase('operations'):
+                results = run_operations(self, operations, atomic=atomic)
+        except Exception as e:
+            _logger.exception("Error running API batch")
+            return invalid_response(
+                message=f"Failed to run the batch: {str(e)}",
+                code="BATCH_ERROR",
+                status=500
+            )
+        failed = [result for result in results if not result['success']]
+        if atomic and failed:
+            return invalid_response(
+                message=f"Batch rolled back, operation {failed[0]['index']} failed",
+                code="BATCH_ROLLED_BACK",
+                status=400,
+                details=results
+            )
+        return valid_response(
+            data=results,
+            message=f"{len(results) - len(failed)} operation(s) succeeded, {len(failed)} failed",
+            meta={
+                'mode': 'atomic' if atomic else 'best_effort',
+                'total': len(results),
+                'succeeded': len(results) - len(failed),
+                'failed': len(failed)
+            }
+        )
+
+    @http.route('/api/v1/metrics', type='http', auth='none', methods=['GET'], csrf=False)
+    @authenticate_api
+    def get_metrics(self, **kwargs):
+        """
+        Prometheus text exposition of the API metrics of the worker serving the request
+        Restricted to administrators
+        """
+        if not request.env.user.has_group('base.group_system'):
+            return http_response(invalid_response(
+                message="Access to the metrics requires administrator rights",
+                code="FORBIDDEN",
+                status=403
+            ), status=403)
+        
+        cache_stats = auth_cache.stats()
+        list_stats = list_cache.stats()
+        quota_stats = rate_limiter.stats()
+        body = api_metrics.render(extra_gauges={
+            'material_api_auth_cache_hits_total': ('Authentications served from the cache', 'counter', cache_stats['hits']),
+            'material_api_auth_cache_misses_total': ('Authentications not found in the cache', 'counter', cache_stats['misses']),
+            'material_api_auth_cache_evictions_total': ('Cache entries evicted by the size bound', 'counter', cache_stats['evictions']),
+            'material_api_auth_cache_invalidations_total': ('Cache entries dropped by a revocation', 'counter', cache_stats['invalidations']),
+            'material_api_auth_cache_size': ('Entries in the authentication cache', 'gauge', cache_stats['size']),
+            'material_api_list_cache_hits_total': ('List pages served from the cache', 'counter', list_stats['hits']),
+            'material_api_list_cache_misses_total': ('List pages computed', 'counter', list_stats['misses']),
+            'material_api_list_cache_hit_ratio': ('Share of the list pages served from the cache', 'gauge', round(list_stats['hit_rate'], 4)),
+            'material_api_list_cache_evictions_total': ('List pages evicted by the size bound', 'counter', list_stats['evictions']),
+            'material_api_list_cache_invalidations_total': ('List pages dropped by a change', 'counter', list_stats['invalidations']),
+            'material_api_list_cache_size': ('Pages in the list cache', 'gauge', list_stats['size']),
+            'material_api_quota_allowed_total': ('Requests admitted by the per key quotas', 'counter', quota_stats['allowed']),
+            'material_api_quota_rejected_rate_total': ('Requests rejected by the rate limit', 'counter', quota_stats['rejected_rate']),
+            'material_api_quota_rejected_concurrency_total': ('Requests rejected by the concurrency limit', 'counter', quota_stats['rejected_concurrency']),
+            'material_api_quota_store_errors_total': (
+                'Quota store failures, the requests were %s' % (
+                    'let through (material_api_rate_fail_open)' if rate_limiter.fail_open
+                    else 'rejected with 503 QUOTA_UNAVAILABLE'),
+                'counter', quota_stats['errors']),
+            'material_api_quota_in_flight': ('API requests in flight in this worker', 'gauge', quota_stats['in_flight']),
+        })
+        return Response(body, headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+import inspect
+import logging
+import weakref
+from contextlib import contextmanager
+
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.routing import Map, Rule
+from werkzeug.urls import url_decode
+
+from odoo.http import request
+
+from .auth import invalid_response
+from .validation import MaterialValidationError
+
+_logger = logging.getLogger(__name__)
+
+ENVELOPE_MAX_OPERATIONS = 50
+ENVELOPE_MODES = ('atomic', 'best_effort')
+
+# Handlers never run from an envelope, envelopes do not nest
+ENVELOPE_EXCLUDED_ENDPOINTS = ('run_batch',)
+
+# Routing maps per controller class, built on first use
+_route_maps = weakref.WeakKeyDictionary()
+
+
+def envelope_routes(controller_class):
+    """
+    The JSON routes of `controller_class` reachable from an envelope, by
+    handler name, read from the `@http.route` metadata of its methods
+    File transfers (export, images, imports upload) and the metrics are
+    `http` routes and stay separate requests.
+    """
+    routes = _route_maps.get(controller_class)
+    if routes is None:
+        rules = []
+        for name, method in inspect.getmembers(controller_class, callable):
+            routing = getattr(method, 'routing', None)
+            if not routing or routing.get('type') != 'json' or name in ENVELOPE_EXCLUDED_ENDPOINTS:
+                continue
+            rules.extend(
+                Rule(path, methods=routing.get('methods'), endpoint=name)
+                for path in routing.get('routes') or ())
+        routes = _route_maps[controller_class] = Map(rules)
+    return routes
+
+
+class OperationFailed(Exception):
+    """Raised inside the savepoint of an operation to roll it back"""
+
+    def __init__(self, result):
+        super(OperationFailed, self).__init__(result.get('error', {}).get('code'))
+        self.result = result
+
+
+def match_operation(controller_class, method, path):
+    """
+    Resolve the handler of one operation among the envelope routes of `controller_class`
+    Returns a tuple (endpoint, arguments), the query string of `path` is
+    merged into the arguments, raises MaterialValidationError when no JSON
+    route of the API answers `method` on `path`
+    """
+    path, _sep, query = (path or '').partition('?')
+    adapter = envelope_routes(controller_class).bind('localhost')
+    try:
+        endpoint, arguments = adapter.match(path, method=method)
+    except NotFound:
+        raise MaterialValidationError(f"No API route matches {path}", "ROUTE_NOT_FOUND")
+    except MethodNotAllowed:
+        raise MaterialValidationError(f"Method {method} not allowed on {path}", "METHOD_NOT_ALLOWED")
+    return endpoint, dict(url_decode(query).to_dict(), **arguments)
+
+
+def parse_envelope(controller_class, kwargs):
+    """
+    Read the operations and the mode of an envelope, every operation is
+    resolved before any of them runs
+    Returns a tuple (operations, atomic), raises MaterialValidationError on a
+    malformed envelope, with the per-operation errors as details
+    """
+    operations = kwargs.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise MaterialValidationError("'operations' must be a non-empty array", "INVALID_ENVELOPE")
+    if len(operations) > ENVELOPE_MAX_OPERATIONS:
+        raise MaterialValidationError(
+            f"Envelope too large: {len(operations)} operations, at most {ENVELOPE_MAX_OPERATIONS} allowed",
+            "ENVELOPE_TOO_LARGE")
+    mode = kwargs.get('mode') or 'atomic'
+    if mode not in ENVELOPE_MODES:
+        raise MaterialValidationError(
+            f"Invalid envelope mode. Allowed values: {', '.join(ENVELOPE_MODES)}", "INVALID_ENVELOPE_MODE")
+
+    parsed = []
+    errors = []
+    for index, operation in enumerate(operations):
+        try:
+            if not isinstance(operation, dict):
+                raise MaterialValidationError("Operation must be an object", "INVALID_OPERATION")
+            method = str(operation.get('method') or 'GET').upper()
+            params = operation.get('params') or {}
+            headers = operation.get('headers') or {}
+            if not isinstance(params, dict) or not isinstance(headers, dict):
+                raise MaterialValidationError("'params' and 'headers' must be objects", "INVALID_OPERATION")
+            endpoint, arguments = match_operation(controller_class, method, operation.get('path'))
+        except MaterialValidationError as e:
+            errors.append({'index': index, 'error': {'message': str(e), 'code': e.code}})
+            continue
+        parsed.append({
+            'index': index,
+            'method': method,
+            'path': operation.get('path'),
+            'endpoint': endpoint,
+            'kwargs': dict(params, **arguments),
+            'headers': headers,
+        })
+    if errors:
+        error = MaterialValidationError(f"{len(errors)} invalid operation(s)", "INVALID_ENVELOPE")
+        error.details = errors
+        raise error
+    return parsed, mode == 'atomic'
+
+
+class _OperationRequest(object):
+    """The HTTP request of the envelope, seen by an operation with its own headers"""
+
+    def __init__(self, httprequest, headers):
+        self._httprequest = httprequest
+        self.headers = Headers(list(headers.items()))
+
+    def __getattr__(self, name):
+        return getattr(self._httprequest, name)
+
+
+@contextmanager
+def _operation_context(headers):
+    """
+    Give an operation its own request headers and its own queue of response
+    headers and status, the envelope response keeps none of them
+    """
+    httprequest = request.httprequest
+    overrides = getattr(request, 'material_api_response', None)
+    request.httprequest = _OperationRequest(httprequest, headers)
+    request.material_api_response = operation_overrides = {'headers': [], 'status': None}
+    try:
+        yield operation_overrides
+    finally:
+        request.httprequest = httprequest
+        request.material_api_response = overrides
+
+
+def _call(controller, operation):
+    """Run the handler of `operation`, without its authentication and instrumentation"""
+    handler = inspect.unwrap(getattr(controller, operation['endpoint']))
+    with _operation_context(operation['headers']) as overrides:
+        try:
+            result = handler(controller, **operation['kwargs'])
+        except Exception as e:
+            _logger.exception("Envelope operation %s failed", operation['index'])
+            result = invalid_response(message=f"Operation failed: {str(e)}", code="OPERATION_ERROR", status=500)
+    return result, overrides
+
+
+def _outcome(operation, result, overrides):
+    return {
+        'index': operation['index'],
+        'method': operation['method'],
+        'path': operation['path'],
+        'status': overrides['status'] or 200,
+        'headers': dict(overrides['headers']),
+        'success': bool(result.get('success')),
+        'result': result,
+    }
+
+
+def run_operations(controller, operations, atomic=True):
+    """
+    Run the operations of an envelope in order, in the transaction of the request
+
+    In atomic mode they share one savepoint and the first failing operation
+    rolls all of them back, the following ones are not run. In best effort
+    mode each operation has its own savepoint, a failing one only rolls back
+    itself and the next operations still see the writes of the previous ones.
+    """
+    cr = request.env.cr
+    results = []
+    if atomic:
+        try:
+            with cr.savepoint():
+                for operation in operations:
+                    result, overrides = _call(controller, operation)
+                    results.append(_outcome(operation, result, overrides))
+                    if not result.get('success'):
+                        raise OperationFailed(result)
+        except OperationFailed:
+            for operation in operations[len(results):]:
+                results.append(_outcome(operation, invalid_response(
+                    message="Not run, an earlier operation failed", code="BATCH_ABORTED"),
+                    {'headers': [], 'status': None}))
+        return results
+
+    for operation in operations:
+        overrides = {'headers': [], 'status': None}
+        try:
+            with cr.savepoint():
+                result, overrides = _call(controller, operation)
+                if not result.get('success'):
+                    raise OperationFailed(result)
+        except OperationFailed:
+            pass
+        except Exception as e:
+            # the savepoint itself failed to flush the writes of the operation
+            _logger.exception("Envelope operation %s failed", operation['index'])
+            result = invalid_response(message=f"Operation failed: {str(e)}", code="OPERATION_ERROR", status=500)
+        results.append(_outcome(operation, result, overrides))
+    return results
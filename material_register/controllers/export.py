@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import json
+import logging
+
+import odoo
+from odoo import api
+
+from .pagination import search_page
+from .serializers import Relation, serialize_records
+
+_logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def spec_columns(spec):
+    """Flat column names of `spec`, nested objects become `key.subfield`"""
+    columns = []
+    for entry in spec:
+        if isinstance(entry, Relation) and entry.subfields:
+            columns.extend(f'{entry.key}.{name}' for name in entry.subfields)
+        else:
+            columns.append(entry.key if isinstance(entry, Relation) else entry)
+    return columns
+
+
+def _flatten(row):
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update((f'{key}.{name}', sub_value) for name, sub_value in value.items())
+        else:
+            flat[key] = value
+    return flat
+
+
+def _ndjson_chunk(rows):
+    return ''.join(json.dumps(row) + '\n' for row in rows).encode('utf-8')
+
+
+def _csv_chunk(rows, columns, header=False):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+    if header:
+        writer.writeheader()
+    writer.writerows(_flatten(row) for row in rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def iter_export(dbname, uid, context, domain, spec, export_format='ndjson', chunk_size=None):
+    """
+    Yield the encoded materials matching `domain`, `chunk_size` rows at a time
+
+    The generator runs after the request is dispatched and its cursor closed,
+    so it manages its own environments, opens its own cursor (a single
+    repeatable read snapshot) and walks the table by id with keyset pages.
+    The record cache is dropped after every chunk, memory use
+    therefore stays flat whatever the size of the table.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    columns = spec_columns(spec)
+    if export_format == 'csv':
+        yield _csv_chunk([], columns, header=True)
+    with api.Environment.manage(), odoo.registry(dbname).cursor() as cr:
+        env = api.Environment(cr, uid, context)
+        Material = env['material.register']
+        cursor = None
+        while True:
+            records, cursor = search_page(Material, domain, order='id asc', limit=chunk_size, cursor=cursor)
+            rows = serialize_records(records, spec)
+            if export_format == 'csv':
+                yield _csv_chunk(rows, columns)
+            else:
+                yield _ndjson_chunk(rows)
+            Material.invalidate_cache()
+            if not cursor:
+                break
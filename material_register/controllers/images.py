@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# Variants stored by image.mixin, one attachment each
+IMAGE_SIZES = (128, 256, 512, 1024, 1920)
+# Responses of a checksum keyed URL never change, clients keep them for a year
+IMAGE_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+PREFETCH_MAX_IDS = 200
+# Only thumbnails are small enough to be inlined in a prefetch response
+INLINE_MAX_SIZE = 256
+
+
+class InvalidImageRequest(ValueError):
+    """Raised when an image size or a prefetch request is not supported"""
+
+    def __init__(self, message, code):
+        super(InvalidImageRequest, self).__init__(message)
+        self.code = code
+
+
+def check_image_size(size):
+    if size not in IMAGE_SIZES:
+        raise InvalidImageRequest(
+            f"Invalid image size. Allowed values: {', '.join(map(str, IMAGE_SIZES))}", "INVALID_IMAGE_SIZE")
+    return size
+
+
+def image_url(material_id, size, checksum):
+    """Checksum keyed URL of an image variant, safe to cache forever"""
+    return f'/api/v1/materials/{material_id}/image/{size}?unique={checksum}'
+
+
+def readable_material_ids(env, material_ids):
+    """The ids among `material_ids` of existing materials the current user may read"""
+    Material = env['material.register']
+    Material.check_access_rights('read')
+    return Material.browse(material_ids).exists()._filter_access_rules('read').ids
+
+
+def image_attachments(env, material_ids, size, with_data=False):
+    """
+    Attachments of the `size` variant of the images of `material_ids`, as
+    {material_id: values}, read with one query and without loading the files
+    unless `with_data` asks for the base64 content
+    """
+    if not material_ids:
+        return {}
+    fields = ['res_id', 'checksum', 'mimetype', 'file_size'] + (['datas'] if with_data else [])
+    attachments = env['ir.attachment'].sudo().search_read([
+        ('res_model', '=', 'material.register'),
+        ('res_field', '=', f'image_{size}'),
+        ('res_id', 'in', list(material_ids)),
+    ], fields)
+    return {attachment['res_id']: attachment for attachment in attachments}
+
+
+def prefetch_images(env, material_ids, size, inline=False):
+    """
+    Checksum keyed URLs of the `size` images of `material_ids`, with their
+    content when `inline`, so that a grid of thumbnails costs one request
+    Materials without an image or not readable are reported as null.
+    """
+    if len(material_ids) > PREFETCH_MAX_IDS:
+        raise InvalidImageRequest(
+            f"Too many ids: {len(material_ids)}, at most {PREFETCH_MAX_IDS} allowed", "TOO_MANY_IDS")
+    if inline and size > INLINE_MAX_SIZE:
+        raise InvalidImageRequest(f"Only images up to {INLINE_MAX_SIZE}px can be inlined", "INLINE_TOO_LARGE")
+    readable = readable_material_ids(env, material_ids)
+    attachments = image_attachments(env, readable, size, with_data=inline)
+    result = []
+    for material_id in material_ids:
+        attachment = attachments.get(material_id)
+        if not attachment:
+            result.append({'id': material_id, 'image': None})
+            continue
+        image = {
+            'url': image_url(material_id, size, attachment['checksum']),
+            'checksum': attachment['checksum'],
+            'mimetype': attachment['mimetype'],
+            'size': attachment['file_size'],
+        }
+        if inline:
+            image['data'] = attachment['datas'].decode('ascii') if isinstance(attachment['datas'], bytes) else attachment['datas']
+        result.append({'id': material_id, 'image': image})
+    return result
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import math
+
+from odoo.tools import config
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_CHUNK_SIZE = 1000
+# The upload is held in memory by the web worker until it is stored as an
+# attachment, keep it well below the worker memory limits. Byte offsets are
+# stored in an integer column, the size can never exceed 2 GB.
+IMPORT_MAX_SIZE = min(int(config.get('material_api_import_max_size', 100 * 1024 * 1024)), 2 ** 31 - 1)
+# Room left for the multipart boundaries and part headers around the file
+IMPORT_MULTIPART_OVERHEAD = 64 * 1024
+# columns of the CSV export accepted as their payload names, so an export can be loaded back
+IMPORT_COLUMN_ALIASES = {'partner.id': 'partner_id', 'currency.id': 'currency_id'}
+
+
+class InvalidImportFile(ValueError):
+    """Raised when an uploaded import file cannot be accepted"""
+
+    def __init__(self, message, code):
+        super(InvalidImportFile, self).__init__(message)
+        self.code = code
+
+
+def detect_import_format(filename=None, content_type=None, requested=None):
+    """Import format from the explicit `format` parameter, the file extension or the content type"""
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise InvalidImportFile(
+                f"Invalid import format. Allowed values: {', '.join(IMPORT_FORMATS)}", "INVALID_IMPORT_FORMAT")
+        return requested
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith('.csv') or content_type.startswith('text/csv'):
+        return 'csv'
+    if filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type:
+        return 'ndjson'
+    raise InvalidImportFile("Cannot tell the import format, pass `format` (csv or ndjson)", "INVALID_IMPORT_FORMAT")
+
+
+def _iter_lines(stream):
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        yield line.decode('utf-8', errors='replace')
+
+
+def read_csv_header(stream):
+    """Return (columns, offset of the first data row) of a CSV file"""
+    stream.seek(0)
+    line = stream.readline().decode('utf-8-sig', errors='replace')
+    columns = next(csv.reader([line]), [])
+    return [IMPORT_COLUMN_ALIASES.get(column.strip(), column.strip()) for column in columns], stream.tell()
+
+
+def _coerce_csv_row(header, values):
+    """CSV cells are strings, empty cells are left out so that required fields are reported"""
+    payload = {column: value for column, value in zip(header, values) if value != ''}
+    if 'material_buy_price' in payload:
+        try:
+            price = float(payload['material_buy_price'])
+        except ValueError:
+            price = None
+        # malformed and non-finite prices are kept as text, the schema rejects them
+        if price is not None and math.isfinite(price):
+            payload['material_buy_price'] = price
+    for column in ('partner_id', 'currency_id'):
+        if column in payload and payload[column].strip().isdigit():
+            payload[column] = int(payload[column])
+    return payload
+
+
+def read_import_chunk(stream, file_format, header, offset, size=None):
+    """
+    Read at most `size` rows of an import file from the byte `offset`
+
+    Returns (rows, next_offset, eof), where rows are (payload, error) pairs,
+    error being set for the rows that cannot be parsed. The offsets only
+    fall on row boundaries, so a job can resume from any committed chunk.
+    """
+    size = size or IMPORT_CHUNK_SIZE
+    stream.seek(offset)
+    rows = []
+    if file_format == 'csv':
+        # the reader pulls lines one at a time, after each row the stream is at its end
+        reader = csv.reader(_iter_lines(stream))
+        for values in reader:
+            offset = stream.tell()
+            if not any(value.strip() for value in values):
+                continue
+            rows.append((_coerce_csv_row(header, values), None))
+            if len(rows) >= size:
+                break
+    else:
+        for line in _iter_lines(stream):
+            offset = stream.tell()
+            if not line.strip():
+                continue
+            try:
+                rows.append((json.loads(line), None))
+            except ValueError as e:
+                rows.append((None, f"Invalid JSON: {e}"))
+            if len(rows) >= size:
+                break
+    eof = not stream.read(1)
+    return rows, offset, eof
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from odoo.http import request
+
+# Upper bounds of the request duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _sql_counters():
+    """
+    Query count and time of the current thread, maintained by odoo.sql_db
+    for every executed query once the attributes exist on the thread
+    """
+    thread = threading.current_thread()
+    if not hasattr(thread, 'query_count'):
+        thread.query_count = 0
+        thread.query_time = 0
+    return thread.query_count, thread.query_time
+
+
+class RequestTimer(object):
+    """Wall time, SQL queries and SQL time of one request, split per phase"""
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self.start_time = time.perf_counter()
+        self.start_count, self.start_sql_time = _sql_counters()
+        self.duration = self.queries = self.sql_time = 0.0
+
+    def record(self, name, duration, queries, sql_time):
+        phase = self.phases.setdefault(name, {'duration': 0.0, 'queries': 0, 'sql_time': 0.0})
+        phase['duration'] += duration
+        phase['queries'] += queries
+        phase['sql_time'] += sql_time
+
+    def stop(self):
+        count, sql_time = _sql_counters()
+        self.duration = time.perf_counter() - self.start_time
+        self.queries = count - self.start_count
+        self.sql_time = sql_time - self.start_sql_time
+
+    def as_dict(self):
+        """Timings in milliseconds, for the `meta.timing` block"""
+        return {
+            'total_ms': round(self.duration * 1000, 3),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 3),
+            'phases': {
+                name: {
+                    'duration_ms': round(phase['duration'] * 1000, 3),
+                    'queries': phase['queries'],
+                    'sql_ms': round(phase['sql_time'] * 1000, 3),
+                }
+                for name, phase in self.phases.items()
+            },
+        }
+
+    def server_timing(self):
+        """Value of the Server-Timing response header"""
+        metrics = [
+            '%s;dur=%.3f;desc="%s queries"' % (name, phase['duration'] * 1000, phase['queries'])
+            for name, phase in self.phases.items()
+        ]
+        metrics.append('sql;dur=%.3f;desc="%s queries"' % (self.sql_time * 1000, self.queries))
+        metrics.append('total;dur=%.3f' % (self.duration * 1000))
+        return ', '.join(metrics)
+
+
+@contextmanager
+def timing_phase(name):
+    """Measure the enclosed block as phase `name` of the current request, if it is instrumented"""
+    timer = getattr(request, 'material_api_timer', None) if request else None
+    if timer is None:
+        yield
+        return
+    count, sql_time = _sql_counters()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end_count, end_sql_time = _sql_counters()
+        timer.record(name, time.perf_counter() - start, end_count - count, end_sql_time - sql_time)
+
+
+class ApiMetrics(object):
+    """
+    Per-route aggregates of the instrumented requests of this worker
+
+    Every worker keeps its own aggregates, the exposition carries a `worker`
+    label so a scraper can sum them.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._histograms = {}
+        self._queries = defaultdict(int)
+        self._sql_time = defaultdict(float)
+        self._phases = defaultdict(float)
+
+    def observe(self, route, outcome, timer):
+        with self._lock:
+            self._requests[(route, outcome)] += 1
+            histogram = self._histograms.setdefault(route, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for index, bound in enumerate(self.buckets):
+                if timer.duration <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += timer.duration
+            histogram['count'] += 1
+            self._queries[route] += timer.queries
+            self._sql_time[route] += timer.sql_time
+            for name, phase in timer.phases.items():
+                self._phases[(route, name)] += phase['duration']
+
+    def render(self, extra_gauges=None):
+        """Prometheus text exposition of the aggregates"""
+        worker = os.getpid()
+        lines = [
+            '# HELP material_api_requests_total API requests handled, by route and outcome',
+            '# TYPE material_api_requests_total counter',
+        ]
+        with self._lock:
+            for (route, outcome), count in sorted(self._requests.items()):
+                lines.append('material_api_requests_total{route="%s",outcome="%s",worker="%s"} %s' % (route, outcome, worker, count))
+            lines += [
+                '# HELP material_api_request_duration_seconds API request wall time',
+                '# TYPE material_api_request_duration_seconds histogram',
+            ]
+            for route, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append('material_api_request_duration_seconds_bucket{route="%s",worker="%s",le="%s"} %s' % (route, worker, bound, count))
+                lines.append('material_api_request_duration_seconds_bucket{route="%s",worker="%s",le="+Inf"} %s' % (route, worker, histogram['count']))
+                lines.append('material_api_request_duration_seconds_sum{route="%s",worker="%s"} %.6f' % (route, worker, histogram['sum']))
+                lines.append('material_api_request_duration_seconds_count{route="%s",worker="%s"} %s' % (route, worker, histogram['count']))
+            lines += [
+                '# HELP material_api_sql_queries_total SQL queries executed by API requests',
+                '# TYPE material_api_sql_queries_total counter',
+            ]
+            for route, count in sorted(self._queries.items()):
+                lines.append('material_api_sql_queries_total{route="%s",worker="%s"} %s' % (route, worker, count))
+            lines += [
+                '# HELP material_api_sql_duration_seconds_total Time spent in SQL by API requests',
+                '# TYPE material_api_sql_duration_seconds_total counter',
+            ]
+            for route, duration in sorted(self._sql_time.items()):
+                lines.append('material_api_sql_duration_seconds_total{route="%s",worker="%s"} %.6f' % (route, worker, duration))
+            lines += [
+                '# HELP material_api_phase_duration_seconds_total Time spent per phase of the API requests',
+                '# TYPE material_api_phase_duration_seconds_total counter',
+            ]
+            for (route, phase), duration in sorted(self._phases.items()):
+                lines.append('material_api_phase_duration_seconds_total{route="%s",phase="%s",worker="%s"} %.6f' % (route, phase, worker, duration))
+        for name, (help_text, metric_type, value) in sorted((extra_gauges or {}).items()):
+            lines += [
+                '# HELP %s %s' % (name, help_text),
+                '# TYPE %s %s' % (name, metric_type),
+                '%s{worker="%s"} %s' % (name, worker, value),
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+api_metrics = ApiMetrics()
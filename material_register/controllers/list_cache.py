@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import odoo
+from odoo.tools import config
+
+from .pagination import MAX_PAGE_SIZE
+
+# Bumped after every commit changing what a list page shows, read by every worker
+LIST_CACHE_SEQUENCE = 'material_register_list_cache_seq'
+# Largest page kept, by default every page the API serves: a list call
+# without `limit` reads a page of MAX_PAGE_SIZE rows and is the most common one
+LIST_CACHE_MAX_ROWS = int(config.get('material_api_list_cache_max_rows', MAX_PAGE_SIZE))
+
+
+class ListCache(object):
+    """
+    Bounded in-process LRU cache of the pages of the material list endpoint
+
+    Entries are keyed by the normalized request (database, user, companies,
+    domain, order, window and fieldset) and stamped with the generation they
+    were computed at: the value of LIST_CACHE_SEQUENCE and the registry cache
+    sequence. A page is served only while both are unchanged, so a material
+    write in any worker, or a change of access rights, invalidates it. The
+    generation is read outside of the request snapshot, a request racing with
+    a commit may therefore keep a stale page, at most for `ttl` seconds.
+    """
+
+    def __init__(self, max_size=256, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    @staticmethod
+    def key(*parts):
+        raw = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def get(self, key, generation):
+        """Return the cached page of `key`, or None when missing, expired or stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                page, expires_at, entry_generation = entry
+                if expires_at > time.monotonic() and entry_generation == generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return page
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def set(self, key, page, generation):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (page, time.monotonic() + self.ttl, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+list_cache = ListCache(
+    max_size=int(config.get('material_api_list_cache_size', 256)),
+    ttl=int(config.get('material_api_list_cache_ttl', 30)),
+)
+
+
+def current_generation(env):
+    """Generation the list pages computed now are valid for"""
+    env.cr.execute(f'SELECT last_value FROM "{LIST_CACHE_SEQUENCE}"')
+    return env.cr.fetchone()[0], env.registry.cache_sequence
+
+
+def invalidate_list_cache(env):
+    """
+    Invalidate the cached list pages of every worker once the current
+    transaction commits, bumping the sequence earlier would let a concurrent
+    request cache the rows it still sees under the new generation
+    The pages of this worker are dropped right away as well, so that the
+    transaction itself never reads a page older than its own writes.
+    """
+    list_cache.clear()
+    postcommit = env.cr.postcommit
+    if postcommit.data.get('material_list_cache_bump'):
+        return
+    postcommit.data['material_list_cache_bump'] = True
+    dbname = env.cr.dbname
+
+    @postcommit.add
+    def bump():
+        list_cache.clear()
+        with odoo.registry(dbname).cursor() as cr:
+            cr.execute(f"SELECT nextval('{LIST_CACHE_SEQUENCE}')")
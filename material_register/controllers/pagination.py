@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+import math
+
+from odoo import fields
+from odoo.osv import expression
+from odoo.tools import config
+
+# Columns a keyset cursor may be built on. They are all NOT NULL in practice
+# (required fields or ORM-managed log columns) so row comparison is well defined.
+# material_buy_price_company is computed at flush, before any search reads it,
+# and filled on install and upgrade for the rows written in SQL.
+CURSOR_ORDER_FIELDS = (
+    'id', 'material_code', 'name', 'material_type',
+    'material_buy_price', 'material_buy_price_company', 'create_date', 'write_date',
+)
+# Type of the cursor key value of each order column
+CURSOR_KEY_TYPES = {
+    'id': 'integer',
+    'material_code': 'char',
+    'name': 'char',
+    'material_type': 'char',
+    'material_buy_price': 'float',
+    'material_buy_price_company': 'float',
+    'create_date': 'datetime',
+    'write_date': 'datetime',
+}
+DEFAULT_ORDER = 'id desc'
+DEFAULT_CURSOR_LIMIT = 80
+# Largest page a request may read, `limit=0` (no limit) included
+MAX_PAGE_SIZE = int(config.get('material_api_max_page_size', 1000))
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor or cursor order cannot be used"""
+
+
+def parse_bool(value, default=False):
+    """Read a boolean request parameter sent either as JSON bool or string"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def clamp_limit(limit):
+    """The page size actually served for a requested `limit`, at most MAX_PAGE_SIZE"""
+    if limit <= 0 or limit > MAX_PAGE_SIZE:
+        return MAX_PAGE_SIZE
+    return limit
+
+
+def parse_order(order):
+    """
+    Parse an order string into a list of (field, direction) tuples
+    The `id` column is always appended as a tie-breaker so the key is unique
+    """
+    terms = []
+    for part in (order or DEFAULT_ORDER).split(','):
+        tokens = part.strip().split()
+        if not tokens:
+            continue
+        field = tokens[0]
+        direction = tokens[1].lower() if len(tokens) > 1 else 'asc'
+        if field not in CURSOR_ORDER_FIELDS or direction not in ('asc', 'desc') or len(tokens) > 2:
+            raise InvalidCursor(f"Unsupported order for cursor pagination: {part.strip()}")
+        if field in [term[0] for term in terms]:
+            continue
+        terms.append((field, direction))
+    if not terms:
+        terms = parse_order(DEFAULT_ORDER)
+    if 'id' not in [term[0] for term in terms]:
+        terms.append(('id', terms[-1][1]))
+    return terms
+
+
+def order_string(terms):
+    """Build back a normalized ORM order string from parsed terms"""
+    return ', '.join(f'{field} {direction}' for field, direction in terms)
+
+
+def _key_value(record, field):
+    value = record[field]
+    if record._fields[field].type == 'datetime' and value:
+        # keep the microseconds, rows written in the same second must stay ordered
+        return value.isoformat(sep=' ')
+    return value
+
+
+def encode_cursor(record, terms):
+    """Encode the sort key of `record` into an opaque URL-safe token"""
+    payload = {
+        'o': order_string(terms),
+        'k': [_key_value(record, field) for field, _direction in terms],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, terms):
+    """Decode a cursor and check it was issued for the same sort order"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        order, key = payload['o'], payload['k']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Malformed cursor")
+    if order != order_string(terms) or not isinstance(key, list) or len(key) != len(terms):
+        raise InvalidCursor("Cursor does not match the requested order")
+    for (field, _direction), value in zip(terms, key):
+        if not _valid_key_value(CURSOR_KEY_TYPES[field], value):
+            raise InvalidCursor("Malformed cursor")
+    return key
+
+
+def _valid_key_value(key_type, value):
+    """Tell whether `value` can be compared with a column of `key_type`, crafted cursors reach SQL"""
+    if isinstance(value, bool):
+        return False
+    if key_type == 'integer':
+        return isinstance(value, int)
+    if key_type == 'float':
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    if key_type == 'datetime':
+        try:
+            return isinstance(value, str) and bool(fields.Datetime.to_datetime(value))
+        except ValueError:
+            return False
+    return isinstance(value, str)
+
+
+def cursor_domain(terms, key):
+    """
+    Domain selecting the rows strictly after `key` for the given sort terms:
+    (a > va) OR (a = va AND b > vb) OR ... expanded for mixed directions
+    """
+    branches = []
+    for index, (field, direction) in enumerate(terms):
+        branch = [(prev_field, '=', key[prev]) for prev, (prev_field, _d) in enumerate(terms[:index])]
+        branch.append((field, '<' if direction == 'desc' else '>', key[index]))
+        branches.append(expression.AND([[leaf] for leaf in branch]))
+    return expression.OR(branches)
+
+
+def search_page(model, domain, order=None, limit=DEFAULT_CURSOR_LIMIT, cursor=None):
+    """
+    Fetch one keyset page of `model`
+
+    Only the rows after `cursor` are read, using the sort columns as the seek
+    key, so the cost of a page does not depend on how deep it is.
+    Returns a tuple (records, next_cursor); next_cursor is None on the last page.
+    """
+    terms = parse_order(order)
+    if cursor:
+        domain = expression.AND([domain, cursor_domain(terms, decode_cursor(cursor, terms))])
+    records = model.search(domain, limit=limit + 1, order=order_string(terms))
+    if len(records) <= limit:
+        return records, None
+    records = records[:limit]
+    return records, encode_cursor(records[-1], terms)
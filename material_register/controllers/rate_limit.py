@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter
+
+import psycopg2
+
+import odoo
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+# A slot still held after this long belongs to a worker that died mid-request
+STALE_SLOT_SECONDS = 600
+QUOTA_STORES = ('memory', 'postgres')
+# Transactions of the postgres store retried on a lock or serialization conflict
+QUOTA_STORE_ATTEMPTS = 3
+# Retry-After sent when the quota store cannot decide
+QUOTA_UNAVAILABLE_RETRY_AFTER = 1
+
+
+class QuotaPolicy(object):
+    """
+    Limits applied to every API key: a token bucket of `burst` requests
+    refilled at `rate` requests per second, and at most `max_concurrent`
+    requests in flight. A zero value disables the corresponding limit.
+    """
+
+    def __init__(self, rate=10.0, burst=50, max_concurrent=4):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+
+    @property
+    def enabled(self):
+        return self.rate > 0 or self.max_concurrent > 0
+
+    def retry_after(self, reason, tokens, cost=1):
+        """Seconds until a request rejected for `reason` may succeed"""
+        if reason == 'rate':
+            return max(1, math.ceil((cost - tokens) / self.rate))
+        return 1
+
+    def take(self, tokens, elapsed, in_flight, cost=1, slot=True):
+        """
+        Decide on one request from the state of its bucket, the request takes
+        `cost` tokens and, with `slot`, one concurrency slot
+        Returns a tuple (allowed, tokens left, retry after in seconds, reason)
+        """
+        if self.rate > 0:
+            tokens = min(float(self.burst), tokens + elapsed * self.rate)
+        if slot and self.max_concurrent > 0 and in_flight >= self.max_concurrent:
+            return False, tokens, self.retry_after('concurrency', tokens), 'concurrency'
+        if self.rate > 0:
+            if tokens < cost:
+                return False, tokens, self.retry_after('rate', tokens, cost), 'rate'
+            tokens -= cost
+        return True, tokens, 0, None
+
+
+class MemoryQuotaStore(object):
+    """Buckets of this worker only, a dictionary lookup under a lock"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, policy, cost=1, slot=True):
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(policy.burst), now, 0]
+            allowed, bucket[0], retry_after, reason = policy.take(
+                bucket[0], now - bucket[1], bucket[2], cost=cost, slot=slot)
+            bucket[1] = now
+            if allowed and slot:
+                bucket[2] += 1
+            return allowed, retry_after, reason
+
+    def release(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None and bucket[2] > 0:
+                bucket[2] -= 1
+
+    def in_flight(self):
+        with self._lock:
+            return sum(bucket[2] for bucket in self._buckets.values())
+
+
+class PostgresQuotaStore(object):
+    """
+    Buckets shared by every worker, rows of material_register_api_quota
+    updated in short transactions of their own, so that a throttled or
+    failed request never holds the row lock nor rolls its count back
+
+    Every decision is a single UPDATE run in autocommit, hence at READ
+    COMMITTED: the row lock taken by the statement queues the concurrent
+    requests of a key instead of failing them with serialization errors. Slots this worker could not
+    give back are returned with its next request for the same key.
+    """
+
+    # QuotaPolicy.take, in SQL, on the locked row of the bucket
+    ACQUIRE_QUERY = """
+        WITH bucket AS (
+            SELECT key,
+                   CASE WHEN %(rate)s > 0
+                        THEN least(%(burst)s, tokens + %(rate)s * greatest(0, extract(epoch FROM
+                             clock_timestamp() at time zone 'UTC' - refill_date)))
+                        ELSE tokens END AS tokens,
+                   greatest(0, CASE WHEN slot_date < (now() - make_interval(secs => %(stale)s)) at time zone 'UTC'
+                                    THEN 0 ELSE in_flight END - %(unreleased)s) AS in_flight
+              FROM material_register_api_quota
+             WHERE key = %(key)s
+               FOR UPDATE
+        ), decision AS (
+            SELECT key, tokens, in_flight,
+                   CASE WHEN %(slot)s AND %(max_concurrent)s > 0 AND in_flight >= %(max_concurrent)s
+                        THEN 'concurrency'
+                        WHEN %(rate)s > 0 AND tokens < %(cost)s
+                        THEN 'rate' END AS reason
+              FROM bucket
+        )
+        UPDATE material_register_api_quota quota
+           SET tokens = decision.tokens - CASE WHEN decision.reason IS NULL AND %(rate)s > 0
+                                               THEN %(cost)s ELSE 0 END,
+               refill_date = clock_timestamp() at time zone 'UTC',
+               in_flight = decision.in_flight + CASE WHEN decision.reason IS NULL AND %(slot)s THEN 1 ELSE 0 END,
+               slot_date = CASE WHEN decision.reason IS NULL AND %(slot)s
+                                THEN now() at time zone 'UTC' ELSE quota.slot_date END
+          FROM decision
+         WHERE quota.key = decision.key
+     RETURNING decision.reason, decision.tokens
+    """
+
+    def __init__(self):
+        self._in_flight = 0
+        self._unreleased = Counter()
+        self._lock = threading.Lock()
+
+    def _transaction(self, dbname, statement):
+        """Run `statement(cr)` in autocommit, retried on concurrency errors"""
+        for attempt in range(1, QUOTA_STORE_ATTEMPTS + 1):
+            try:
+                with odoo.registry(dbname).cursor() as cr:
+                    cr.autocommit(True)
+                    return statement(cr)
+            except psycopg2.OperationalError as e:
+                if e.pgcode not in PG_CONCURRENCY_ERRORS_TO_RETRY or attempt == QUOTA_STORE_ATTEMPTS:
+                    raise
+                time.sleep(random.uniform(0.0, 0.005 * 2 ** attempt))
+
+    def _take_unreleased(self, key):
+        with self._lock:
+            return self._unreleased.pop(key, 0)
+
+    def _keep_unreleased(self, key, count):
+        if count:
+            with self._lock:
+                self._unreleased[key] += count
+
+    def acquire(self, key, policy, dbname, cost=1, slot=True):
+        unreleased = self._take_unreleased(key)
+        params = {
+            'key': key, 'rate': float(policy.rate), 'burst': float(policy.burst),
+            'max_concurrent': policy.max_concurrent, 'stale': STALE_SLOT_SECONDS,
+            'unreleased': unreleased, 'cost': float(cost), 'slot': slot,
+        }
+
+        def statement(cr):
+            cr.execute(self.ACQUIRE_QUERY, params)
+            row = cr.fetchone()
+            if row is None:
+                # first request of the key, its bucket starts full
+                cr.execute("""
+                    INSERT INTO material_register_api_quota (key, tokens, refill_date, in_flight, slot_date)
+                    VALUES (%s, %s, clock_timestamp() at time zone 'UTC', 0, now() at time zone 'UTC')
+                    ON CONFLICT (key) DO NOTHING
+                """, [key, float(policy.burst)])
+                cr.execute(self.ACQUIRE_QUERY, params)
+                row = cr.fetchone()
+            return row
+
+        try:
+            reason, tokens = self._transaction(dbname, statement)
+        except Exception:
+            self._keep_unreleased(key, unreleased)
+            raise
+        allowed = reason is None
+        if allowed and slot:
+            with self._lock:
+                self._in_flight += 1
+        return allowed, 0 if allowed else policy.retry_after(reason, tokens, cost), reason
+
+    def release(self, key, dbname):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+        count = self._take_unreleased(key) + 1
+
+        def statement(cr):
+            cr.execute("""
+                UPDATE material_register_api_quota
+                   SET in_flight = greatest(in_flight - %s, 0)
+                 WHERE key = %s
+            """, [count, key])
+
+        try:
+            self._transaction(dbname, statement)
+        except Exception:
+            self._keep_unreleased(key, count)
+            raise
+
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+
+class RateLimiter(object):
+    """
+    Per API key quotas of the authenticated API requests
+
+    The `memory` store keeps the buckets in the worker, the limits then apply
+    per worker. The `postgres` store shares them between every worker and
+    server at the cost of one short transaction per request and per release.
+    A store failure rejects the request (reason `unavailable`), unless
+    `fail_open` lets it through unlimited.
+    """
+
+    def __init__(self, policy, store='memory', fail_open=False):
+        if store not in QUOTA_STORES:
+            raise ValueError(f"Invalid quota store {store}. Allowed values: {', '.join(QUOTA_STORES)}")
+        self.policy = policy
+        self.store_name = store
+        self.store = PostgresQuotaStore() if store == 'postgres' else MemoryQuotaStore()
+        self.fail_open = fail_open
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = {'rate': 0, 'concurrency': 0}
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.policy.enabled
+
+    def _store_args(self, dbname):
+        return (dbname,) if self.store_name == 'postgres' else ()
+
+    def acquire(self, key, dbname, cost=1, slot=True):
+        """
+        Take `cost` tokens and, with `slot`, a concurrency slot for `key`
+        Returns a tuple (allowed, retry after in seconds, reason), an allowed
+        request must give its slot back with `release`
+        """
+        try:
+            allowed, retry_after, reason = self.store.acquire(
+                key, self.policy, *self._store_args(dbname), cost=cost, slot=slot)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            if self.fail_open:
+                _logger.warning("API quota store unavailable, request of %s not limited", key, exc_info=True)
+                return True, 0, None
+            _logger.error("API quota store unavailable, request of %s rejected", key, exc_info=True)
+            return False, QUOTA_UNAVAILABLE_RETRY_AFTER, 'unavailable'
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.rejected[reason] += 1
+        return allowed, retry_after, reason
+
+    def charge(self, key, dbname, cost):
+        """Take `cost` more tokens for a request that already holds its slot"""
+        return self.acquire(key, dbname, cost=cost, slot=False)
+
+    def release(self, key, dbname):
+        try:
+            self.store.release(key, *self._store_args(dbname))
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            _logger.error("API quota slot of %s not released, it is given back with the next request of the key",
+                          key, exc_info=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'store': self.store_name,
+                'allowed': self.allowed,
+                'rejected_rate': self.rejected['rate'],
+                'rejected_concurrency': self.rejected['concurrency'],
+                'errors': self.errors,
+                'in_flight': self.store.in_flight(),
+            }
+
+
+def quota_key(auth_header, uid):
+    """
+    Bucket of a request: the API key when one is used, identified by its
+    public index (first 8 characters, as stored by res.users.apikeys), else the user
+    """
+    if auth_header and auth_header.startswith('Bearer '):
+        return f'key:{uid}:{auth_header.split(" ")[1][:8]}'
+    return f'user:{uid}'
+
+
+rate_limiter = RateLimiter(
+    QuotaPolicy(
+        rate=float(config.get('material_api_rate_limit', 10)),
+        burst=int(config.get('material_api_rate_burst', 50)),
+        max_concurrent=int(config.get('material_api_max_concurrent', 4)),
+    ),
+    store=config.get('material_api_rate_store', 'memory'),
+    fail_open=str(config.get('material_api_rate_fail_open', '')).lower() in ('1', 'true', 'yes'),
+)
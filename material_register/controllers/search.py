@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+import re
+
+# Language independent, codes and Indonesian names must not be stemmed as English
+SEARCH_CONFIG = 'simple'
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 200
+# Longer queries are truncated, every term is one more index scan
+SEARCH_MAX_TERMS = 8
+
+
+class InvalidSearchRequest(ValueError):
+    """Raised when a search query or cursor cannot be used"""
+
+
+def parse_search_query(text):
+    """
+    Turn free text into a tsquery matching every word as a prefix, so that
+    "denim supp jak" finds a denim material of a supplier from Jakarta
+    Only word characters are kept, the query syntax cannot be injected.
+    """
+    terms = re.findall(r'\w+', (text or '').lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise InvalidSearchRequest("Search query 'q' must contain at least one word")
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def encode_search_cursor(tsquery, rank, record_id):
+    raw = json.dumps({'q': tsquery, 'k': [rank, record_id]}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_search_cursor(cursor, tsquery):
+    """Decode a search cursor and check it was issued for the same query"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        query, (rank, record_id) = payload['q'], payload['k']
+        rank, record_id = float(rank), int(record_id)
+    except (ValueError, TypeError, KeyError):
+        raise InvalidSearchRequest("Malformed cursor")
+    if query != tsquery:
+        raise InvalidSearchRequest("Cursor does not match the search query")
+    return rank, record_id
+
+
+def search_materials(env, text, domain=None, limit=SEARCH_DEFAULT_LIMIT, cursor=None):
+    """
+    Full-text search of the materials matching `domain`, best matches first
+
+    Matches are found through the GIN index of the maintained search vector
+    (code, name, partner name and type) and ranked with ts_rank. Pages are
+    keyset paginated on (rank, id), record rules apply as for any search.
+    Returns a tuple (records, ranks by id, next_cursor), next_cursor is None
+    on the last page.
+    """
+    if not 0 < limit <= SEARCH_MAX_LIMIT:
+        raise InvalidSearchRequest(f"limit must be between 1 and {SEARCH_MAX_LIMIT}")
+    tsquery = parse_search_query(text)
+    Material = env['material.register']
+    Material.check_access_rights('read')
+    Material.flush()
+    query = Material._where_calc(domain or [])
+    Material._apply_ir_rules(query, 'read')
+    from_clause, where_clause, where_params = query.get_sql()
+
+    seek = ''
+    seek_params = []
+    if cursor:
+        seek = 'WHERE (rank, id) < (%s::real, %s)'
+        seek_params = list(decode_search_cursor(cursor, tsquery))
+
+    env.cr.execute(f"""
+        WITH search AS (SELECT to_tsquery('{SEARCH_CONFIG}', %s) AS query)
+        SELECT id, rank FROM (
+            SELECT "{Material._table}".id, ts_rank("{Material._table}".search_vector, search.query) AS rank
+              FROM {from_clause}, search
+             WHERE "{Material._table}".search_vector @@ search.query {'AND ' + where_clause if where_clause else ''}
+        ) ranked
+        {seek}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s
+    """, [tsquery] + where_params + seek_params + [limit + 1])
+    rows = env.cr.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(tsquery, rows[-1][1], rows[-1][0])
+    return Material.browse([row[0] for row in rows]), dict(rows), next_cursor
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+from datetime import date, datetime
+
+
+class Relation(object):
+    """
+    Nested many2one entry of a serializer spec
+
+    `key` is the JSON key, `field` the many2one field on the model and
+    `subfields` the comodel fields emitted in the nested object. When
+    `nullable` is set an empty relation is emitted as None instead of an
+    object with False values. A relation without subfields is collapsed
+    and only emits the related id, without touching the comodel.
+    """
+
+    def __init__(self, key, field, subfields, nullable=False):
+        self.key = key
+        self.field = field
+        self.subfields = tuple(subfields)
+        self.nullable = nullable
+
+
+MATERIAL_LIST_SPEC = (
+    'id', 'material_code', 'name', 'material_type', 'material_buy_price', 'material_buy_price_company',
+    Relation('currency', 'currency_id', ('id', 'name', 'symbol')),
+    Relation('partner', 'partner_id', ('id', 'name')),
+    'create_date', 'write_date',
+)
+
+MATERIAL_DETAIL_SPEC = (
+    'id', 'material_code', 'name', 'material_type', 'material_buy_price', 'material_buy_price_company',
+    Relation('currency', 'currency_id', ('id', 'name', 'symbol')),
+    Relation('partner', 'partner_id', ('id', 'name', 'email', 'phone')),
+    'create_date', 'write_date',
+    Relation('create_uid', 'create_uid', ('id', 'name'), nullable=True),
+    Relation('write_uid', 'write_uid', ('id', 'name'), nullable=True),
+)
+
+MATERIAL_CREATE_SPEC = (
+    'id', 'material_code', 'name', 'material_type', 'material_buy_price', 'create_date',
+)
+
+MATERIAL_UPDATE_SPEC = (
+    'id', 'material_code', 'name', 'material_type', 'material_buy_price',
+    Relation('partner', 'partner_id', ('id', 'name')),
+    'write_date',
+    Relation('write_uid', 'write_uid', ('id', 'name'), nullable=True),
+)
+
+PARTNER_SUMMARY_SPEC = (
+    'id',
+    Relation('partner', 'partner_id', ('id', 'name')),
+    Relation('currency', 'currency_id', ('id', 'name', 'symbol')),
+    'material_count', 'price_total', 'latest_buy_price',
+    Relation('latest_material', 'latest_material_id', (), nullable=True),
+    'refreshed_date',
+)
+
+
+# `compact` is the columnar form built by compact_records
+WIRE_FORMATS = ('json', 'compact')
+
+
+class InvalidFieldset(ValueError):
+    """Raised when a sparse fieldset or expansion names an unknown key"""
+
+
+def _entry_key(entry):
+    return entry.key if isinstance(entry, Relation) else entry
+
+
+def parse_list_param(value):
+    """Read a list request parameter sent either as JSON array or comma separated string"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return [str(item) for item in value]
+
+
+def restrict_spec(spec, fields=None, expand=None):
+    """
+    Narrow `spec` to a sparse fieldset
+
+    `fields` lists the top-level keys to emit (`id` is always kept), None keeps
+    every key. `expand` lists the relations emitted as nested objects, the other
+    selected relations are collapsed to their id; None expands every selected
+    relation. Expanded relations are added to the selection.
+    """
+    keys = [_entry_key(entry) for entry in spec]
+    relation_keys = [_entry_key(entry) for entry in spec if isinstance(entry, Relation)]
+    unknown = [key for key in (fields or []) if key not in keys]
+    unknown += [key for key in (expand or []) if key not in relation_keys]
+    if unknown:
+        raise InvalidFieldset(f"Unknown fields: {', '.join(unknown)}. Allowed values: {', '.join(keys)}")
+
+    selected = None if fields is None else set(fields) | set(expand or []) | {'id'}
+    restricted = []
+    for entry in spec:
+        key = _entry_key(entry)
+        if selected is not None and key not in selected:
+            continue
+        if isinstance(entry, Relation) and expand is not None and key not in expand:
+            entry = Relation(entry.key, entry.field, (), nullable=True)
+        restricted.append(entry)
+    return tuple(restricted)
+
+
+def serialize_value(field, value):
+    """Convert a raw `read()` value into its JSON representation"""
+    if field.type == 'monetary' or field.type == 'float':
+        return float(value or 0.0)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if field.type in ('date', 'datetime'):
+        return value or None
+    return value
+
+
+def _read_relations(records, relations, rows):
+    """
+    Read the nested objects of `relations` with one `read()` per comodel
+    Returns a dict {comodel: {id: values}}
+    """
+    ids_by_comodel = defaultdict(set)
+    fields_by_comodel = defaultdict(set)
+    for relation in relations:
+        if not relation.subfields:
+            continue
+        comodel = records._fields[relation.field].comodel_name
+        fields_by_comodel[comodel].update(f for f in relation.subfields if f != 'id')
+        ids_by_comodel[comodel].update(row[relation.field] for row in rows if row[relation.field])
+
+    values = {}
+    for comodel, ids in ids_by_comodel.items():
+        model = records.env[comodel]
+        if fields_by_comodel[comodel]:
+            related = model.browse(list(ids)).read(list(fields_by_comodel[comodel]), load=None)
+        else:
+            related = [{'id': id_} for id_ in ids]
+        values[comodel] = {
+            vals['id']: {
+                name: serialize_value(model._fields[name], value)
+                for name, value in vals.items()
+            }
+            for vals in related
+        }
+    return values
+
+
+def serialize_records(records, spec):
+    """
+    Serialize a recordset into a list of dicts following `spec`
+
+    Scalar columns are fetched with a single `read()` and every many2one of
+    the spec is resolved with one batched `read()` per comodel, so the number
+    of queries does not depend on the size of the recordset.
+    """
+    if not records:
+        return []
+    scalars = [entry for entry in spec if not isinstance(entry, Relation)]
+    relations = [entry for entry in spec if isinstance(entry, Relation)]
+    columns = [name for name in scalars if name != 'id'] + [relation.field for relation in relations]
+    if columns:
+        rows = records.read(list(dict.fromkeys(columns)), load=None)
+    else:
+        # read() with an empty list would read every field
+        rows = [{'id': record_id} for record_id in records.exists().ids]
+    related = _read_relations(records, relations, rows)
+
+    result = []
+    for row in rows:
+        data = {}
+        for entry in spec:
+            if not isinstance(entry, Relation):
+                data[entry] = serialize_value(records._fields[entry], row[entry])
+                continue
+            if not entry.subfields:
+                data[entry.key] = row[entry.field] or None
+                continue
+            comodel = records._fields[entry.field].comodel_name
+            value = related[comodel].get(row[entry.field])
+            if value is None:
+                data[entry.key] = None if entry.nullable else dict.fromkeys(entry.subfields, False)
+            else:
+                data[entry.key] = {name: value.get(name, False) for name in entry.subfields}
+        result.append(data)
+    return result
+
+
+def serialize_record(record, spec):
+    """Serialize a single record following `spec`"""
+    record.ensure_one()
+    return serialize_records(record, spec)[0]
+
+
+def parse_wire_format(value):
+    """Read the `format` parameter of the list endpoints, True for the compact format"""
+    value = value or 'json'
+    if value not in WIRE_FORMATS:
+        raise InvalidFieldset(f"Invalid format. Allowed values: {', '.join(WIRE_FORMATS)}")
+    return value == 'compact'
+
+
+def compact_records(rows, spec):
+    """
+    Columnar form of serialized `rows`: one array per key of `spec`, the
+    nested objects being replaced by their id and listed once each in
+    `included`, under the key of their relation
+
+    A page of materials sharing a handful of currencies and partners then
+    carries each of them once instead of once per row.
+    """
+    columns = {_entry_key(entry): [] for entry in spec}
+    included = {
+        entry.key: {} for entry in spec
+        if isinstance(entry, Relation) and 'id' in entry.subfields
+    }
+    for row in rows:
+        for key, values in columns.items():
+            value = row[key]
+            if key in included and isinstance(value, dict):
+                if value['id']:
+                    included[key].setdefault(value['id'], value)
+                value = value['id'] or None
+            values.append(value)
+    return {
+        'count': len(rows),
+        'columns': columns,
+        'included': {key: list(objects.values()) for key, objects in included.items()},
+    }
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+STATS_GROUP_BY = ('material_type', 'partner_id', 'currency_id')
+
+PRICE_AGGREGATES = [
+    'price_sum:sum(material_buy_price)',
+    'price_min:min(material_buy_price)',
+    'price_max:max(material_buy_price)',
+]
+# The stored converted price, the one the price_min/price_max filters read
+COMPANY_PRICE_AGGREGATES = [
+    'price_sum:sum(material_buy_price_company)',
+    'price_min:min(material_buy_price_company)',
+    'price_max:max(material_buy_price_company)',
+]
+
+
+class InvalidStatsRequest(ValueError):
+    """Raised when the stats parameters are not supported"""
+
+
+def _group_value(value):
+    """read_group returns many2one groups as (id, name) pairs"""
+    if isinstance(value, (list, tuple)):
+        return {'id': value[0], 'name': value[1]}
+    return value or None
+
+
+def _currency_data(currency):
+    return {'id': currency.id, 'name': currency.name, 'symbol': currency.symbol}
+
+
+def material_stats(env, domain, group_by='material_type', convert=False):
+    """
+    Count and price aggregates of the materials matching `domain` per `group_by`
+
+    Aggregation runs in SQL through read_group, split per currency so
+    amounts of different currencies are never added together, one row per
+    (group, currency) is returned. With `convert` the stored buy prices
+    converted to the currency of the price company (see material.register
+    `_price_company`) are aggregated instead, one row per group.
+    """
+    if group_by not in STATS_GROUP_BY:
+        raise InvalidStatsRequest(f"Invalid group_by. Allowed values: {', '.join(STATS_GROUP_BY)}")
+
+    if convert:
+        groups = env['material.register'].read_group(
+            domain, COMPANY_PRICE_AGGREGATES, [group_by], orderby=group_by, lazy=False)
+        target = env['material.register']._price_company().currency_id
+        return [{
+            'group': _group_value(group[group_by]),
+            'currency': _currency_data(target),
+            'count': group['__count'],
+            'sum': group['price_sum'] or 0.0,
+            'avg': (group['price_sum'] or 0.0) / group['__count'] if group['__count'] else 0.0,
+            'min': group['price_min'],
+            'max': group['price_max'],
+        } for group in groups]
+
+    groupby = [group_by] if group_by == 'currency_id' else [group_by, 'currency_id']
+    groups = env['material.register'].read_group(
+        domain, PRICE_AGGREGATES, groupby, orderby=group_by, lazy=False)
+    currencies = env['res.currency'].browse([group['currency_id'][0] for group in groups if group['currency_id']])
+    currency_by_id = {currency.id: currency for currency in currencies}
+    return [{
+        'group': _group_value(group[group_by]),
+        'currency': _currency_data(currency_by_id[group['currency_id'][0]]) if group['currency_id'] else None,
+        'count': group['__count'],
+        'sum': group['price_sum'],
+        'avg': group['price_sum'] / group['__count'] if group['__count'] else 0.0,
+        'min': group['price_min'],
+        'max': group['price_max'],
+    } for group in groups]
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import math
+import weakref
+
+# Fields of material.register accepted by the API, their type, requiredness,
+# selection values and comodel are read from the model definition
+MATERIAL_WRITABLE_FIELDS = ('material_code', 'name', 'material_type', 'material_buy_price', 'partner_id', 'currency_id')
+# Rules the field definitions do not carry
+POSITIVE_FIELDS = ('material_buy_price',)
+# Error codes kept from the hand written checks the schema replaced
+ERROR_CODES = {'material_buy_price': 'INVALID_PRICE'}
+
+# Compiled schemas per model class, a registry reload builds new classes
+_schemas = weakref.WeakKeyDictionary()
+
+
+class MaterialValidationError(ValueError):
+    """Raised when a material payload is rejected, carries the API error code"""
+
+    def __init__(self, message, code):
+        super(MaterialValidationError, self).__init__(message)
+        self.code = code
+
+
+class FieldRule(object):
+    """Check and conversion of one payload key, compiled from a model field"""
+
+    def __init__(self, field, env):
+        self.name = field.name
+        self.type = field.type
+        self.required = field.required
+        self.label = field.string
+        self.choices = tuple(field.get_values(env)) if field.type == 'selection' else ()
+        self.comodel = field.comodel_name if field.type == 'many2one' else None
+        self.positive = field.name in POSITIVE_FIELDS
+        self.code = ERROR_CODES.get(field.name, f'INVALID_{field.name.upper()}')
+        if self.comodel:
+            # partner_id -> Partner, PARTNER_NOT_FOUND
+            self.reference = field.name[:-3] if field.name.endswith('_id') else field.name
+            self.code = f'{self.reference.upper()}_NOT_FOUND'
+
+    def _reject(self, message):
+        raise MaterialValidationError(message, self.code)
+
+    def clean(self, value):
+        """The value to give to the ORM, raises MaterialValidationError when malformed"""
+        if value is None or value is False:
+            if self.required:
+                raise MaterialValidationError(f"{self.label} is required", "MISSING_REQUIRED_FIELDS")
+            return False
+        if self.type in ('char', 'text'):
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                self._reject(f"{self.label} must be a string")
+            value = str(value)
+            if self.required and not value.strip():
+                raise MaterialValidationError(f"{self.label} is required", "MISSING_REQUIRED_FIELDS")
+            return value
+        if self.type == 'selection':
+            if value not in self.choices:
+                self._reject(f"Invalid {self.label.lower()}. Allowed values: {', '.join(self.choices)}")
+            return value
+        if self.type in ('float', 'monetary', 'integer'):
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                number = int(value) if self.type == 'integer' else float(value)
+            except (TypeError, ValueError, OverflowError):
+                self._reject(f"{self.label} must be a number")
+            # float() takes "nan", "inf" and 1e999, none of them can be stored or converted
+            if not math.isfinite(number):
+                self._reject(f"{self.label} must be a finite number")
+            if self.positive and number <= 0:
+                self._reject(f"{self.label} must be positive")
+            return number
+        if self.type == 'many2one':
+            if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+                self._reject(f"{self.reference.capitalize()} with ID {value} not found")
+            return value
+        return value
+
+
+class MaterialSchema(object):
+    """
+    Validation schema of the material payloads, compiled once per registry
+    from the fields of material.register, so that the allowed selection
+    values or the required fields never drift from the model
+    """
+
+    def __init__(self, model):
+        self.table = model._table
+        self.rules = [FieldRule(model._fields[name], model.env) for name in MATERIAL_WRITABLE_FIELDS]
+        self.required = [rule.name for rule in self.rules if rule.required]
+        self.references = {rule.name: model.env[rule.comodel]._table for rule in self.rules if rule.comodel}
+
+    def clean(self, data, partial=False):
+        """
+        Check one payload without any query and return the values to create or write
+        With `partial` only the provided fields are checked (update), otherwise
+        every required field must be present (create).
+        """
+        if not isinstance(data, dict):
+            raise MaterialValidationError("Material payload must be an object", "INVALID_PAYLOAD")
+        if not partial:
+            missing_fields = [name for name in self.required if name not in data]
+            if missing_fields:
+                raise MaterialValidationError(
+                    f"Missing required fields: {', '.join(missing_fields)}", "MISSING_REQUIRED_FIELDS")
+        return {rule.name: rule.clean(data[rule.name]) for rule in self.rules if rule.name in data}
+
+    def missing_references(self, cr, values_list):
+        """
+        The referenced ids that do not exist, as {field: ids}, checked with a
+        single query over every relation for the whole batch
+        """
+        requested = {
+            name: {values[name] for values in values_list if values.get(name)}
+            for name in self.references
+        }
+        requested = {name: ids for name, ids in requested.items() if ids}
+        if not requested:
+            return {}
+        cr.execute(' UNION ALL '.join(
+            f'SELECT %s, id FROM "{self.references[name]}" WHERE id IN %s' for name in requested
+        ), [param for name, ids in requested.items() for param in (name, tuple(ids))])
+        found = {}
+        for name, record_id in cr.fetchall():
+            found.setdefault(name, set()).add(record_id)
+        missing = {name: ids - found.get(name, set()) for name, ids in requested.items()}
+        return {name: ids for name, ids in missing.items() if ids}
+
+    def validate(self, env, items, partial=False):
+        """
+        Validate a whole array of payloads in one pass, before any ORM work
+        Returns one (values, error) pair per item, in the order of `items`.
+        """
+        checked = []
+        for item in items:
+            try:
+                checked.append((self.clean(item, partial=partial), None))
+            except MaterialValidationError as e:
+                checked.append((None, e))
+        missing = self.missing_references(env.cr, [values for values, error in checked if error is None])
+        if not missing:
+            return checked
+        rules = {rule.name: rule for rule in self.rules}
+        for position, (values, error) in enumerate(checked):
+            for name, ids in missing.items():
+                if error is None and values.get(name) in ids:
+                    rule = rules[name]
+                    checked[position] = (None, MaterialValidationError(
+                        f"{rule.reference.capitalize()} with ID {values[name]} not found", rule.code))
+                    break
+        return checked
+
+
+def material_schema(env):
+    """The compiled schema of material.register for the registry of `env`"""
+    model = env['material.register']
+    schema = _schemas.get(type(model))
+    if schema is None:
+        schema = _schemas[type(model)] = MaterialSchema(model)
+    return schema
+
+
+def validate_material_values(env, data, partial=False):
+    """
+    Validate one material payload, referenced records included, and return
+    the values to create or write
+    Raises MaterialValidationError on the first invalid value.
+    """
+    values, error = material_schema(env).validate(env, [data], partial=partial)[0]
+    if error is not None:
+        raise error
+    return values
+
+
+def validate_material_payloads(env, items, partial=False):
+    """Validate an array of material payloads, see MaterialSchema.validate"""
+    return material_schema(env).validate(env, items, partial=partial)
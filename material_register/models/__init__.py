@@ -1,3 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from . import material
\ No newline at end of file
+from . import material
+from . import res_users
+from . import ir_http
+from . import material_tombstone
+from . import material_bulk_audit
+from . import material_import
+from . import material_partner_summary
+from . import res_partner
+from . import res_currency
+from . import material_api_quota
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+from odoo.http import request
+
+from ..controllers.auth import apply_response_overrides
+from ..controllers.compression import compress_response
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _dispatch(cls):
+        response = super(IrHttp, cls)._dispatch()
+        if getattr(request, 'material_api_response', None) is None:
+            return response
+        # only the API routes queue response overrides
+        response = apply_response_overrides(response)
+        if hasattr(response, 'headers'):
+            response = compress_response(response, request.httprequest)
+        return response
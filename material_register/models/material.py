@@ -1,25 +1,286 @@
-from odoo import _, api, fields, models
+import logging
+
+from odoo import _, api, fields, models, tools
 from odoo.osv import expression
 from odoo.exceptions import ValidationError
 
+from ..controllers.list_cache import LIST_CACHE_SEQUENCE, invalidate_list_cache
+from ..controllers.search import SEARCH_CONFIG
+
+_logger = logging.getLogger(__name__)
+
+# Changing one of these fields moves a material between partner summaries or changes their amounts,
+# see material.register.partner.summary
+SUMMARY_FIELDS = ('partner_id', 'currency_id', 'material_buy_price')
+
+# Rows updated per statement when the company prices are recomputed after a rate change
+COMPANY_PRICE_BATCH_SIZE = 50000
+
+# Company whose currency material_buy_price_company is expressed in, the main
+# company when not set. The stored price must not depend on the writing user.
+PRICE_COMPANY_PARAM = 'material_register.price_company_id'
+
+# Columns of the full-text search vector, with the partner name
+SEARCH_FIELDS = ('material_code', 'name', 'material_type', 'partner_id')
+SEARCH_VECTOR_BATCH_SIZE = 50000
+# Code and name matches rank above partner name and type matches
+SEARCH_VECTOR_SQL = f"""
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(m.material_code, '')), 'A')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(m.name, '')), 'B')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((SELECT p.name FROM res_partner p WHERE p.id = m.partner_id), '')), 'C')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(m.material_type, '')), 'D')
+"""
+
+# Columns maintained in SQL, the ORM does not know them:
+# - change_txid, id of the transaction that last wrote a row, orders the change
+#   feed by commit visibility. Inserts take it from the column default.
+# - company_price_date, when the company price was last recomputed after a rate
+#   change. Those recomputes keep write_date, the API freshness reads this instead.
+SQL_COLUMNS = {
+    'change_txid': 'bigint DEFAULT txid_current()',
+    'company_price_date': 'timestamp',
+}
+
+# Columns filtered with `ilike` by the API, served by trigram indexes when pg_trgm is available
+TRIGRAM_INDEXED_FIELDS = ['material_code', 'name']
+
 class MaterialRegister(models.Model):
     _name = 'material.register'
     _inherit = ['mail.thread', 'mail.activity.mixin', 'image.mixin']
     _description = 'Material Register'
 
     material_code = fields.Char('Material Code',required=True,tracking=True)
-    name = fields.Char('Material Name',required=True,tracking=True)
+    name = fields.Char('Material Name',required=True,tracking=True,index=True)
     material_type = fields.Selection([
         ('fabric', 'Fabric'),
         ('jeans', 'Jeans'),
         ('cotton', 'Cotton'),
-    ], string='Material Type',default="fabric",required=True,tracking=True)
+    ], string='Material Type',default="fabric",required=True,tracking=True,index=True)
     currency_id = fields.Many2one('res.currency', string='Currency',default=lambda self: self.env.company.currency_id)
     material_buy_price = fields.Monetary('Material Buy Price',required=True,currency_field="currency_id",tracking=True)
-    partner_id = fields.Many2one('res.partner', string='Related Partner',required=True,tracking=True)
+    partner_id = fields.Many2one('res.partner', string='Related Partner',required=True,tracking=True,index=True)
+    company_currency_id = fields.Many2one('res.currency', string='Company Currency', compute='_compute_company_currency_id')
+    material_buy_price_company = fields.Monetary('Buy Price in Company Currency', currency_field='company_currency_id',
+                                                 compute='_compute_material_buy_price_company', store=True, index=True)
+
+    # the unique index also serves the exact lookups by code
+    _sql_constraints = [
+        ('material_code_uniq', 'unique (material_code)', 'Material code must be unique.'),
+    ]
+
+    def _create_sql_columns(self):
+        for column, column_type in SQL_COLUMNS.items():
+            if not tools.column_exists(self._cr, self._table, column):
+                tools.create_column(self._cr, self._table, column, column_type)
+
+    def _auto_init(self):
+        if tools.table_exists(self._cr, self._table):
+            self._create_sql_columns()
+            if not tools.column_exists(self._cr, self._table, 'material_buy_price_company'):
+                # fill the new column in SQL, the ORM would compute it record by record
+                tools.create_column(self._cr, self._table, 'material_buy_price_company', 'numeric')
+                self._recompute_company_prices()
+        result = super(MaterialRegister, self)._auto_init()
+        self._create_sql_columns()
+        if not tools.column_exists(self._cr, self._table, 'search_vector'):
+            # maintained in SQL by the write hooks, the ORM has no tsvector field
+            tools.create_column(self._cr, self._table, 'search_vector', 'tsvector')
+            self._cr.execute(f'SELECT min(id), max(id) FROM "{self._table}"')
+            first_id, last_id = self._cr.fetchone()
+            if first_id is not None:
+                for start in range(first_id, last_id + 1, SEARCH_VECTOR_BATCH_SIZE):
+                    self._update_search_vector('m.id >= %s AND m.id < %s', [start, start + SEARCH_VECTOR_BATCH_SIZE])
+        return result
+
+    def init(self):
+        super(MaterialRegister, self).init()
+        tools.create_index(self._cr, 'material_register_write_date_index', self._table, ['write_date'])
+        tools.create_index(self._cr, 'material_register_change_txid_index', self._table, ['change_txid', 'id'])
+        self._cr.execute(
+            f'CREATE INDEX IF NOT EXISTS "{self._table}_search_vector_index" ON "{self._table}" USING gin (search_vector)')
+        self._cr.execute(f'CREATE SEQUENCE IF NOT EXISTS "{LIST_CACHE_SEQUENCE}"')
+        # rows written in SQL, keyset cursors on the converted price cannot step over NULLs
+        self._cr.execute(f'SELECT 1 FROM "{self._table}" WHERE material_buy_price_company IS NULL LIMIT 1')
+        if self._cr.fetchone():
+            self._recompute_company_prices()
+        if self._pg_trgm_available():
+            for field_name in TRIGRAM_INDEXED_FIELDS:
+                self._cr.execute(
+                    'CREATE INDEX IF NOT EXISTS "{table}_{field}_trgm_index" ON "{table}" USING gin ("{field}" gin_trgm_ops)'.format(
+                        table=self._table, field=field_name))
+        else:
+            _logger.info("pg_trgm is not available, %s ilike searches fall back to btree indexes", self._name)
+
+    def _pg_trgm_available(self):
+        """ Make sure the pg_trgm extension is installed, return whether it can be used """
+        self._cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if self._cr.fetchone():
+            return True
+        try:
+            with self._cr.savepoint():
+                self._cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            return True
+        except Exception:
+            # not superuser and extension not allow-listed
+            return False
+
+    @api.model
+    def _price_company(self):
+        """The company whose currency the buy prices are converted to, the same for every user"""
+        Company = self.env['res.company'].sudo()
+        company_id = self.env['ir.config_parameter'].sudo().get_param(PRICE_COMPANY_PARAM)
+        company = Company.browse(int(company_id)).exists() if str(company_id or '').isdigit() else Company
+        return (company or self.env.ref('base.main_company', raise_if_not_found=False)
+                or Company.search([], order='id', limit=1))
+
+    def _compute_company_currency_id(self):
+        self.company_currency_id = self._price_company().currency_id
+
+    @api.depends('material_buy_price', 'currency_id')
+    def _compute_material_buy_price_company(self):
+        company = self._price_company()
+        target = company.currency_id
+        today = fields.Date.context_today(self)
+        rates = {}
+        for material in self:
+            currency = material.currency_id
+            if not currency or currency == target:
+                material.material_buy_price_company = material.material_buy_price
+                continue
+            if currency not in rates:
+                rates[currency] = currency._get_conversion_rate(currency, target, company, today)
+            material.material_buy_price_company = target.round(material.material_buy_price * rates[currency])
+
+    @api.model
+    def _recompute_company_prices(self, currencies=None):
+        """
+        Convert the buy prices of the materials in `currencies` (all when None)
+        to the currency of the price company at today's rate
+
+        Runs one UPDATE per currency and id range instead of recomputing
+        record by record, rows whose converted price did not change are not
+        rewritten. The converted price is derived data, write_date is kept:
+        the rows get a new company_price_date and change_txid instead, so the
+        API validators and the change feed still see the new price.
+        """
+        company = self._price_company()
+        target = company.currency_id
+        today = fields.Date.context_today(self)
+        self.flush(['material_buy_price', 'currency_id', 'material_buy_price_company'])
+        if currencies is None:
+            self._cr.execute(f'SELECT DISTINCT currency_id FROM "{self._table}" WHERE currency_id IS NOT NULL')
+            currencies = self.env['res.currency'].browse([row[0] for row in self._cr.fetchall()])
+            self._cr.execute(f'''
+                UPDATE "{self._table}"
+                   SET material_buy_price_company = material_buy_price,
+                       company_price_date = now() at time zone 'UTC', change_txid = txid_current()
+                 WHERE currency_id IS NULL AND material_buy_price_company IS DISTINCT FROM material_buy_price
+            ''')
+
+        for currency in currencies:
+            rate = 1.0 if currency == target else currency._get_conversion_rate(currency, target, company, today)
+            self._cr.execute(f'SELECT min(id), max(id) FROM "{self._table}" WHERE currency_id = %s', [currency.id])
+            first_id, last_id = self._cr.fetchone()
+            if first_id is None:
+                continue
+            for start in range(first_id, last_id + 1, COMPANY_PRICE_BATCH_SIZE):
+                self._cr.execute(f'''
+                    UPDATE "{self._table}"
+                       SET material_buy_price_company = round((material_buy_price * %(rate)s)::numeric, %(digits)s),
+                           company_price_date = now() at time zone 'UTC', change_txid = txid_current()
+                     WHERE currency_id = %(currency)s AND id >= %(start)s AND id < %(stop)s
+                       AND material_buy_price_company IS DISTINCT FROM round((material_buy_price * %(rate)s)::numeric, %(digits)s)
+                ''', {'rate': rate, 'digits': target.decimal_places, 'currency': currency.id,
+                      'start': start, 'stop': start + COMPANY_PRICE_BATCH_SIZE})
+        self.invalidate_cache(['material_buy_price_company'])
+        invalidate_list_cache(self.env)
+
+    def _touch_change_txid(self):
+        """Move the materials to the current transaction in the change feed"""
+        if self.ids:
+            self._cr.execute(f'''
+                UPDATE "{self._table}" SET change_txid = txid_current()
+                 WHERE id IN %s AND change_txid IS DISTINCT FROM txid_current()
+            ''', [tuple(self.ids)])
+
+    def _update_search_vector(self, where, params):
+        """Recompute the full-text search vector of the rows of alias `m` matching `where`"""
+        self._cr.execute(f'UPDATE "{self._table}" m SET search_vector = {SEARCH_VECTOR_SQL} WHERE {where}', params)
+
+    def _refresh_search_vector(self):
+        if self.ids:
+            self.flush(list(SEARCH_FIELDS))
+            self.env['res.partner'].flush(['name'])
+            self._update_search_vector('m.id IN %s', [tuple(self.ids)])
+
+    @api.model
+    def _refresh_search_vector_partners(self, partner_ids):
+        """Called when partners are renamed, served by the partner_id index"""
+        if partner_ids:
+            self.env['res.partner'].flush(['name'])
+            self._update_search_vector('m.partner_id IN %s', [tuple(partner_ids)])
+
+    @api.model
+    def _cron_recompute_company_prices(self):
+        """
+        Rates dated today only apply from today on, refresh the converted prices
+        daily. Rate changes trigger it too, see res.currency.rate
+        """
+        self._recompute_company_prices()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(MaterialRegister, self).create(vals_list)
+        invalidate_list_cache(self.env)
+        records._refresh_search_vector()
+        self.env['material.register.partner.summary']._log_materials(records, 1)
+        return records
+
+    def write(self, vals):
+        invalidate_list_cache(self.env)
+        summary = any(field in vals for field in SUMMARY_FIELDS)
+        if summary:
+            self.env['material.register.partner.summary']._log_materials(self, -1)
+        result = super(MaterialRegister, self).write(vals)
+        self._touch_change_txid()
+        if any(field in vals for field in SEARCH_FIELDS):
+            self._refresh_search_vector()
+        if summary:
+            self.env['material.register.partner.summary']._log_materials(self, 1)
+        return result
+
+    def _copy_material_code(self):
+        """The first free code among `CODE (copy)`, `CODE (copy 2)`, ..."""
+        # codes are unique across companies and record rules, look at all of them
+        prefix = self.material_code.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        taken = set(self.sudo().search([('material_code', '=like', prefix + ' (%')]).mapped('material_code'))
+        code = _("%s (copy)") % self.material_code
+        number = 1
+        while code in taken:
+            number += 1
+            code = _("%s (copy %s)") % (self.material_code, number)
+        return code
+
+    def copy(self, default=None):
+        self.ensure_one()
+        default = dict(default or {})
+        if 'material_code' not in default:
+            default['material_code'] = self._copy_material_code()
+        return super(MaterialRegister, self).copy(default)
 
+    def unlink(self):
+        invalidate_list_cache(self.env)
+        self.env['material.register.partner.summary']._log_materials(self, -1)
+        # leave a tombstone behind so the change feed can report the deletion
+        tombstones = [{
+            'material_id': material.id,
+            'material_code': material.material_code,
+            'deleted_uid': self.env.uid,
+        } for material in self]
+        result = super(MaterialRegister, self).unlink()
+        self.env['material.register.tombstone'].sudo().create(tombstones)
+        return result
 
-    
     @api.constrains('material_buy_price')
     def _constrains_material_buy_price(self):
         for record in self:
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+# Buckets unused for this long are full again, their rows can go
+QUOTA_IDLE_DAYS = 1
+
+
+class MaterialRegisterApiQuota(models.Model):
+    _name = 'material.register.api.quota'
+    _description = 'Material API Quota Bucket'
+    _order = 'key'
+    _log_access = False
+
+    # rows are written in SQL by the postgres store of controllers/rate_limit.py
+    key = fields.Char('Bucket', required=True, readonly=True)
+    tokens = fields.Float('Tokens Left', readonly=True)
+    refill_date = fields.Datetime('Refilled On', readonly=True)
+    in_flight = fields.Integer('Requests In Flight', readonly=True)
+    slot_date = fields.Datetime('Last Slot Taken On', readonly=True)
+
+    _sql_constraints = [
+        ('key_uniq', 'unique (key)', 'One bucket per key.'),
+    ]
+
+    @api.autovacuum
+    def _gc_idle_buckets(self):
+        limit = fields.Datetime.now() - timedelta(days=QUOTA_IDLE_DAYS)
+        self._cr.execute("""
+            DELETE FROM material_register_api_quota
+             WHERE refill_date < %s AND (in_flight = 0 OR slot_date < %s)
+        """, [limit, limit])
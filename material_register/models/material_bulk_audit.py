@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models
+from odoo.tools import html_escape
+
+_logger = logging.getLogger(__name__)
+
+
+class MaterialRegisterBulkAudit(models.Model):
+    _name = 'material.register.bulk.audit'
+    _inherit = ['mail.thread']
+    _description = 'Untracked Material Bulk Write'
+    _order = 'id desc'
+
+    operation = fields.Selection([
+        ('create', 'Create'),
+        ('write', 'Update'),
+    ], string='Operation', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='User', required=True, readonly=True, ondelete='restrict')
+    record_count = fields.Integer('Materials', readonly=True)
+    field_names = fields.Char('Fields', readonly=True)
+    material_ids = fields.Text('Material IDs', readonly=True)
+
+    def name_get(self):
+        operations = dict(self._fields['operation'].selection)
+        return [(audit.id, '%s of %s materials' % (operations[audit.operation], audit.record_count)) for audit in self]
+
+    @api.model
+    def _log_untracked_batch(self, operation, material_ids, field_names):
+        """
+        Record one batch written without field tracking, with a single chatter
+        message summarising it instead of one tracking message per material
+        """
+        field_names = sorted(set(field_names))
+        audit = self.sudo().with_context(tracking_disable=True).create({
+            'operation': operation,
+            'user_id': self.env.uid,
+            'record_count': len(material_ids),
+            'field_names': ', '.join(field_names),
+            'material_ids': ','.join(str(material_id) for material_id in material_ids),
+        })
+        verb = 'created' if operation == 'create' else 'updated'
+        audit.message_post(
+            body='<p>%s materials %s by %s without field tracking.</p><p>Fields: %s</p>' % (
+                len(material_ids), verb, html_escape(self.env.user.name), html_escape(', '.join(field_names))),
+            subtype_xmlid='mail.mt_note',
+        )
+        _logger.info("User %s %s %s materials without field tracking (audit %s)",
+                     self.env.uid, verb, len(material_ids), audit.id)
+        return audit
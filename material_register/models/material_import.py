@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import logging
+import time
+
+from odoo import api, fields, models
+
+from ..controllers.batch import audit_untracked_batch, batch_create, untracked_env
+from ..controllers.imports import IMPORT_CHUNK_SIZE, read_csv_header, read_import_chunk
+
+_logger = logging.getLogger(__name__)
+
+# A cron run processes chunks for this long, then triggers itself again
+IMPORT_TIME_BUDGET = 60
+# Per-row errors kept for a job, the following ones are only counted
+IMPORT_MAX_ERRORS = 10000
+
+
+class MaterialRegisterImport(models.Model):
+    _name = 'material.register.import'
+    _description = 'Material Import Job'
+    _order = 'id desc'
+
+    name = fields.Char('File Name', required=True, readonly=True)
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ], string='Format', required=True, readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True, ondelete='set null')
+    user_id = fields.Many2one('res.users', string='User', required=True, readonly=True,
+                              default=lambda self: self.env.user, ondelete='cascade')
+    tracking = fields.Selection([
+        ('full', 'Full'),
+        ('summary', 'Summary'),
+    ], string='Tracking', required=True, default='full', readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', required=True, default='pending', readonly=True, index=True)
+    file_size = fields.Integer('File Size', readonly=True)
+    file_offset = fields.Integer('Bytes Processed', readonly=True)
+    csv_header = fields.Char('CSV Header', readonly=True)
+    rows_processed = fields.Integer('Rows Processed', readonly=True)
+    rows_created = fields.Integer('Materials Created', readonly=True)
+    rows_failed = fields.Integer('Rows Failed', readonly=True)
+    error_ids = fields.One2many('material.register.import.error', 'import_id', string='Row Errors', readonly=True)
+    last_error = fields.Text('Failure', readonly=True)
+    date_start = fields.Datetime('Started On', readonly=True)
+    date_done = fields.Datetime('Finished On', readonly=True)
+
+    @api.model
+    def _create_job(self, data, filename, file_format, tracking='full'):
+        """Store the uploaded file and queue its import, the cron picks it up right away"""
+        job = self.create({
+            'name': filename,
+            'file_format': file_format,
+            'tracking': tracking,
+            'file_size': len(data),
+        })
+        job.sudo().attachment_id = self.env['ir.attachment'].sudo().create({
+            'name': filename,
+            'raw': data,
+            'res_model': self._name,
+            'res_id': job.id,
+        })
+        self._trigger_processing()
+        return job
+
+    def action_resume(self):
+        """Queue failed jobs again, they continue after their last committed chunk"""
+        self.filtered(lambda job: job.state == 'failed').sudo().write({'state': 'pending', 'last_error': False})
+        self._trigger_processing()
+
+    @api.model
+    def _trigger_processing(self):
+        self.env.ref('material_register.ir_cron_material_import').sudo()._trigger()
+
+    def _open_file(self):
+        attachment = self.sudo().attachment_id
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
+
+    def _status_data(self, errors_offset=0, errors_limit=100):
+        self.ensure_one()
+        errors = self.env['material.register.import.error'].search_read(
+            [('import_id', '=', self.id)], ['row', 'code', 'message'],
+            offset=errors_offset, limit=errors_limit, order='row, id')
+        return {
+            'id': self.id,
+            'name': self.name,
+            'format': self.file_format,
+            'tracking': self.tracking,
+            'state': self.state,
+            'progress': round(100.0 * self.file_offset / self.file_size, 2) if self.file_size else 100.0,
+            'bytes_processed': self.file_offset,
+            'bytes_total': self.file_size,
+            'rows_processed': self.rows_processed,
+            'rows_created': self.rows_created,
+            'rows_failed': self.rows_failed,
+            'errors': [{'row': error['row'], 'code': error['code'], 'message': error['message']} for error in errors],
+            'last_error': self.last_error or None,
+            'created_at': self.create_date.isoformat() if self.create_date else None,
+            'started_at': self.date_start.isoformat() if self.date_start else None,
+            'finished_at': self.date_done.isoformat() if self.date_done else None,
+        }
+
+    def _process_chunk(self, chunk_size=None):
+        """
+        Import the next chunk of rows of the job, as the user who uploaded it
+
+        Rows are created with one best effort batch, so a faulty row only
+        fails itself. The job row is updated with the new byte offset in the
+        same transaction as the created materials.
+        """
+        self.ensure_one()
+        job = self.sudo()
+        values = {'state': 'running'}
+        if not job.date_start:
+            values['date_start'] = fields.Datetime.now()
+        with job._open_file() as stream:
+            if job.file_format == 'csv' and not job.csv_header:
+                header, offset = read_csv_header(stream)
+                job.write({'csv_header': json.dumps(header), 'file_offset': offset})
+            header = json.loads(job.csv_header) if job.csv_header else None
+            rows, offset, eof = read_import_chunk(
+                stream, job.file_format, header, job.file_offset, chunk_size or IMPORT_CHUNK_SIZE)
+
+        env = self.env(user=job.user_id.id, su=False)
+        if job.tracking == 'summary':
+            env = untracked_env(env)
+        errors = []
+        items = []
+        row_numbers = []
+        for number, (payload, error) in enumerate(rows, start=job.rows_processed + 1):
+            if error:
+                errors.append({'row': number, 'code': 'INVALID_ROW', 'message': error})
+            else:
+                items.append(payload)
+                row_numbers.append(number)
+        results = batch_create(env, items, atomic=False) if items else []
+        for number, result in zip(row_numbers, results):
+            if not result['success']:
+                errors.append({'row': number, 'code': result['error']['code'], 'message': result['error']['message']})
+        if job.tracking == 'summary':
+            audit_untracked_batch(env, 'create', items, results)
+
+        stored = max(0, min(len(errors), IMPORT_MAX_ERRORS - job.rows_failed))
+        if stored:
+            self.env['material.register.import.error'].sudo().create([
+                dict(error, import_id=job.id) for error in errors[:stored]])
+        created = len([result for result in results if result['success']])
+        values.update({
+            'file_offset': offset,
+            'rows_processed': job.rows_processed + len(rows),
+            'rows_created': job.rows_created + created,
+            'rows_failed': job.rows_failed + len(errors),
+        })
+        if eof:
+            values.update({'state': 'done', 'date_done': fields.Datetime.now()})
+        job.write(values)
+        return eof
+
+    def _lock_next_job(self):
+        """Take the next job to process, jobs locked by another worker are skipped"""
+        self.env.cr.execute("""
+            SELECT id FROM material_register_import
+             WHERE state IN ('pending', 'running')
+             ORDER BY write_date, id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+
+    @api.model
+    def _cron_process_imports(self, time_budget=None):
+        """
+        Process pending import jobs chunk by chunk, committing after each chunk
+
+        A chunk is the unit of progress: when a worker dies the job stays
+        `running` and the next run continues from its last committed offset.
+        Jobs take turns, the least recently updated one goes first.
+        """
+        deadline = time.monotonic() + (time_budget or IMPORT_TIME_BUDGET)
+        while time.monotonic() < deadline:
+            job = self._lock_next_job()
+            if not job:
+                return
+            try:
+                job._process_chunk()
+                self.env.cr.commit()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("Material import %s failed", job.id)
+                job.sudo().write({'state': 'failed', 'last_error': str(e)})
+                self.env.cr.commit()
+            self.env.clear()
+        if self.search_count([('state', 'in', ('pending', 'running'))]):
+            self._trigger_processing()
+
+
+class MaterialRegisterImportError(models.Model):
+    _name = 'material.register.import.error'
+    _description = 'Material Import Row Error'
+    _order = 'row, id'
+    _log_access = False
+
+    import_id = fields.Many2one('material.register.import', string='Import', required=True,
+                                index=True, ondelete='cascade')
+    row = fields.Integer('Row', required=True)
+    code = fields.Char('Code')
+    message = fields.Char('Message')
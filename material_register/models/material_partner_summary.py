@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+
+# Append-only log of the summary changes of the material writes, folded into
+# the summaries by the cron. Material writes never update a summary row, so
+# concurrent writes on the materials of one partner never conflict.
+DELTA_TABLE = 'material_register_partner_summary_delta'
+FOLD_CRON = 'material_register.ir_cron_material_partner_summary'
+
+
+class MaterialRegisterPartnerSummary(models.Model):
+    _name = 'material.register.partner.summary'
+    _description = 'Material Summary per Partner'
+    _order = 'material_count desc, id'
+    _log_access = False
+
+    partner_id = fields.Many2one('res.partner', string='Partner', required=True, readonly=True,
+                                 index=True, ondelete='cascade')
+    currency_id = fields.Many2one('res.currency', string='Currency', required=True, readonly=True,
+                                  ondelete='cascade')
+    material_count = fields.Integer('Materials', readonly=True)
+    price_total = fields.Monetary('Total Buy Price', currency_field='currency_id', readonly=True)
+    latest_buy_price = fields.Monetary('Latest Buy Price', currency_field='currency_id', readonly=True)
+    latest_material_id = fields.Many2one('material.register', string='Latest Material', readonly=True,
+                                         ondelete='set null')
+    refreshed_date = fields.Datetime('Refreshed On', readonly=True)
+
+    _sql_constraints = [
+        ('partner_currency_uniq', 'unique (partner_id, currency_id)', 'One summary per partner and currency.'),
+    ]
+
+    def init(self):
+        self._cr.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{DELTA_TABLE}" (
+                id bigserial PRIMARY KEY,
+                material_id integer NOT NULL,
+                partner_id integer NOT NULL REFERENCES res_partner (id) ON DELETE CASCADE,
+                currency_id integer NOT NULL REFERENCES res_currency (id) ON DELETE CASCADE,
+                count_delta integer NOT NULL,
+                price_delta numeric NOT NULL
+            )
+        """)
+        # the latest material of a summary is found with one index lookup
+        self._cr.execute(
+            'CREATE INDEX IF NOT EXISTS "material_register_partner_currency_id_index"'
+            ' ON "material_register" (partner_id, currency_id, id)')
+        # rebuild everything on install and upgrade, this also repairs any drift
+        self._refresh(None)
+
+    @api.model
+    def _log_materials(self, materials, sign):
+        """
+        Log the summary change of adding (`sign` 1) or removing (`sign` -1)
+        the current values of `materials`, folded later by the cron
+        Materials without a currency are left out, their amounts have no unit.
+        """
+        if not materials.ids:
+            return
+        materials.flush(['partner_id', 'currency_id', 'material_buy_price'])
+        self._cr.execute(f"""
+            INSERT INTO "{DELTA_TABLE}" (material_id, partner_id, currency_id, count_delta, price_delta)
+            SELECT id, partner_id, currency_id, %s, %s * material_buy_price
+              FROM material_register
+             WHERE id IN %s AND currency_id IS NOT NULL
+        """, [sign, sign, tuple(materials.ids)])
+        postcommit = self._cr.postcommit
+        if not postcommit.data.get('material_summary_fold_triggered'):
+            postcommit.data['material_summary_fold_triggered'] = True
+            cron = self.env.ref(FOLD_CRON, raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+
+    @api.model
+    def _fold_deltas(self):
+        """
+        Apply the logged changes to the summaries, the cost follows the
+        number of changes, not the materials of the partners
+
+        Counts and totals are moved by the deltas. The latest material is
+        looked up again only when a change touched a material at least as
+        recent as it: a new material, or the latest one written or removed.
+        Only the cron folds, a single worker at a time.
+        """
+        self.flush()
+        self._cr.execute(f"""
+            WITH folded AS (
+                DELETE FROM "{DELTA_TABLE}"
+                RETURNING material_id, partner_id, currency_id, count_delta, price_delta
+            ), deltas AS (
+                SELECT partner_id, currency_id, sum(count_delta) AS material_count,
+                       sum(price_delta) AS price_total, max(material_id) AS material_id
+                  FROM folded
+                 GROUP BY partner_id, currency_id
+            )
+            INSERT INTO material_register_partner_summary AS s
+                   (partner_id, currency_id, material_count, price_total, refreshed_date)
+            SELECT partner_id, currency_id, material_count, price_total, now() at time zone 'UTC'
+              FROM deltas
+                ON CONFLICT (partner_id, currency_id) DO UPDATE
+               SET material_count = s.material_count + EXCLUDED.material_count,
+                   price_total = s.price_total + EXCLUDED.price_total,
+                   latest_buy_price = CASE WHEN s.latest_material_id >= (
+                       SELECT d.material_id FROM deltas d
+                        WHERE d.partner_id = s.partner_id AND d.currency_id = s.currency_id
+                   ) THEN s.latest_buy_price END,
+                   refreshed_date = EXCLUDED.refreshed_date
+            RETURNING id
+        """)
+        summary_ids = tuple(row[0] for row in self._cr.fetchall())
+        if summary_ids:
+            self._cr.execute("""
+                DELETE FROM material_register_partner_summary WHERE id IN %s AND material_count <= 0
+            """, [summary_ids])
+            # new summaries and the summaries whose latest material changed have no latest price
+            self._cr.execute("""
+                UPDATE material_register_partner_summary s
+                   SET (latest_material_id, latest_buy_price) = (
+                       SELECT m.id, m.material_buy_price FROM material_register m
+                        WHERE m.partner_id = s.partner_id AND m.currency_id = s.currency_id
+                        ORDER BY m.id DESC LIMIT 1)
+                 WHERE s.id IN %s AND s.latest_buy_price IS NULL
+            """, [summary_ids])
+        self.invalidate_cache()
+        return len(summary_ids)
+
+    @api.model
+    def _cron_fold_deltas(self):
+        self._fold_deltas()
+
+    def _refresh(self, partner_ids):
+        """
+        Rebuild the summaries of `partner_ids` (every partner when None)
+        from their materials, with the partner_id index the cost is
+        proportional to the materials of these partners, not to the whole
+        table. Pending changes of these partners are dropped, the rebuild
+        already counts them.
+
+        Latest is the most recently registered material. Materials without
+        a currency are left out, their amounts have no unit.
+        """
+        where = 'partner_id IN %s' if partner_ids else 'TRUE'
+        params = [partner_ids] if partner_ids else []
+        self._cr.execute(f'DELETE FROM "{DELTA_TABLE}" WHERE {where}', params)
+        self._cr.execute(f"""
+            WITH totals AS (
+                SELECT partner_id, currency_id, count(*) AS material_count,
+                       sum(material_buy_price) AS price_total,
+                       (array_agg(material_buy_price ORDER BY id DESC))[1] AS latest_buy_price,
+                       max(id) AS latest_material_id
+                  FROM material_register
+                 WHERE {where} AND currency_id IS NOT NULL
+                 GROUP BY partner_id, currency_id
+            ), upserted AS (
+                INSERT INTO material_register_partner_summary
+                       (partner_id, currency_id, material_count, price_total, latest_buy_price,
+                        latest_material_id, refreshed_date)
+                SELECT partner_id, currency_id, material_count, price_total, latest_buy_price,
+                       latest_material_id, now() at time zone 'UTC'
+                  FROM totals
+                    ON CONFLICT (partner_id, currency_id) DO UPDATE
+                   SET material_count = EXCLUDED.material_count,
+                       price_total = EXCLUDED.price_total,
+                       latest_buy_price = EXCLUDED.latest_buy_price,
+                       latest_material_id = EXCLUDED.latest_material_id,
+                       refreshed_date = EXCLUDED.refreshed_date
+                RETURNING id
+            )
+            DELETE FROM material_register_partner_summary
+             WHERE {where} AND id NOT IN (SELECT id FROM upserted)
+        """, params * 2)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import api, fields, models, tools
+
+# Tombstones older than this are purged, change tokens older than this must resync
+TOMBSTONE_RETENTION_DAYS = 90
+
+
+class MaterialRegisterTombstone(models.Model):
+    _name = 'material.register.tombstone'
+    _description = 'Deleted Material Register'
+    _order = 'deleted_date, id'
+    _log_access = False
+
+    material_id = fields.Integer('Material ID', required=True, readonly=True)
+    material_code = fields.Char('Material Code', readonly=True)
+    deleted_date = fields.Datetime('Deleted On', required=True, readonly=True, default=fields.Datetime.now)
+    deleted_uid = fields.Many2one('res.users', string='Deleted By', readonly=True, ondelete='set null')
+
+    def _auto_init(self):
+        result = super(MaterialRegisterTombstone, self)._auto_init()
+        if not tools.column_exists(self._cr, self._table, 'change_txid'):
+            # set by the column default when the tombstone is inserted, see the change feed
+            tools.create_column(self._cr, self._table, 'change_txid', 'bigint DEFAULT txid_current()')
+        return result
+
+    def init(self):
+        tools.create_index(self._cr, 'material_register_tombstone_change_txid_index', self._table, ['change_txid', 'id'])
+
+    @api.model
+    def _retention_days(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'material_register.tombstone_retention_days', TOMBSTONE_RETENTION_DAYS))
+
+    @api.autovacuum
+    def _gc_tombstones(self):
+        limit_date = fields.Datetime.now() - timedelta(days=self._retention_days())
+        self.search([('deleted_date', '<', limit_date)]).unlink()
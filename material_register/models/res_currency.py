@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from odoo import api, models
+
+from ..controllers.list_cache import invalidate_list_cache
+
+# Currency fields shown by the material list endpoint
+LISTED_CURRENCY_FIELDS = ('name', 'symbol')
+# Daily conversion of the buy prices, also run as soon as possible after a rate change
+COMPANY_PRICE_CRON = 'material_register.ir_cron_material_company_prices'
+
+
+class ResCurrency(models.Model):
+    _inherit = 'res.currency'
+
+    def write(self, vals):
+        if any(field in vals for field in LISTED_CURRENCY_FIELDS):
+            invalidate_list_cache(self.env)
+        return super(ResCurrency, self).write(vals)
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    def _recompute_material_prices(self, currencies):
+        """
+        Schedule the conversion of the buy prices after a rate change, the
+        cron rewrites the rows whose converted price moved, outside of the
+        request editing the rate. Tests convert synchronously.
+        """
+        cron = self.env.ref(COMPANY_PRICE_CRON, raise_if_not_found=False)
+        if cron and not getattr(threading.current_thread(), 'testing', False):
+            cron.sudo()._trigger()
+            return
+        Material = self.env['material.register'].sudo()
+        # the company currency converts every other currency
+        if Material._price_company().currency_id in currencies:
+            currencies = None
+        Material._recompute_company_prices(currencies)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rates = super(ResCurrencyRate, self).create(vals_list)
+        self._recompute_material_prices(rates.currency_id)
+        return rates
+
+    def write(self, vals):
+        currencies = self.currency_id
+        result = super(ResCurrencyRate, self).write(vals)
+        self._recompute_material_prices(currencies | self.currency_id)
+        return result
+
+    def unlink(self):
+        currencies = self.currency_id
+        result = super(ResCurrencyRate, self).unlink()
+        self._recompute_material_prices(currencies)
+        return result
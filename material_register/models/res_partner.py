@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+from ..controllers.list_cache import invalidate_list_cache
+
+# Partner fields shown by the material list endpoint
+LISTED_PARTNER_FIELDS = ('name',)
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    def write(self, vals):
+        if not any(field in vals for field in LISTED_PARTNER_FIELDS):
+            return super(ResPartner, self).write(vals)
+        invalidate_list_cache(self.env)
+        result = super(ResPartner, self).write(vals)
+        if 'name' in vals:
+            # the partner name is part of the search vector of its materials,
+            # change feed consumers mirroring it must see the rename too
+            Material = self.env['material.register'].sudo()
+            Material._refresh_search_vector_partners(self.ids)
+            Material.search([('partner_id', 'in', self.ids)])._touch_change_txid()
+        return result
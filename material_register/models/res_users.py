@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+from ..controllers.auth_cache import auth_cache
+
+# Changing one of these fields must log the user out of the API
+AUTH_FIELDS = ('password', 'active', 'login')
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    def _invalidate_api_auth_cache(self):
+        auth_cache.invalidate_uids(self.ids)
+        # bump the registry cache sequence so other workers drop their entries too
+        self.clear_caches()
+
+    def write(self, vals):
+        if any(field in vals for field in AUTH_FIELDS):
+            self._invalidate_api_auth_cache()
+        return super(ResUsers, self).write(vals)
+
+    def _set_encrypted_password(self, uid, pw):
+        self.browse(uid)._invalidate_api_auth_cache()
+        return super(ResUsers, self)._set_encrypted_password(uid, pw)
+
+    def unlink(self):
+        self._invalidate_api_auth_cache()
+        return super(ResUsers, self).unlink()
+
+
+class ResUsersApikeys(models.Model):
+    _inherit = 'res.users.apikeys'
+
+    def unlink(self):
+        self.sudo().user_id._invalidate_api_auth_cache()
+        return super(ResUsersApikeys, self).unlink()
@@ -1,2 +1,21 @@
 from . import common
 from . import test_material
+from . import test_pagination
+from . import test_performance
+from . import test_serializers
+from . import test_batch
+from . import test_auth_cache
+from . import test_export
+from . import test_conditional
+from . import test_changes
+from . import test_instrumentation
+from . import test_stats
+from . import test_import
+from . import test_list_cache
+from . import test_partner_summary
+from . import test_images
+from . import test_envelope
+from . import test_search
+from . import test_validation
+from . import test_rate_limit
+from . import test_compression
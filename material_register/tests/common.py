@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo.tests import common
+from odoo.tools import config
 
 
 class TestMaterialCommon(common.SavepointCase):
@@ -22,4 +23,36 @@ class TestMaterialCommon(common.SavepointCase):
             'material_buy_price' : 100000,
             'partner_id': cls.partner_1.id,
             'currency_id': cls.currency_id.id
-        })
\ No newline at end of file
+        })
+
+
+class TestMaterialApiCommon(common.HttpCase):
+    """Base class for tests going through the /api/v1 JSON routes"""
+
+    def setUp(self):
+        super(TestMaterialApiCommon, self).setUp()
+        self.authenticate(None, None)
+        self.api_user = self.env.ref('base.user_admin')
+        self.api_key = self.env['res.users.apikeys'].with_user(self.api_user)._generate(
+            'material_register_api', 'Material API test')
+        self.partner_1 = self.env['res.partner'].create({
+            'name': 'Julia Agrolait',
+            'email': 'julia@agrolait.example.com',
+        })
+
+    def api_url(self, path):
+        return 'http://%s:%s%s' % (common.HOST, config['http_port'], path)
+
+    def api_request(self, method, url, params=None, headers=None):
+        """Send a JSON-RPC request to `url` and return the raw HTTP response"""
+        headers = dict({'Authorization': 'Bearer %s' % self.api_key}, **(headers or {}))
+        return self.opener.request(
+            method, self.api_url(url),
+            json={'jsonrpc': '2.0', 'method': 'call', 'params': params or {}},
+            headers=headers, timeout=120)
+
+    def api_call(self, method, url, params=None, headers=None):
+        """Send a JSON-RPC request to `url` and return the API payload"""
+        response = self.api_request(method, url, params=params, headers=headers)
+        response.raise_for_status()
+        return response.json()['result']
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest.mock import patch
+
+from odoo.tests import common
+
+from odoo.addons.material_register.controllers.auth_cache import AuthCache, auth_cache
+
+
+class TestAuthCache(common.TransactionCase):
+
+    def test_lru_and_ttl(self):
+        cache = AuthCache(max_size=2, ttl=60)
+        cache.set('a', 1, 0)
+        cache.set('b', 2, 0)
+        self.assertEqual(cache.get('a', 0), 1)
+        cache.set('c', 3, 0)
+        self.assertIsNone(cache.get('b', 0), "least recently used entry is evicted")
+        self.assertIsNone(cache.get('a', 1), "entries of another cache sequence are stale")
+        with patch.object(time, 'monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get('c', 0))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_revocation_invalidates(self):
+        user = self.env.ref('base.user_admin')
+        key = auth_cache.digest(self.env.cr.dbname, 'Bearer test-token')
+        auth_cache.set(key, user.id, 0)
+        user.write({'password': 'new-admin-password'})
+        self.assertIsNone(auth_cache.get(key, 0))
+
+        auth_cache.set(key, user.id, 0)
+        self.env['res.users.apikeys'].with_user(user)._generate('material_register_api', 'Revoked')
+        self.env['res.users.apikeys'].search([('user_id', '=', user.id)]).unlink()
+        self.assertIsNone(auth_cache.get(key, 0))
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.controllers.batch import (
+    audit_untracked_batch, batch_create, batch_delete, batch_update, parse_tracking_mode, resolve_codes,
+    untracked_env,
+)
+from odoo.addons.material_register.controllers.validation import MaterialValidationError
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon, TestMaterialCommon
+
+
+class TestMaterialBatch(TestMaterialCommon):
+
+    def _payload(self, code, **values):
+        payload = {
+            'material_code': code,
+            'name': 'Batch %s' % code,
+            'material_type': 'cotton',
+            'material_buy_price': 1500,
+            'partner_id': self.partner_1.id,
+        }
+        payload.update(values)
+        return payload
+
+    def test_batch_create_atomic(self):
+        results = batch_create(self.env, [self._payload('B1'), self._payload('B2')])
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(self.env['material.register'].search_count([('material_code', 'in', ['B1', 'B2'])]), 2)
+
+        results = batch_create(self.env, [self._payload('B3'), self._payload('B4', material_type='silk')])
+        self.assertEqual(results[0]['error']['code'], 'BATCH_ABORTED')
+        self.assertEqual(results[1]['error']['code'], 'INVALID_MATERIAL_TYPE')
+        self.assertFalse(self.env['material.register'].search([('material_code', '=', 'B3')]))
+
+    def test_batch_create_best_effort(self):
+        results = batch_create(self.env, [
+            self._payload('B5'),
+            self._payload('B6', partner_id=0),
+            self._payload('B7', material_buy_price=50),
+        ], atomic=False)
+        self.assertTrue(results[0]['success'])
+        self.assertEqual(results[1]['error']['code'], 'PARTNER_NOT_FOUND')
+        # rejected by the model constraint while replaying the batch item by item
+        self.assertEqual(results[2]['error']['code'], 'ITEM_ERROR')
+        self.assertEqual(self.env['material.register'].search([('material_code', 'in', ['B5', 'B7'])]).mapped('material_code'), ['B5'])
+
+    def test_batch_update_and_delete(self):
+        materials = self.env['material.register'].create([self._payload('U%s' % i) for i in range(3)])
+        items = [{'id': material.id, 'material_type': 'jeans'} for material in materials]
+        items.append({'id': materials[0].id, 'name': 'Twice'})
+        results = batch_update(self.env, items, atomic=False)
+        self.assertEqual([result['success'] for result in results], [True, True, True, False])
+        self.assertEqual(set(materials.mapped('material_type')), {'jeans'})
+
+        results = batch_delete(self.env, materials.ids + [0])
+        self.assertEqual(results[-1]['error']['code'], 'MISSING_ID')
+        self.assertTrue(materials.exists())
+        results = batch_delete(self.env, materials.ids)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertFalse(materials.exists())
+
+    def test_untracked_batch(self):
+        self.assertFalse(parse_tracking_mode({}, {}))
+        self.assertTrue(parse_tracking_mode({}, {'X-Tracking': 'summary'}))
+        self.assertFalse(parse_tracking_mode({'tracking': 'full'}, {'X-Tracking': 'summary'}))
+        with self.assertRaises(MaterialValidationError):
+            parse_tracking_mode({'tracking': 'none'}, {})
+
+        user = self.env['res.users'].create({
+            'name': 'Importer',
+            'login': 'material_importer',
+            'groups_id': [(6, 0, [self.env.ref('base.group_user').id])],
+        })
+        with self.assertRaises(MaterialValidationError) as error:
+            untracked_env(self.env(user=user))
+        self.assertEqual(error.exception.code, 'TRACKING_FORBIDDEN')
+
+        user.groups_id = [(4, self.env.ref('material_register.group_material_untracked_write').id)]
+        env = untracked_env(self.env(user=user))
+        items = [self._payload('T1'), self._payload('T2')]
+        results = batch_create(env, items)
+        materials = self.env['material.register'].browse([result['id'] for result in results])
+        self.assertFalse(materials.message_ids)
+        self.assertFalse(materials.message_follower_ids)
+
+        audit = audit_untracked_batch(env, 'create', items, results)
+        self.assertEqual(audit.record_count, 2)
+        self.assertEqual(audit.material_ids, ','.join(str(material_id) for material_id in materials.ids))
+        self.assertEqual(len(audit.message_ids.filtered(lambda message: message.message_type == 'comment')), 1)
+
+        results = batch_update(env, [{'id': material.id, 'name': 'Renamed'} for material in materials])
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertFalse(materials.message_ids)
+
+    def test_batch_upsert_by_code(self):
+        self.assertEqual(resolve_codes(self.env, ['KS', 'UNKNOWN']), {'KS': self.material1.id})
+
+        results = batch_create(self.env, [
+            self._payload('KS', material_buy_price=2500),
+            self._payload('UP1'),
+            self._payload('UP1', name='Again'),
+        ], atomic=False, upsert=True)
+        self.assertEqual((results[0]['id'], results[0]['created']), (self.material1.id, False))
+        self.assertTrue(results[1]['created'])
+        self.assertEqual(results[2]['error']['code'], 'DUPLICATE_CODE')
+        self.assertEqual(self.material1.material_buy_price, 2500)
+        self.assertEqual(self.material1.name, 'Batch KS')
+        self.assertEqual(self.env['material.register'].search_count([('material_code', '=', 'UP1')]), 1)
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialCodeConflicts(TestMaterialApiCommon):
+
+    def setUp(self):
+        super(TestMaterialCodeConflicts, self).setUp()
+        self.materials = self.env['material.register'].create([{
+            'name': 'Taken %s' % code,
+            'material_code': code,
+            'material_type': 'fabric',
+            'material_buy_price': 500,
+            'partner_id': self.partner_1.id,
+        } for code in ('DUP1', 'DUP2')])
+
+    def _payload(self, code):
+        return {
+            'material_code': code,
+            'name': 'New %s' % code,
+            'material_type': 'cotton',
+            'material_buy_price': 1500,
+            'partner_id': self.partner_1.id,
+        }
+
+    def test_duplicate_single_create(self):
+        result = self.api_call('POST', '/api/v1/materials', self._payload('DUP1'))
+        self.assertEqual(result['error']['code'], 'DUPLICATE_CODE')
+        self.assertNotIn('material_register_material_code_uniq', result['error']['message'])
+        self.assertEqual(self.env['material.register'].search_count([('material_code', '=', 'DUP1')]), 1)
+
+    def test_duplicate_update(self):
+        url = '/api/v1/materials/%s' % self.materials[1].id
+        result = self.api_call('PUT', url, {'material_code': 'DUP1'})
+        self.assertEqual(result['error']['code'], 'DUPLICATE_CODE')
+        # keeping its own code is not a conflict
+        result = self.api_call('PUT', url, {'material_code': 'DUP2', 'name': 'Kept'})
+        self.assertTrue(result['success'], result)
+
+    def test_duplicate_in_atomic_batch(self):
+        result = self.api_call('POST', '/api/v1/materials/batch', {
+            'items': [self._payload('NEW1'), self._payload('DUP1')]})
+        self.assertEqual(result['error']['code'], 'BATCH_VALIDATION_ERROR')
+        details = result['error']['details']
+        self.assertEqual([item['error']['code'] for item in details], ['BATCH_ABORTED', 'DUPLICATE_CODE'])
+        self.assertFalse(self.env['material.register'].search([('material_code', '=', 'NEW1')]))
+
+        result = self.api_call('PUT', '/api/v1/materials/batch', {'items': [
+            {'id': self.materials[0].id, 'material_code': 'SWAP'},
+            {'id': self.materials[1].id, 'material_code': 'SWAP'},
+        ]})
+        self.assertEqual(result['error']['details'][1]['error']['code'], 'DUPLICATE_CODE')
+
+    def test_duplicate_in_best_effort_batch(self):
+        result = self.api_call('POST', '/api/v1/materials/batch', {'mode': 'best_effort', 'items': [
+            self._payload('NEW2'), self._payload('DUP2'), self._payload('NEW2'),
+        ]})
+        self.assertEqual([item['success'] for item in result['data']], [True, False, False])
+        self.assertEqual(
+            [item['error']['code'] for item in result['data'][1:]], ['DUPLICATE_CODE', 'DUPLICATE_CODE'])
+
+        result = self.api_call('PUT', '/api/v1/materials/batch', {'mode': 'best_effort', 'items': [
+            {'id': self.materials[0].id, 'material_code': 'DUP2'},
+            {'id': self.materials[1].id, 'name': 'Renamed'},
+        ]})
+        self.assertEqual(result['data'][0]['error']['code'], 'DUPLICATE_CODE')
+        self.assertTrue(result['data'][1]['success'])
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.material_register.controllers import changes
+from odoo.addons.material_register.controllers.changes import InvalidChangeToken, feed_watermark, read_changes
+from odoo.addons.material_register.controllers.serializers import MATERIAL_LIST_SPEC
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestMaterialChanges(TestMaterialCommon):
+
+    def setUp(self):
+        super(TestMaterialChanges, self).setUp()
+        # this transaction is still running, raise the watermark above it to see its rows
+        self.patch(changes, 'feed_watermark', self._past_current_transaction)
+
+    @staticmethod
+    def _past_current_transaction(cr):
+        cr.execute("SELECT txid_current() + 1")
+        return cr.fetchone()[0]
+
+    def _drain(self, since=None, limit=2):
+        events = []
+        while True:
+            page, since, has_more = read_changes(self.env, since=since, limit=limit, spec=MATERIAL_LIST_SPEC)
+            events += page
+            if not has_more:
+                return events, since
+
+    def test_feed_upserts_and_tombstones(self):
+        materials = self.env['material.register'].create([{
+            'name': 'Feed %s' % index,
+            'material_code': 'FD%s' % index,
+            'material_type': 'fabric',
+            'material_buy_price': 150,
+            'partner_id': self.partner_1.id,
+        } for index in range(3)])
+        materials[0].unlink()
+        events, token = self._drain()
+        upserted = [event['id'] for event in events if event['op'] == 'upsert']
+        self.assertTrue(set(materials[1:].ids) <= set(upserted))
+        self.assertNotIn(materials[0].id, upserted)
+        self.assertEqual(len(upserted), len(set(upserted)), "each change is reported once")
+        self.assertTrue(all(event['material']['id'] == event['id'] for event in events if event['op'] == 'upsert'))
+        deleted = [event for event in events if event['op'] == 'delete']
+        self.assertEqual([(event['id'], event['material_code']) for event in deleted], [(materials[0].id, 'FD0')])
+
+        events, token = self._drain(token)
+        self.assertFalse(events)
+
+    def test_running_transaction_held_back(self):
+        material = self.env['material.register'].create({
+            'name': 'Uncommitted',
+            'material_code': 'FDX',
+            'material_type': 'fabric',
+            'material_buy_price': 150,
+            'partner_id': self.partner_1.id,
+        })
+        self.patch(changes, 'feed_watermark', feed_watermark)
+        events, token = self._drain()
+        # written by a transaction still running, reported once it has ended
+        self.assertNotIn(material.id, [event['id'] for event in events])
+        self.env.cr.execute("SELECT txid_current()")
+        self.assertLessEqual(changes.decode_token(token)['m'][0], self.env.cr.fetchone()[0])
+
+    def test_partner_rename_moves_materials(self):
+        self.material1.flush()
+        # as if the material was written by an older transaction
+        self.env.cr.execute("UPDATE material_register SET change_txid = 1 WHERE id = %s", [self.material1.id])
+        self.partner_1.name = 'Julia Renamed'
+        self.env.cr.execute(
+            "SELECT change_txid = txid_current() FROM material_register WHERE id = %s", [self.material1.id])
+        self.assertTrue(self.env.cr.fetchone()[0])
+
+    def test_invalid_token(self):
+        with self.assertRaises(InvalidChangeToken):
+            read_changes(self.env, since='garbage')
+        expired = changes.encode_token({'m': [1, 1], 't': None, 'at': '2000-01-01 00:00:00'})
+        with self.assertRaises(InvalidChangeToken) as error:
+            read_changes(self.env, since=expired)
+        self.assertEqual(error.exception.code, 'CHANGE_TOKEN_EXPIRED')
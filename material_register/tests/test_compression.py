@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialCompression(TestMaterialApiCommon):
+
+    def setUp(self):
+        super(TestMaterialCompression, self).setUp()
+        self.materials = self.env['material.register'].with_context(tracking_disable=True).create([{
+            'name': 'Wire %s' % index,
+            'material_code': 'WIRE%03d' % index,
+            'material_type': 'fabric',
+            'material_buy_price': 250,
+            'partner_id': self.partner_1.id,
+        } for index in range(30)])
+
+    def test_compact_list(self):
+        params = {'material_code': 'WIRE', 'limit': 30, 'order': 'id asc'}
+        rows = self.api_call('GET', '/api/v1/materials', params)['data']
+        compact = self.api_call('GET', '/api/v1/materials', dict(params, format='compact'))['data']
+        self.assertEqual(compact['columns']['id'], self.materials.ids)
+        self.assertEqual(compact['columns']['partner'], [self.partner_1.id] * 30)
+        self.assertEqual(compact['included']['partner'], [rows[0]['partner']])
+        self.assertLess(len(json.dumps(compact)), len(json.dumps(rows)))
+
+        result = self.api_call('GET', '/api/v1/materials', dict(params, format='xml'))
+        self.assertEqual(result['error']['code'], 'INVALID_FORMAT')
+
+    def test_gzip_list(self):
+        params = {'material_code': 'WIRE', 'limit': 30}
+        response = self.api_request('GET', '/api/v1/materials', params, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(len(response.json()['result']['data']), 30)
+
+        response = self.api_request('GET', '/api/v1/materials', params, headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_gzip_export(self):
+        response = self.opener.get(
+            self.api_url('/api/v1/materials/export'), params={'material_code': 'WIRE'},
+            headers={'Authorization': 'Bearer %s' % self.api_key, 'Accept-Encoding': 'gzip'}, stream=True)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(response.raw.read(decode_content=False)).splitlines()
+        self.assertEqual(len(lines), 30)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialConditionalRequests(TestMaterialApiCommon):
+
+    def setUp(self):
+        super(TestMaterialConditionalRequests, self).setUp()
+        self.material = self.env['material.register'].create({
+            'name': 'Polled',
+            'material_code': 'POLL',
+            'material_type': 'fabric',
+            'material_buy_price': 300,
+            'partner_id': self.partner_1.id,
+        })
+
+    def _touch(self, records):
+        # the whole test runs in one transaction, where now() never moves
+        records.flush()
+        self.env.cr.execute(
+            'UPDATE "%s" SET write_date = write_date + interval \'1 second\' WHERE id IN %%s' % records._table,
+            [tuple(records.ids)])
+        records.invalidate_cache()
+
+    def test_get_material_etag(self):
+        url = '/api/v1/materials/%s' % self.material.id
+        response = self.api_request('GET', url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertTrue(response.headers.get('Last-Modified'))
+
+        response = self.api_request('GET', url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.content)
+
+        # renaming the partner changes the representation
+        self.partner_1.name = 'Julia Renamed'
+        self._touch(self.partner_1)
+        response = self.api_request('GET', url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result']['data']['partner']['name'], 'Julia Renamed')
+
+    def test_get_materials_etag(self):
+        params = {'material_code': 'POLL'}
+        response = self.api_request('GET', '/api/v1/materials', params)
+        etag = response.headers['ETag']
+        response = self.api_request('GET', '/api/v1/materials', params, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.material.write({'material_buy_price': 400})
+        self._touch(self.material)
+        response = self.api_request('GET', '/api/v1/materials', params, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_rate_change_etag(self):
+        company = self.env['material.register']._price_company()
+        currency = self.env['res.currency'].with_context(active_test=False).search(
+            [('name', 'in', ['EUR', 'USD']), ('id', '!=', company.currency_id.id)], limit=1)
+        currency.active = True
+        currency.rate_ids.unlink()
+        self.env['res.currency.rate'].create({'currency_id': currency.id, 'rate': 0.5, 'company_id': company.id})
+        self.material.currency_id = currency
+        self.material.flush()
+        # written an hour ago, the rate change below happens now
+        self.env.cr.execute(
+            'UPDATE material_register SET write_date = write_date - interval \'1 hour\' WHERE id = %s',
+            [self.material.id])
+        url = '/api/v1/materials/%s' % self.material.id
+        etag = self.api_request('GET', url).headers['ETag']
+
+        # recomputing the company price keeps write_date, the validators still change
+        currency.rate_ids.write({'rate': 0.25})
+        response = self.api_request('GET', url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.json()['result']['data']['material_buy_price_company'], 1200)
+
+    def test_get_materials_no_last_modified(self):
+        params = {'material_code': 'POLL'}
+        response = self.api_request('GET', '/api/v1/materials', params)
+        self.assertNotIn('Last-Modified', response.headers)
+        # the dates of the remaining rows would not move when one is deleted
+        self.material.unlink()
+        response = self.api_request('GET', '/api/v1/materials', params, headers={
+            'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['result']['data'])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.controllers.controllers import MaterialRegisterAPI
+from odoo.addons.material_register.controllers.envelope import envelope_routes, match_operation, parse_envelope
+from odoo.addons.material_register.controllers.rate_limit import MemoryQuotaStore, QuotaPolicy, rate_limiter
+from odoo.addons.material_register.controllers.validation import MaterialValidationError
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialEnvelope(TestMaterialApiCommon):
+
+    def setUp(self):
+        super(TestMaterialEnvelope, self).setUp()
+        self.material = self.env['material.register'].create({
+            'name': 'Enveloped',
+            'material_code': 'ENV1',
+            'material_type': 'fabric',
+            'material_buy_price': 500,
+            'partner_id': self.partner_1.id,
+        })
+        self.path = '/api/v1/materials/%s' % self.material.id
+
+    def test_match_operation(self):
+        api = MaterialRegisterAPI
+        self.assertEqual(match_operation(api, 'GET', self.path), ('get_material', {'material_id': self.material.id}))
+        self.assertEqual(match_operation(api, 'GET', '/api/v1/materials?limit=5'), ('get_materials', {'limit': '5'}))
+        with self.assertRaises(MaterialValidationError) as error:
+            match_operation(api, 'PATCH', self.path)
+        self.assertEqual(error.exception.code, 'METHOD_NOT_ALLOWED')
+        for path in ('/api/v1/metrics', '/api/v1/batch'):
+            with self.assertRaises(MaterialValidationError) as error:
+                parse_envelope(api, {'operations': [{'method': 'GET', 'path': path}]})
+            self.assertEqual(error.exception.details[0]['error']['code'], 'ROUTE_NOT_FOUND')
+
+    def test_envelope_routes(self):
+        # every JSON route of the API is reachable, except the envelope itself
+        endpoints = {rule.endpoint for rule in envelope_routes(MaterialRegisterAPI).iter_rules()}
+        json_routes = {
+            name for name, method in vars(MaterialRegisterAPI).items()
+            if getattr(method, 'routing', {}).get('type') == 'json'
+        }
+        self.assertEqual(endpoints, json_routes - {'run_batch'})
+        self.assertIn('get_material_search', endpoints)
+
+    def test_get_update_get(self):
+        result = self.api_call('POST', '/api/v1/batch', {'operations': [
+            {'method': 'GET', 'path': self.path, 'params': {'fields': 'name'}},
+            {'method': 'PUT', 'path': self.path, 'params': {'name': 'Renamed'}},
+            {'method': 'GET', 'path': self.path, 'params': {'fields': 'name'}},
+        ]})
+        self.assertTrue(result['success'], result)
+        self.assertEqual([op['result']['data']['name'] for op in result['data']], ['Enveloped', 'Renamed', 'Renamed'])
+        self.assertIn('ETag', result['data'][0]['headers'])
+        self.assertEqual(self.material.name, 'Renamed')
+
+    def test_atomic_rollback(self):
+        operations = [
+            {'method': 'PUT', 'path': self.path, 'params': {'name': 'Lost'}},
+            {'method': 'GET', 'path': '/api/v1/materials/0'},
+            {'method': 'DELETE', 'path': self.path},
+        ]
+        result = self.api_call('POST', '/api/v1/batch', {'operations': operations})
+        self.assertEqual(result['error']['code'], 'BATCH_ROLLED_BACK')
+        details = result['error']['details']
+        self.assertEqual(details[1]['result']['error']['code'], 'MATERIAL_NOT_FOUND')
+        self.assertEqual(details[2]['result']['error']['code'], 'BATCH_ABORTED')
+        self.material.invalidate_cache()
+        self.assertEqual(self.material.name, 'Enveloped')
+
+        result = self.api_call('POST', '/api/v1/batch', {'operations': operations, 'mode': 'best_effort'})
+        self.assertEqual([op['success'] for op in result['data']], [True, False, True])
+        self.assertFalse(self.material.exists())
+
+    def test_quota_per_operation(self):
+        with patch.object(rate_limiter, 'policy', QuotaPolicy(rate=0.01, burst=3, max_concurrent=0)), \
+                patch.object(rate_limiter, 'store', MemoryQuotaStore()):
+            response = self.api_request('POST', '/api/v1/batch', {'operations': [
+                {'method': 'PUT', 'path': self.path, 'params': {'name': 'Throttled %s' % index}}
+                for index in range(4)
+            ]})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['result']['error']['code'], 'RATE_LIMITED')
+        self.material.invalidate_cache()
+        self.assertEqual(self.material.name, 'Enveloped')
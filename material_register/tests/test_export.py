@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import json
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.controllers import export
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialExport(TestMaterialApiCommon):
+
+    def setUp(self):
+        super(TestMaterialExport, self).setUp()
+        self.materials = self.env['material.register'].with_context(tracking_disable=True).create([{
+            'name': 'Export %s' % index,
+            'material_code': 'EXP%03d' % index,
+            'material_type': 'jeans' if index % 2 else 'cotton',
+            'material_buy_price': 250,
+            'partner_id': self.partner_1.id,
+        } for index in range(7)])
+        self.patch(export, 'EXPORT_CHUNK_SIZE', 3)
+
+    def _export(self, **params):
+        response = self.opener.get(
+            self.api_url('/api/v1/materials/export'),
+            params=params, headers={'Authorization': 'Bearer %s' % self.api_key}, stream=True)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_export_ndjson(self):
+        response = self._export(material_code='EXP', material_type='jeans')
+        self.assertEqual(response.headers['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.iter_lines() if line]
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(self.materials.filtered(lambda m: m.material_type == 'jeans').ids))
+        self.assertEqual(rows[0]['partner']['name'], 'Julia Agrolait')
+
+    def test_export_csv(self):
+        response = self._export(material_code='EXP', format='csv', fields='material_code,partner', expand='')
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(set(rows[0]), {'id', 'material_code', 'partner'})
+
+    def test_export_requires_authentication(self):
+        response = self.opener.get(self.api_url('/api/v1/materials/export'))
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import base64
+import io
+
+from PIL import Image
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialImages(TestMaterialApiCommon):
+
+    def setUp(self):
+        super(TestMaterialImages, self).setUp()
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 600), 'red').save(buffer, format='PNG')
+        self.material = self.env['material.register'].create({
+            'name': 'Pictured',
+            'material_code': 'PIC',
+            'material_type': 'fabric',
+            'material_buy_price': 300,
+            'partner_id': self.partner_1.id,
+            'image_1920': base64.b64encode(buffer.getvalue()),
+        })
+        self.bare = self.material.copy({'material_code': 'NOPIC', 'image_1920': False})
+
+    def test_prefetch_and_immutable_variant(self):
+        result = self.api_call('GET', '/api/v1/materials/images', {'ids': [self.material.id, self.bare.id], 'inline': True})
+        image = result['data'][0]['image']
+        self.assertIsNone(result['data'][1]['image'])
+        self.assertTrue(image['data'])
+        self.assertIn('unique=%s' % image['checksum'], image['url'])
+
+        response = self.opener.get(self.api_url(image['url']), headers={'Authorization': 'Bearer %s' % self.api_key})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(base64.b64encode(response.content).decode('ascii'), image['data'])
+        with Image.open(io.BytesIO(response.content)) as thumbnail:
+            self.assertLessEqual(max(thumbnail.size), 128)
+
+        response = self.opener.get(
+            self.api_url('/api/v1/materials/%s/image/512' % self.material.id),
+            headers={'Authorization': 'Bearer %s' % self.api_key, 'If-None-Match': '"%s"' % image['checksum']})
+        self.assertEqual(response.status_code, 200, "another variant has another checksum")
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        response = self.opener.get(
+            self.api_url('/api/v1/materials/%s/image/512' % self.material.id),
+            headers={'Authorization': 'Bearer %s' % self.api_key, 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        result = self.api_call('GET', '/api/v1/materials/images', {'ids': [self.material.id], 'size': 1920, 'inline': True})
+        self.assertEqual(result['error']['code'], 'INLINE_TOO_LARGE')
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from odoo.addons.material_register.controllers.imports import read_csv_header, read_import_chunk
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestMaterialImport(TestMaterialCommon):
+
+    def _csv(self, rows):
+        lines = ['material_code,name,material_type,material_buy_price,partner_id']
+        lines += ['%s,%s,%s,%s,%s' % row for row in rows]
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def test_read_chunks_resume_on_row_boundaries(self):
+        data = self._csv([
+            ('IM1', '"Two\nlines"', 'cotton', 150, self.partner_1.id),
+            ('IM2', 'Plain', 'jeans', 150, self.partner_1.id),
+            ('IM3', 'Last', 'fabric', 150, self.partner_1.id),
+        ])
+        stream = io.BytesIO(data)
+        header, offset = read_csv_header(stream)
+        self.assertEqual(header[-1], 'partner_id')
+
+        rows, offset, eof = read_import_chunk(stream, 'csv', header, offset, 2)
+        self.assertFalse(eof)
+        self.assertEqual([row[0]['name'] for row in rows], ['Two\nlines', 'Plain'])
+        self.assertEqual(rows[0][0]['partner_id'], self.partner_1.id)
+        self.assertEqual(rows[0][0]['material_buy_price'], 150.0)
+
+        # a new stream, as when a job resumes in another worker
+        rows, offset, eof = read_import_chunk(io.BytesIO(data), 'csv', header, offset, 2)
+        self.assertTrue(eof)
+        self.assertEqual(offset, len(data))
+        self.assertEqual([row[0]['material_code'] for row in rows], ['IM3'])
+
+        rows, _offset, eof = read_import_chunk(io.BytesIO(b'{"name": "ok"}\n\n{broken\n'), 'ndjson', None, 0)
+        self.assertTrue(eof)
+        self.assertEqual(rows[0], ({'name': 'ok'}, None))
+        self.assertIsNone(rows[1][0])
+
+    def test_import_job_chunks_and_errors(self):
+        data = self._csv([
+            ('IJ1', 'First', 'cotton', 150, self.partner_1.id),
+            ('IJ2', 'Bad type', 'silk', 150, self.partner_1.id),
+            ('IJ3', 'Third', 'jeans', 150, self.partner_1.id),
+            ('IJ4', 'Bad partner', 'jeans', 150, 0),
+            ('IJ5', 'Fifth', 'fabric', 150, self.partner_1.id),
+        ])
+        job = self.env['material.register.import']._create_job(data, 'materials.csv', 'csv')
+        self.assertEqual(job.state, 'pending')
+
+        chunks = 1
+        while not job._process_chunk(chunk_size=2):
+            chunks += 1
+            self.assertEqual(job.state, 'running')
+        self.assertEqual(chunks, 3)
+
+        status = job._status_data()
+        self.assertEqual(status['state'], 'done')
+        self.assertEqual(status['progress'], 100.0)
+        self.assertEqual((status['rows_processed'], status['rows_created'], status['rows_failed']), (5, 3, 2))
+        self.assertEqual([(error['row'], error['code']) for error in status['errors']],
+                         [(2, 'INVALID_MATERIAL_TYPE'), (4, 'PARTNER_NOT_FOUND')])
+        self.assertEqual(json.loads(job.csv_header)[0], 'material_code')
+        self.assertEqual(self.env['material.register'].search_count([('material_code', 'in', ['IJ1', 'IJ3', 'IJ5'])]), 3)
+
+    def test_resume_failed_job(self):
+        job = self.env['material.register.import']._create_job(
+            b'{"material_code": "IR1", "name": "Resumed", "material_type": "cotton",'
+            b' "material_buy_price": 150, "partner_id": %d}\n' % self.partner_1.id,
+            'materials.ndjson', 'ndjson')
+        job.sudo().write({'state': 'failed', 'last_error': 'Worker lost'})
+        job.action_resume()
+        self.assertEqual(job.state, 'pending')
+        self.assertFalse(job.last_error)
+        self.assertTrue(job._process_chunk())
+        self.assertEqual(job.rows_created, 1)
+
+    def test_non_finite_prices_rejected(self):
+        data = self._csv([
+            ('NF1', 'Finite', 'cotton', 150, self.partner_1.id),
+            ('NF2', 'Infinite', 'cotton', 'inf', self.partner_1.id),
+            ('NF3', 'Not a number', 'cotton', 'nan', self.partner_1.id),
+            ('NF4', 'Overflow', 'cotton', '1e999', self.partner_1.id),
+        ])
+        job = self.env['material.register.import']._create_job(data, 'materials.csv', 'csv')
+        self.assertTrue(job._process_chunk())
+        self.assertEqual([(error['row'], error['code']) for error in job._status_data()['errors']],
+                         [(2, 'INVALID_PRICE'), (3, 'INVALID_PRICE'), (4, 'INVALID_PRICE')])
+
+        job = self.env['material.register.import']._create_job(
+            b'{"material_code": "NF5", "name": "Infinite", "material_type": "cotton",'
+            b' "material_buy_price": Infinity, "partner_id": %d}\n' % self.partner_1.id,
+            'materials.ndjson', 'ndjson')
+        self.assertTrue(job._process_chunk())
+        self.assertEqual([error['code'] for error in job._status_data()['errors']], ['INVALID_PRICE'])
+        self.assertFalse(self.env['material.register'].search([('material_code', 'in', ['NF2', 'NF3', 'NF4', 'NF5'])]))
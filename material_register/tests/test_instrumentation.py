@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from odoo.addons.material_register.controllers import auth
+from odoo.addons.material_register.controllers.instrumentation import api_metrics
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialInstrumentation(TestMaterialApiCommon):
+
+    def test_timing_headers_and_meta(self):
+        response = self.api_request('GET', '/api/v1/materials', {'limit': 5, 'timing': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('auth;dur=', response.headers['Server-Timing'])
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+        timing = response.json()['result']['meta']['timing']
+        self.assertEqual(set(timing['phases']), {'auth', 'count', 'search', 'freshness', 'serialize'})
+        self.assertGreater(timing['queries'], 0)
+
+        # without the flag only the header is sent
+        result = self.api_call('GET', '/api/v1/materials', {'limit': 5})
+        self.assertNotIn('timing', result['meta'])
+
+    def test_metrics_endpoint(self):
+        self.api_call('GET', '/api/v1/materials', {'limit': 1})
+        response = self.opener.get(self.api_url('/api/v1/metrics'), headers={'Authorization': 'Bearer %s' % self.api_key})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('material_api_request_duration_seconds_bucket{route="get_materials"', response.text)
+        self.assertIn('material_api_auth_cache_hits_total', response.text)
+
+    def test_raising_request_observed(self):
+        errors = api_metrics._requests[('get_materials', 'error')]
+        with patch.object(auth, '_authenticate_request', side_effect=RuntimeError('boom')), mute_logger('odoo.http'):
+            response = self.api_request('GET', '/api/v1/materials', {'limit': 1})
+        self.assertIn('error', response.json())
+        self.assertEqual(api_metrics._requests[('get_materials', 'error')], errors + 1)
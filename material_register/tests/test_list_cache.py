@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.controllers.list_cache import ListCache, current_generation, list_cache
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon, TestMaterialCommon
+
+
+class TestListCache(TestMaterialCommon):
+
+    def test_lru_ttl_and_generation(self):
+        cache = ListCache(max_size=2, ttl=30)
+        key_a = cache.key('db', 2, [('name', 'ilike', 'a')], 'id desc', 80, 0)
+        self.assertEqual(key_a, cache.key('db', 2, [('name', 'ilike', 'a')], 'id desc', 80, 0))
+        cache.set(key_a, 'page a', (1, 0))
+        cache.set('b', 'page b', (1, 0))
+        self.assertEqual(cache.get(key_a, (1, 0)), 'page a')
+        cache.set('c', 'page c', (1, 0))
+        self.assertIsNone(cache.get('b', (1, 0)), "least recently used page is evicted")
+        self.assertIsNone(cache.get(key_a, (2, 0)), "pages of an older generation are stale")
+        with patch.object(time, 'monotonic', return_value=time.monotonic() + 31):
+            self.assertIsNone(cache.get('c', (1, 0)))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 3, 1))
+        self.assertEqual(stats['hit_rate'], 0.25)
+
+    def test_writes_invalidate_after_commit(self):
+        postcommit = self.env.cr.postcommit
+        postcommit.clear()
+        self.partner_1.write({'email': 'other@agrolait.example.com'})
+        self.assertFalse(postcommit.data.get('material_list_cache_bump'), "unlisted partner fields keep the pages")
+
+        self.partner_1.write({'name': 'Renamed supplier'})
+        self.material1.write({'name': 'Kaos polos'})
+        self.assertTrue(postcommit.data.get('material_list_cache_bump'))
+
+        generation = current_generation(self.env)
+        postcommit.run()
+        self.assertNotEqual(current_generation(self.env), generation)
+
+
+@tagged('post_install', '-at_install')
+class TestListCacheApi(TestMaterialApiCommon):
+
+    def test_default_list_served_from_cache(self):
+        self.env['material.register'].create({
+            'name': 'Cached',
+            'material_code': 'CACHED',
+            'material_type': 'fabric',
+            'material_buy_price': 500,
+            'partner_id': self.partner_1.id,
+        })
+        # no limit, served as one page of the maximum size
+        first = self.api_call('GET', '/api/v1/materials')
+        hits = list_cache.hits
+        second = self.api_call('GET', '/api/v1/materials')
+        self.assertEqual(list_cache.hits, hits + 1)
+        self.assertEqual(second['data'], first['data'])
+        self.assertEqual(second['meta'], first['meta'])
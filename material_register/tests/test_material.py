@@ -1,5 +1,8 @@
+from psycopg2 import IntegrityError
+
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import ValidationError
+from odoo.tools import mute_logger
 from odoo.addons.material_register.tests.common import TestMaterialCommon
 
 
@@ -39,3 +42,44 @@ class TestMaterial(TestMaterialCommon):
         self.assertTrue(material_unlink)
     
 
+
+    def test_set_material_code_unique(self):
+        copy = self.material1.copy()
+        self.assertEqual(copy.material_code, 'KS (copy)')
+        # copying the same record again must not collide with the first copy
+        self.assertEqual(self.material1.copy().material_code, 'KS (copy 2)')
+        self.assertEqual(self.material1.copy().material_code, 'KS (copy 3)')
+        with mute_logger('odoo.sql_db'), self.assertRaises(IntegrityError), self.cr.savepoint():
+            self.create_material(name="Kaos Lagi",code='KS',material_buy_price=1000,material_type='fabric')
+
+    def test_set_material_company_price(self):
+        company = self.env['material.register']._price_company()
+        currency = self.env['res.currency'].with_context(active_test=False).search(
+            [('name', 'in', ['EUR', 'USD']), ('id', '!=', company.currency_id.id)], limit=1)
+        currency.active = True
+        currency.rate_ids.unlink()
+        self.env['res.currency.rate'].create({'currency_id': currency.id, 'rate': 0.5, 'company_id': company.id})
+        material = self.create_material(name="Jeans Import",code='JNI',material_buy_price=200,material_type='jeans')
+        material.currency_id = currency
+        self.assertAlmostEqual(material.material_buy_price_company, 400)
+
+        # a new rate converts the stored prices again
+        currency.rate_ids.write({'rate': 0.25})
+        self.assertAlmostEqual(material.material_buy_price_company, 800)
+        self.assertEqual(
+            self.env['material.register'].search([('material_buy_price_company', '>=', 700), ('id', '=', material.id)]),
+            material)
+
+    def test_company_price_ignores_user_company(self):
+        company = self.env['material.register']._price_company()
+        currency = self.env['res.currency'].with_context(active_test=False).search(
+            [('name', 'in', ['EUR', 'USD']), ('id', '!=', company.currency_id.id)], limit=1)
+        currency.active = True
+        currency.rate_ids.unlink()
+        self.env['res.currency.rate'].create({'currency_id': currency.id, 'rate': 0.5, 'company_id': company.id})
+        other_company = self.env['res.company'].create({'name': 'Other Materials Co', 'currency_id': currency.id})
+        material = self.create_material(name="Jeans Other",code='JNO',material_buy_price=200,material_type='jeans')
+        # written from a company whose currency is the material currency, still stored in the price company currency
+        material.with_company(other_company).currency_id = currency
+        self.assertAlmostEqual(material.material_buy_price_company, 400)
+        self.assertEqual(material.with_company(other_company).company_currency_id, company.currency_id)
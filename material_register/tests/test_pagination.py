@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+
+from odoo.addons.material_register.controllers.pagination import (
+    InvalidCursor, decode_cursor, encode_cursor, order_string, parse_order, search_page,
+)
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestMaterialPagination(TestMaterialCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialPagination, cls).setUpClass()
+        cls.Material = cls.env['material.register'].with_context(tracking_disable=True)
+        cls.materials = cls.material1 | cls.Material.create([{
+            'name': 'Material %s' % index,
+            'material_code': 'PG%03d' % index,
+            'material_type': 'cotton',
+            'material_buy_price': 1000 + (index % 3) * 100,
+            'partner_id': cls.partner_1.id,
+            'currency_id': cls.currency_id.id,
+        } for index in range(25)])
+        cls.domain = [('id', 'in', cls.materials.ids)]
+
+    def _walk(self, order, limit):
+        seen, cursor = [], None
+        while True:
+            records, cursor = search_page(self.Material, self.domain, order=order, limit=limit, cursor=cursor)
+            seen.extend(records.ids)
+            if not cursor:
+                return seen
+
+    def test_cursor_walk_matches_offset_order(self):
+        for order in ('id desc', 'material_buy_price desc', 'material_buy_price asc, name desc',
+                      'material_buy_price_company desc'):
+            expected = self.Material.search(self.domain, order=order_string(parse_order(order))).ids
+            self.assertEqual(self._walk(order, limit=7), expected)
+
+    def test_parse_order_appends_id(self):
+        self.assertEqual(parse_order('name'), [('name', 'asc'), ('id', 'asc')])
+        self.assertEqual(parse_order(None), [('id', 'desc')])
+        with self.assertRaises(InvalidCursor):
+            parse_order('partner_id desc')
+
+    def test_cursor_bound_to_order(self):
+        terms = parse_order('material_buy_price desc')
+        cursor = encode_cursor(self.material1, terms)
+        self.assertEqual(len(decode_cursor(cursor, terms)), 2)
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(cursor, parse_order('name asc'))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor', terms)
+
+    def test_cursor_key_types_checked(self):
+        def craft(order, key):
+            raw = json.dumps({'o': order, 'k': key}).encode('utf-8')
+            return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+        for order, key in (
+            ('id desc', ['x']),
+            ('id desc', [[1]]),
+            ('id desc', [True]),
+            ('name asc, id asc', [['Kaos'], 1]),
+            ('material_buy_price desc, id desc', ['cheap', 1]),
+            ('write_date desc, id desc', ['yesterday', 1]),
+        ):
+            with self.assertRaises(InvalidCursor, msg=key):
+                search_page(self.Material, self.domain, order=order, cursor=craft(order, key))
+        records, _cursor = search_page(
+            self.Material, self.domain, order='write_date desc', cursor=craft('write_date desc, id desc', [
+                self.material1.write_date.isoformat(sep=' '), self.material1.id]))
+        self.assertNotIn(self.material1, records)
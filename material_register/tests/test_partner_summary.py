@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from odoo import SUPERUSER_ID, api
+
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestPartnerSummary(TestMaterialCommon):
+
+    def _summary(self, partner):
+        # the material writes are logged, the cron folds them into the summaries
+        self.env['material.register.partner.summary']._fold_deltas()
+        return self.env['material.register.partner.summary'].search([('partner_id', '=', partner.id)])
+
+    def test_summary_follows_material_changes(self):
+        summary = self._summary(self.partner_1)
+        self.assertEqual((summary.material_count, summary.price_total), (1, 100000))
+
+        materials = self.env['material.register'].create([{
+            'name': 'Summary %s' % index,
+            'material_code': 'SUM%s' % index,
+            'material_type': 'cotton',
+            'material_buy_price': 200 * (index + 1),
+            'partner_id': self.partner_1.id,
+            'currency_id': self.currency_id.id,
+        } for index in range(3)])
+        summary = self._summary(self.partner_1)
+        self.assertEqual(summary.material_count, 4)
+        self.assertEqual(summary.price_total, 100000 + 200 + 400 + 600)
+        self.assertEqual(summary.latest_material_id, materials[-1])
+        self.assertEqual(summary.latest_buy_price, 600)
+
+        materials[-1].material_buy_price = 900
+        self.assertEqual(self._summary(self.partner_1).latest_buy_price, 900)
+        # an older material leaves the latest one alone
+        materials[0].material_buy_price = 300
+        summary = self._summary(self.partner_1)
+        self.assertEqual((summary.latest_material_id, summary.latest_buy_price), (materials[-1], 900))
+        self.assertEqual(summary.price_total, 100000 + 300 + 400 + 900)
+
+        # moving a material updates both partners
+        partner_2 = self.env['res.partner'].create({'name': 'Second supplier'})
+        materials[0].partner_id = partner_2
+        self.assertEqual(self._summary(self.partner_1).material_count, 3)
+        self.assertEqual(self._summary(partner_2).price_total, 300)
+
+        materials[0].unlink()
+        self.assertFalse(self._summary(partner_2))
+        # removing the latest material looks the previous one up
+        materials[-1].unlink()
+        summary = self._summary(self.partner_1)
+        self.assertEqual((summary.material_count, summary.latest_material_id), (2, materials[1]))
+        # a renamed material keeps its summary untouched
+        materials[1].name = 'Renamed'
+        self.assertEqual(self._summary(self.partner_1).material_count, 2)
+
+    def test_concurrent_writes_on_one_partner(self):
+        """Two transactions registering materials of the same partner both commit"""
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {'tracking_disable': True})
+            partner_id = env['res.partner'].create({'name': 'Concurrent supplier'}).id
+            env['material.register.partner.summary']._refresh((partner_id,))
+        try:
+            with self.registry.cursor() as cr_1, self.registry.cursor() as cr_2:
+                for index, cr in enumerate((cr_1, cr_2)):
+                    api.Environment(cr, SUPERUSER_ID, {'tracking_disable': True})['material.register'].create({
+                        'name': 'Concurrent %s' % index,
+                        'material_code': 'CONC%s' % index,
+                        'material_type': 'cotton',
+                        'material_buy_price': 200,
+                        'partner_id': partner_id,
+                        'currency_id': self.currency_id.id,
+                    })
+                # both transactions are open and wrote for the same partner
+                cr_1.commit()
+                cr_2.commit()
+            with self.registry.cursor() as cr:
+                Summary = api.Environment(cr, SUPERUSER_ID, {})['material.register.partner.summary']
+                Summary._fold_deltas()
+                summary = Summary.search([('partner_id', '=', partner_id)])
+                self.assertEqual((summary.material_count, summary.price_total), (2, 400))
+        finally:
+            with self.registry.cursor() as cr:
+                cr.execute("DELETE FROM material_register WHERE partner_id = %s", [partner_id])
+                cr.execute("DELETE FROM res_partner WHERE id = %s", [partner_id])
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the material register API helpers
+
+They are excluded from the standard test run, launch them explicitly with
+    odoo-bin -d <db> -i material_register --test-enable --test-tags material_perf
+"""
+import logging
+import time
+from unittest.mock import patch
+
+from odoo.tests import common, tagged
+
+from odoo.addons.material_register.controllers.batch import batch_create, batch_update, untracked_env
+from odoo.addons.material_register.controllers.pagination import (
+    encode_cursor, parse_order, search_page,
+)
+from odoo.addons.material_register.controllers.rate_limit import QuotaPolicy, rate_limiter
+from odoo.addons.material_register.controllers.search import search_materials
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+_logger = logging.getLogger(__name__)
+
+
+def seed_materials(env, count, partner_ids, currency_id):
+    """
+    Insert `count` materials with plain SQL, the ORM is far too slow for this
+    `currency_id` must be the currency of the price company, the prices are not converted
+    """
+    env.cr.execute("""
+        INSERT INTO material_register
+            (material_code, name, material_type, material_buy_price, material_buy_price_company, currency_id,
+             partner_id, create_uid, create_date, write_uid, write_date)
+        SELECT 'BM' || lpad(s::text, 8, '0'), 'Bench material ' || s,
+               (ARRAY['fabric', 'jeans', 'cotton'])[1 + s %% 3], 100 + s %% 5000, 100 + s %% 5000, %s,
+               (%s::int[])[1 + s %% %s],
+               %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+          FROM generate_series(1, %s) s
+    """, (currency_id, list(partner_ids), len(partner_ids), env.uid, env.uid, count))
+    env.cr.execute("ANALYZE material_register")
+    env['material.register'].invalidate_cache()
+
+
+def timed(func, repeat=5):
+    """Return the best wall time of `repeat` runs of `func`, in milliseconds"""
+    best = None
+    for _i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@tagged('post_install', '-at_install', '-standard', 'material_perf')
+class TestMaterialPerformance(common.SavepointCase):
+
+    SEED_COUNT = 200000
+    PAGE_SIZE = 80
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialPerformance, cls).setUpClass()
+        cls.partners = cls.env['res.partner'].create([{'name': 'Bench partner %s' % i} for i in range(50)])
+        seed_materials(
+            cls.env, cls.SEED_COUNT, cls.partners.ids, cls.env['material.register']._price_company().currency_id.id)
+        cls.Material = cls.env['material.register']
+
+    def test_keyset_pagination_depth(self):
+        """Keyset page latency stays flat with depth while offset pages grow linearly"""
+        terms = parse_order('id desc')
+        results = []
+        for depth in (0, self.SEED_COUNT // 10, self.SEED_COUNT // 2, self.SEED_COUNT - self.PAGE_SIZE - 1):
+            anchor = self.Material.search([], order='id desc', offset=depth, limit=1)
+            cursor = encode_cursor(anchor, terms) if depth else None
+
+            def offset_page():
+                self.Material.search([], order='id desc', offset=depth, limit=self.PAGE_SIZE).ids
+                self.Material.invalidate_cache()
+
+            def keyset_page():
+                search_page(self.Material, [], order='id desc', limit=self.PAGE_SIZE, cursor=cursor)[0].ids
+                self.Material.invalidate_cache()
+
+            results.append((depth, timed(offset_page), timed(keyset_page)))
+
+        for depth, offset_ms, keyset_ms in results:
+            _logger.info("pagination depth=%-8s offset=%8.2fms keyset=%8.2fms", depth, offset_ms, keyset_ms)
+        shallow, deep = results[0][2], results[-1][2]
+        self.assertLess(deep, max(shallow * 3, shallow + 5),
+                        "keyset pagination latency should not grow with depth")
+
+
+@tagged('post_install', '-at_install', '-standard', 'material_perf')
+class TestMaterialBatchThroughput(TestMaterialApiCommon):
+
+    ITEM_COUNT = 500
+
+    def setUp(self):
+        super(TestMaterialBatchThroughput, self).setUp()
+        # one request per record is the point of the comparison, it must not be throttled
+        patcher = patch.object(rate_limiter, 'policy', QuotaPolicy(rate=0, burst=0, max_concurrent=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _payloads(self, prefix):
+        return [{
+            'material_code': '%s%05d' % (prefix, index),
+            'name': 'Throughput %s' % index,
+            'material_type': 'fabric',
+            'material_buy_price': 1000,
+            'partner_id': self.partner_1.id,
+        } for index in range(self.ITEM_COUNT)]
+
+    def test_batch_vs_single_throughput(self):
+        """Items per second of the batch endpoints compared with one request per record"""
+        start = time.perf_counter()
+        single_ids = []
+        for payload in self._payloads('SG'):
+            single_ids.append(self.api_call('POST', '/api/v1/materials', payload)['data']['id'])
+        single_create = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = self.api_call('POST', '/api/v1/materials/batch', {'items': self._payloads('BT')})
+        batch_create = time.perf_counter() - start
+        self.assertTrue(result['success'])
+        batch_ids = [item['id'] for item in result['data']]
+
+        start = time.perf_counter()
+        for material_id in single_ids:
+            self.api_call('DELETE', '/api/v1/materials/%s' % material_id)
+        single_delete = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.api_call('DELETE', '/api/v1/materials/batch', {'ids': batch_ids})
+        batch_delete = time.perf_counter() - start
+
+        for label, single, batch in (('create', single_create, batch_create), ('delete', single_delete, batch_delete)):
+            _logger.info("%s throughput: single=%8.1f items/s batch=%8.1f items/s",
+                         label, self.ITEM_COUNT / single, self.ITEM_COUNT / batch)
+        self.assertLess(batch_create, single_create)
+
+
+@tagged('post_install', '-at_install', '-standard', 'material_perf')
+class TestMaterialWriteAmplification(common.SavepointCase):
+    """Rows written besides the materials themselves, with full and summary tracking"""
+
+    ITEM_COUNT = 1000
+    MAIL_TABLES = ['mail_message', 'mail_tracking_value', 'mail_followers']
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialWriteAmplification, cls).setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Bench partner'})
+        cls.env.user.groups_id = [(4, cls.env.ref('material_register.group_material_untracked_write').id)]
+
+    def _row_counts(self):
+        self.env['base'].flush()
+        counts = {}
+        for table in self.MAIL_TABLES:
+            self.env.cr.execute('SELECT count(*) FROM "%s"' % table)
+            counts[table] = self.env.cr.fetchone()[0]
+        return counts
+
+    def _ingest(self, env, prefix):
+        """Create then update ITEM_COUNT materials, return (milliseconds, rows written per table)"""
+        before = self._row_counts()
+        start = time.perf_counter()
+        results = batch_create(env, [{
+            'material_code': '%s%05d' % (prefix, index),
+            'name': 'Amplification %s' % index,
+            'material_type': 'fabric',
+            'material_buy_price': 1000,
+            'partner_id': self.partner.id,
+        } for index in range(self.ITEM_COUNT)])
+        batch_update(env, [{'id': result['id'], 'material_buy_price': 2000 + result['index']} for result in results])
+        env['base'].flush()
+        elapsed = (time.perf_counter() - start) * 1000
+        after = self._row_counts()
+        return elapsed, {table: after[table] - before[table] for table in self.MAIL_TABLES}
+
+    def test_summary_tracking_write_amplification(self):
+        full_ms, full_rows = self._ingest(self.env, 'WF')
+        summary_env = untracked_env(self.env)
+        summary_ms, summary_rows = self._ingest(summary_env, 'WS')
+        _logger.info("write amplification for %s materials: full=%s in %.0fms summary=%s in %.0fms",
+                     self.ITEM_COUNT, full_rows, full_ms, summary_rows, summary_ms)
+        self.assertFalse(any(summary_rows.values()))
+        self.assertGreaterEqual(full_rows['mail_tracking_value'], self.ITEM_COUNT)
+        self.assertLess(summary_ms, full_ms)
+
+
+@tagged('post_install', '-at_install', '-standard', 'material_perf')
+class TestMaterialSearchIndexes(common.SavepointCase):
+
+    SEED_COUNT = 1000000
+    INDEXES = [
+        'material_register_material_code_trgm_index',
+        'material_register_name_trgm_index',
+        'material_register_name_index',
+        'material_register_material_type_index',
+        'material_register_partner_id_index',
+        'material_register_write_date_index',
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialSearchIndexes, cls).setUpClass()
+        cls.partners = cls.env['res.partner'].create([{'name': 'Index partner %s' % i} for i in range(200)])
+        seed_materials(
+            cls.env, cls.SEED_COUNT, cls.partners.ids, cls.env['material.register']._price_company().currency_id.id)
+        cls.Material = cls.env['material.register']
+
+    def _measure(self):
+        searches = {
+            'material_code ilike': [('material_code', 'ilike', '00424')],
+            'name ilike': [('name', 'ilike', 'material 98765')],
+            'material_type =': [('material_type', '=', 'jeans'), ('partner_id', '=', self.partners[7].id)],
+            'partner_id =': [('partner_id', '=', self.partners[3].id)],
+        }
+        return {
+            label: timed(lambda domain=domain: self.Material.search(domain, limit=80, order='id desc').ids, repeat=3)
+            for label, domain in searches.items()
+        }
+
+    def test_search_latency_with_indexes(self):
+        """Search latency of the API filters without, then with the module indexes"""
+        for index in self.INDEXES:
+            self.env.cr.execute('DROP INDEX IF EXISTS "%s"' % index)
+        self.env.cr.execute("ANALYZE material_register")
+        before = self._measure()
+
+        self.Material._auto_init()
+        self.Material.init()
+        self.env.cr.execute("ANALYZE material_register")
+        after = self._measure()
+
+        for label in before:
+            _logger.info("search %-20s without indexes=%9.2fms with indexes=%9.2fms", label, before[label], after[label])
+        self.assertLess(after['material_code ilike'], before['material_code ilike'])
+
+
+@tagged('post_install', '-at_install', '-standard', 'material_perf')
+class TestMaterialFullTextSearch(common.SavepointCase):
+
+    SEED_COUNT = 1000000
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialFullTextSearch, cls).setUpClass()
+        cls.partners = cls.env['res.partner'].create([{'name': 'Supplier %s Jakarta' % i} for i in range(200)])
+        seed_materials(
+            cls.env, cls.SEED_COUNT, cls.partners.ids, cls.env['material.register']._price_company().currency_id.id)
+        # plain SQL inserts bypass the write hooks
+        cls.env['material.register']._update_search_vector('TRUE', [])
+        cls.env.cr.execute("ANALYZE material_register")
+
+    def _measure(self):
+        queries = {
+            'code prefix': 'bm0042',
+            'name and partner': 'material 98765 supplier',
+            'partner and type': 'supplier 17 jakarta jeans',
+        }
+        return {
+            label: timed(lambda text=text: search_materials(self.env, text, limit=20), repeat=3)
+            for label, text in queries.items()
+        }
+
+    def test_search_latency_with_gin_index(self):
+        """Ranked full-text search latency without, then with the GIN index of the search vector"""
+        self.env.cr.execute('DROP INDEX IF EXISTS "material_register_search_vector_index"')
+        before = self._measure()
+
+        self.env['material.register'].init()
+        self.env.cr.execute("ANALYZE material_register")
+        after = self._measure()
+
+        for label in before:
+            _logger.info("full-text %-18s without index=%9.2fms with index=%9.2fms", label, before[label], after[label])
+        self.assertLess(after['code prefix'], before['code prefix'])
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from odoo.addons.material_register.controllers import pagination
+from odoo.addons.material_register.controllers.rate_limit import (
+    MemoryQuotaStore, PostgresQuotaStore, QuotaPolicy, RateLimiter, rate_limiter,
+)
+from odoo.addons.material_register.tests.common import TestMaterialApiCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMaterialRateLimit(TestMaterialApiCommon):
+
+    def _limit(self, policy):
+        for attribute, value in (('policy', policy), ('store', MemoryQuotaStore())):
+            patcher = patch.object(rate_limiter, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_quota_stores(self):
+        policy = QuotaPolicy(rate=0.5, burst=2, max_concurrent=1)
+        for limiter in (RateLimiter(policy), RateLimiter(policy, store='postgres')):
+            dbname = self.env.cr.dbname
+            self.assertEqual(limiter.acquire('key:test', dbname), (True, 0, None))
+            self.assertEqual(limiter.acquire('key:test', dbname), (False, 1, 'concurrency'))
+            limiter.release('key:test', dbname)
+            self.assertTrue(limiter.acquire('key:test', dbname)[0])
+            limiter.release('key:test', dbname)
+            # the bucket is empty, one token comes back every two seconds
+            allowed, retry_after, reason = limiter.acquire('key:test', dbname)
+            self.assertEqual((allowed, reason), (False, 'rate'))
+            self.assertIn(retry_after, (1, 2))
+            stats = limiter.stats()
+            self.assertEqual((stats['allowed'], stats['rejected_rate'], stats['rejected_concurrency']), (2, 1, 1))
+            self.assertEqual(stats['in_flight'], 0)
+        self.assertIsInstance(limiter.store, PostgresQuotaStore)
+        self.assertTrue(self.env['material.register.api.quota'].search([('key', '=', 'key:test')]))
+
+    def test_store_failure(self):
+        dbname = self.env.cr.dbname
+        limiter = RateLimiter(QuotaPolicy(rate=1, burst=1, max_concurrent=1), store='postgres')
+        with patch.object(limiter.store, '_transaction', side_effect=RuntimeError('store down')):
+            self.assertEqual(limiter.acquire('key:down', dbname), (False, 1, 'unavailable'))
+            limiter.fail_open = True
+            self.assertEqual(limiter.acquire('key:down', dbname), (True, 0, None))
+        self.assertEqual(limiter.stats()['errors'], 2)
+
+    def test_unreleased_slot(self):
+        dbname = self.env.cr.dbname
+        limiter = RateLimiter(QuotaPolicy(rate=0, burst=0, max_concurrent=1), store='postgres')
+        self.assertTrue(limiter.acquire('key:slot', dbname)[0])
+        with patch.object(limiter.store, '_transaction', side_effect=RuntimeError('store down')):
+            limiter.release('key:slot', dbname)
+        # the slot this worker failed to give back is returned by its next request
+        self.assertEqual(limiter.acquire('key:slot', dbname), (True, 0, None))
+        limiter.release('key:slot', dbname)
+        quota = self.env['material.register.api.quota'].search([('key', '=', 'key:slot')])
+        quota.invalidate_cache()
+        self.assertEqual(quota.in_flight, 0)
+
+    def test_throttled_request(self):
+        self._limit(QuotaPolicy(rate=0.01, burst=2, max_concurrent=0))
+        for _i in range(2):
+            self.assertTrue(self.api_call('GET', '/api/v1/materials', {'limit': 1})['success'])
+        response = self.api_request('GET', '/api/v1/materials', {'limit': 1})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(int(response.headers['Retry-After']), 100)
+        self.assertEqual(response.json()['result']['error']['code'], 'RATE_LIMITED')
+
+    def test_max_page_size(self):
+        self._limit(QuotaPolicy(rate=0, burst=0, max_concurrent=0))
+        self.env['material.register'].create([{
+            'name': 'Paged %s' % index,
+            'material_code': 'PG%s' % index,
+            'material_type': 'fabric',
+            'material_buy_price': 500,
+            'partner_id': self.partner_1.id,
+        } for index in range(3)])
+        with patch.object(pagination, 'MAX_PAGE_SIZE', 2):
+            for params in ({}, {'limit': 0}, {'limit': 50}):
+                result = self.api_call('GET', '/api/v1/materials', params)
+                self.assertEqual(len(result['data']), 2)
+                self.assertEqual(result['meta']['limit'], 2)
+                self.assertTrue(result['meta']['has_more'])
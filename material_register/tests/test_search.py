@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.material_register.controllers.search import (
+    InvalidSearchRequest, parse_search_query, search_materials,
+)
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestMaterialSearch(TestMaterialCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialSearch, cls).setUpClass()
+        cls.supplier = cls.env['res.partner'].create({'name': 'Denim Supplier Jakarta'})
+        cls.materials = cls.env['material.register'].create([{
+            'name': 'Stretch denim %s' % index,
+            'material_code': 'DNM%s' % index,
+            'material_type': 'jeans',
+            'material_buy_price': 1000 + index,
+            'partner_id': cls.supplier.id,
+        } for index in range(5)])
+        cls.other = cls.env['material.register'].create({
+            'name': 'Denim twill',
+            'material_code': 'TW1',
+            'material_type': 'fabric',
+            'material_buy_price': 900,
+            'partner_id': cls.partner_1.id,
+        })
+
+    def test_parse_search_query(self):
+        self.assertEqual(parse_search_query("Denim supp' & !jak"), 'denim:* & supp:* & jak:*')
+        with self.assertRaises(InvalidSearchRequest):
+            parse_search_query(' &! ')
+
+    def test_search_matches_partner_name(self):
+        records, ranks, next_cursor = search_materials(self.env, 'denim supplier jakarta')
+        self.assertEqual(set(records.ids), set(self.materials.ids))
+        self.assertIsNone(next_cursor)
+        self.assertEqual(list(ranks), records.ids)
+
+        # every word has to match, the code is searched as well
+        records, ranks, _cursor = search_materials(self.env, 'tw1 denim')
+        self.assertEqual(records, self.other)
+        # matching in the name and the partner name ranks above the name only
+        records, ranks, _cursor = search_materials(self.env, 'denim')
+        self.assertEqual(records[-1], self.other)
+        records, ranks, _cursor = search_materials(self.env, 'denim', domain=[('material_type', '=', 'fabric')])
+        self.assertEqual(records, self.other)
+
+    def test_search_follows_partner_rename(self):
+        self.supplier.name = 'Bandung Textiles'
+        self.assertFalse(search_materials(self.env, 'jakarta')[0])
+        self.assertEqual(set(search_materials(self.env, 'bandung')[0].ids), set(self.materials.ids))
+
+        self.materials[0].name = 'Selvedge'
+        self.assertEqual(search_materials(self.env, 'selvedge')[0], self.materials[0])
+
+    def test_search_keyset_pages(self):
+        seen = []
+        cursor = None
+        while True:
+            records, ranks, cursor = search_materials(self.env, 'denim', limit=2, cursor=cursor)
+            seen += records.ids
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted((self.materials | self.other).ids))
+        self.assertEqual(len(seen), len(set(seen)))
+        with self.assertRaises(InvalidSearchRequest):
+            search_materials(self.env, 'jeans', cursor=search_materials(self.env, 'denim', limit=1)[2])
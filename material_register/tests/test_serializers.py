@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.material_register.controllers.serializers import (
+    MATERIAL_DETAIL_SPEC, MATERIAL_LIST_SPEC, InvalidFieldset, compact_records, restrict_spec, serialize_record,
+    serialize_records,
+)
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestMaterialSerializers(TestMaterialCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialSerializers, cls).setUpClass()
+        cls.Material = cls.env['material.register'].with_context(tracking_disable=True)
+        partners = cls.env['res.partner'].create([{'name': 'Supplier %s' % i} for i in range(40)])
+        cls.materials = cls.Material.create([{
+            'name': 'Serialized %s' % index,
+            'material_code': 'SR%04d' % index,
+            'material_type': 'jeans',
+            'material_buy_price': 500,
+            'partner_id': partners[index % len(partners)].id,
+            'currency_id': cls.currency_id.id,
+        } for index in range(1000)])
+
+    def _count_queries(self, records, spec):
+        records.flush()
+        records.invalidate_cache()
+        before = self.cr.sql_log_count
+        serialize_records(records, spec)
+        return self.cr.sql_log_count - before
+
+    def test_serialize_shape(self):
+        data = serialize_record(self.material1, MATERIAL_DETAIL_SPEC)
+        self.assertEqual(data['id'], self.material1.id)
+        self.assertEqual(data['material_buy_price'], 100000.0)
+        self.assertEqual(data['currency'], {
+            'id': self.currency_id.id,
+            'name': self.currency_id.name,
+            'symbol': self.currency_id.symbol,
+        })
+        self.assertEqual(data['partner']['email'], 'julia@agrolait.example.com')
+        self.assertEqual(data['create_uid']['id'], self.env.uid)
+        self.assertIsInstance(data['write_date'], str)
+
+    def test_serialize_query_count_is_constant(self):
+        small = self._count_queries(self.materials[:10], MATERIAL_LIST_SPEC)
+        large = self._count_queries(self.materials, MATERIAL_LIST_SPEC)
+        self.assertEqual(small, large, "serializing a 1000 rows page must not issue per-row queries")
+        small = self._count_queries(self.materials[:10], MATERIAL_DETAIL_SPEC)
+        large = self._count_queries(self.materials, MATERIAL_DETAIL_SPEC)
+        self.assertEqual(small, large)
+
+    def test_sparse_fieldset(self):
+        spec = restrict_spec(MATERIAL_LIST_SPEC, fields=['material_code', 'material_buy_price', 'partner'], expand=[])
+        data = serialize_record(self.material1, spec)
+        self.assertEqual(data, {
+            'id': self.material1.id,
+            'material_code': 'KS',
+            'material_buy_price': 100000.0,
+            'partner': self.partner_1.id,
+        })
+        data = serialize_record(self.material1, restrict_spec(MATERIAL_LIST_SPEC, fields=['name'], expand=['currency']))
+        self.assertEqual(set(data), {'id', 'name', 'currency'})
+        self.assertEqual(data['currency']['symbol'], self.currency_id.symbol)
+        with self.assertRaises(InvalidFieldset):
+            restrict_spec(MATERIAL_LIST_SPEC, fields=['unknown'])
+        with self.assertRaises(InvalidFieldset):
+            restrict_spec(MATERIAL_LIST_SPEC, expand=['name'])
+
+    def test_sparse_fieldset_skips_relations(self):
+        spec = restrict_spec(MATERIAL_LIST_SPEC, fields=['material_code'])
+        full = self._count_queries(self.materials, MATERIAL_LIST_SPEC)
+        sparse = self._count_queries(self.materials, spec)
+        self.assertLess(sparse, full)
+
+    def test_compact_records(self):
+        records = self.materials[:100]
+        rows = serialize_records(records, MATERIAL_LIST_SPEC)
+        compact = compact_records(rows, MATERIAL_LIST_SPEC)
+        self.assertEqual(compact['count'], 100)
+        self.assertEqual(compact['columns']['id'], records.ids)
+        self.assertEqual(compact['columns']['partner'], [row['partner']['id'] for row in rows])
+        # one currency and the 40 partners, instead of 100 copies of each
+        self.assertEqual(compact['included']['currency'], [rows[0]['currency']])
+        self.assertEqual(len(compact['included']['partner']), 40)
+        self.assertLess(len(str(compact)), len(str(rows)) / 2)
+
+        spec = restrict_spec(MATERIAL_LIST_SPEC, fields=['material_code', 'partner'], expand=[])
+        compact = compact_records(serialize_records(records, spec), spec)
+        self.assertEqual(compact['included'], {})
+        self.assertEqual(set(compact['columns']), {'id', 'material_code', 'partner'})
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.material_register.controllers.stats import InvalidStatsRequest, material_stats
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestMaterialStats(TestMaterialCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestMaterialStats, cls).setUpClass()
+        cls.company_currency = cls.env.company.currency_id
+        cls.env['material.register'].with_context(tracking_disable=True).create([{
+            'name': 'Stats %s' % index,
+            'material_code': 'ST%s' % index,
+            'material_type': 'jeans',
+            'material_buy_price': price,
+            'partner_id': cls.partner_1.id,
+            'currency_id': cls.company_currency.id,
+        } for index, price in enumerate([200, 400, 600])])
+        cls.domain = [('material_code', '=like', 'ST%')]
+
+    def test_stats_per_type(self):
+        rows = material_stats(self.env, self.domain, group_by='material_type')
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row['group'], 'jeans')
+        self.assertEqual(row['currency']['id'], self.company_currency.id)
+        self.assertEqual((row['count'], row['sum'], row['avg'], row['min'], row['max']), (3, 1200, 400, 200, 600))
+
+    def test_stats_per_partner_converted(self):
+        rows = material_stats(self.env, [('partner_id', '=', self.partner_1.id)], group_by='partner_id', convert=True)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['group'], {'id': self.partner_1.id, 'name': self.partner_1.display_name})
+        self.assertEqual(rows[0]['count'], 4)
+        self.assertEqual(rows[0]['currency']['id'], self.company_currency.id)
+
+        # the stored converted prices are aggregated, as read by the price_min/price_max filters
+        self.material1.flush()
+        self.env.cr.execute(
+            "UPDATE material_register SET material_buy_price_company = 12345 WHERE id = %s", [self.material1.id])
+        rows = material_stats(self.env, [('partner_id', '=', self.partner_1.id)], group_by='partner_id', convert=True)
+        self.assertEqual((rows[0]['sum'], rows[0]['max']), (12345 + 200 + 400 + 600, 12345))
+
+    def test_stats_invalid_group_by(self):
+        with self.assertRaises(InvalidStatsRequest):
+            material_stats(self.env, [], group_by='name')
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import json
+
+from odoo.addons.material_register.controllers.validation import (
+    MaterialValidationError, material_schema, validate_material_payloads, validate_material_values,
+)
+from odoo.addons.material_register.tests.common import TestMaterialCommon
+
+
+class TestMaterialValidation(TestMaterialCommon):
+
+    def _payload(self, **values):
+        payload = {
+            'material_code': 'VAL1',
+            'name': 'Validated',
+            'material_type': 'cotton',
+            'material_buy_price': '1500.5',
+            'partner_id': self.partner_1.id,
+        }
+        payload.update(values)
+        return payload
+
+    def test_schema_follows_model(self):
+        schema = material_schema(self.env)
+        self.assertIs(material_schema(self.env), schema)
+        rules = {rule.name: rule for rule in schema.rules}
+        selection = [value for value, _label in self.env['material.register']._fields['material_type'].selection]
+        self.assertEqual(list(rules['material_type'].choices), selection)
+        self.assertEqual(set(schema.required), {'material_code', 'name', 'material_type', 'material_buy_price', 'partner_id'})
+
+        values = validate_material_values(self.env, dict(self._payload(), upsert=True))
+        self.assertEqual(values['material_buy_price'], 1500.5)
+        self.assertNotIn('upsert', values)
+
+    def test_rejected_payloads(self):
+        cases = [
+            ([], 'INVALID_PAYLOAD'),
+            ({'name': 'No code'}, 'MISSING_REQUIRED_FIELDS'),
+            (self._payload(material_type='silk'), 'INVALID_MATERIAL_TYPE'),
+            (self._payload(material_buy_price='cheap'), 'INVALID_PRICE'),
+            (self._payload(material_buy_price=0), 'INVALID_PRICE'),
+            (self._payload(material_buy_price='nan'), 'INVALID_PRICE'),
+            (self._payload(material_buy_price='inf'), 'INVALID_PRICE'),
+            (self._payload(material_buy_price=float('inf')), 'INVALID_PRICE'),
+            (self._payload(material_buy_price=1e999), 'INVALID_PRICE'),
+            (self._payload(currency_id=float('nan')), 'CURRENCY_NOT_FOUND'),
+            (self._payload(partner_id='1'), 'PARTNER_NOT_FOUND'),
+            (self._payload(name=None), 'MISSING_REQUIRED_FIELDS'),
+            (self._payload(currency_id=True), 'CURRENCY_NOT_FOUND'),
+        ]
+        for payload, code in cases:
+            with self.assertRaises(MaterialValidationError) as error:
+                validate_material_values(self.env, payload)
+            self.assertEqual(error.exception.code, code, payload)
+        # JSON-RPC bodies are parsed with json.loads, which reads NaN and Infinity literals
+        with self.assertRaises(MaterialValidationError) as error:
+            validate_material_values(self.env, {'material_buy_price': json.loads('NaN')}, partial=True)
+        self.assertEqual(error.exception.code, 'INVALID_PRICE')
+        # an update only checks the provided fields
+        self.assertEqual(validate_material_values(self.env, {'name': 'Renamed'}, partial=True), {'name': 'Renamed'})
+
+    def test_batch_references_checked_with_one_query(self):
+        items = [
+            self._payload(currency_id=self.currency_id.id),
+            self._payload(partner_id=self.partner_1.id + 100000),
+            self._payload(currency_id=self.currency_id.id + 100000),
+            self._payload(material_type='silk', partner_id=self.partner_1.id + 200000),
+        ]
+        material_schema(self.env)
+        with self.assertQueryCount(1):
+            checked = validate_material_payloads(self.env, items)
+        self.assertIsNone(checked[0][1])
+        self.assertEqual(checked[0][0]['currency_id'], self.currency_id.id)
+        self.assertEqual([error.code for _values, error in checked[1:]],
+                         ['PARTNER_NOT_FOUND', 'CURRENCY_NOT_FOUND', 'INVALID_MATERIAL_TYPE'])